@@ -1,16 +1,29 @@
 from django.contrib import admin
-from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult, DailyAssessmentStats, NormativeDataVersion, ScoringJob, WeightProfile
 
 @admin.register(Assessment)
 class AssessmentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'patient', 'assessor', 'status', 'final_risk_score', 'created_at', 'completed_at']
-    list_filter = ['status', 'final_risk_score', 'created_at']
+    list_display = ['id', 'patient', 'assessor', 'status', 'final_risk_score', 'scoring_status', 'created_at', 'completed_at']
+    list_filter = ['status', 'final_risk_score', 'scoring_status', 'created_at']
     search_fields = ['patient__full_name', 'assessor__username']
-    readonly_fields = ['created_at', 'completed_at']
+    readonly_fields = [
+        'created_at', 'completed_at', 'scoring_status', 'weight_profile', 'final_z_score', 'digit_span_z_score',
+        'tmt_a_z_score', 'tmt_b_z_score', 'stroop_z_score', 'meem_z_score', 'clock_drawing_z_score',
+    ]
     
     fieldsets = (
         (None, {
-            'fields': ('patient', 'assessor', 'status', 'final_risk_score')
+            'fields': ('patient', 'assessor', 'status', 'final_risk_score', 'scoring_status', 'weight_profile')
+        }),
+        ('Z-Scores', {
+            'fields': (
+                'final_z_score', 'digit_span_z_score', 'tmt_a_z_score', 'tmt_b_z_score',
+                'stroop_z_score', 'meem_z_score', 'clock_drawing_z_score',
+            ),
+            'classes': ('collapse',)
         }),
         ('Timestamps', {
             'fields': ('created_at', 'completed_at'),
@@ -21,6 +34,8 @@ class AssessmentAdmin(admin.ModelAdmin):
 @admin.register(DigitSpanResult)
 class DigitSpanResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'forward_score', 'backward_score', 'total_score', 'z_score', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
     list_filter = ['created_at']
     search_fields = ['assessment__patient__full_name']
     readonly_fields = ['z_score', 'created_at', 'total_score']
@@ -28,6 +43,8 @@ class DigitSpanResultAdmin(admin.ModelAdmin):
 @admin.register(TMTResult)
 class TMTResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'time_a_seconds', 'time_b_seconds', 'errors_a', 'errors_b', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
     list_filter = ['created_at']
     search_fields = ['assessment__patient__full_name']
     readonly_fields = ['z_score_a', 'z_score_b', 'created_at']
@@ -35,6 +52,8 @@ class TMTResultAdmin(admin.ModelAdmin):
 @admin.register(StroopResult)
 class StroopResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'card_1_time', 'card_2_time', 'card_3_time', 'interference_time', 'z_score', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
     list_filter = ['created_at']
     search_fields = ['assessment__patient__full_name']
     readonly_fields = ['z_score', 'created_at', 'interference_time']
@@ -42,6 +61,8 @@ class StroopResultAdmin(admin.ModelAdmin):
 @admin.register(MeemResult)
 class MeemResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'total_score', 'interpretation', 'z_score', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
     list_filter = ['interpretation', 'created_at']
     search_fields = ['assessment__patient__full_name']
     readonly_fields = ['total_score', 'interpretation', 'z_score', 'created_at']
@@ -102,9 +123,14 @@ class MeemResultAdmin(admin.ModelAdmin):
 @admin.register(ClockDrawingResult)
 class ClockDrawingResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'requested_time', 'circle_score', 'numbers_score', 'hands_score', 'total_score', 'classification', 'z_score', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
     list_filter = ['classification', 'requested_time', 'created_at']
     search_fields = ['assessment__patient__full_name']
-    readonly_fields = ['total_score', 'classification', 'z_score', 'created_at', 'completed_at']
+    readonly_fields = [
+        'total_score', 'classification', 'z_score', 'created_at', 'completed_at',
+        'drawing_preview', 'drawing_image', 'drawing_thumbnail',
+    ]
     
     fieldsets = (
         ('Informações da Avaliação', {
@@ -118,10 +144,69 @@ class ClockDrawingResultAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Dados do Desenho', {
-            'fields': ('drawing_data',),
+            'fields': ('drawing_preview', 'drawing_image', 'drawing_thumbnail'),
             'classes': ('collapse',)
         }),
         ('Resultados', {
             'fields': ('total_score', 'classification', 'z_score', 'created_at', 'completed_at')
         })
     )
+    
+    @admin.display(description='Desenho')
+    def drawing_preview(self, obj):
+        if not obj.drawing_image:
+            return '-'
+        url = reverse('assessments:clock_drawing_image', args=[obj.assessment_id])
+        return format_html('<a href="{}"><img src="{}?thumbnail=1" alt="Desenho" style="max-width: 200px"></a>', url, url)
+
+@admin.register(DailyAssessmentStats)
+class DailyAssessmentStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'status', 'test', 'count', 'z_score_sum', 'below_normal_count', 'normal_count', 'above_normal_count', 'updated_at']
+    list_filter = ['status', 'test', 'date']
+    readonly_fields = ['date', 'status', 'test', 'count', 'z_score_sum', 'z_score_sum_squares',
+                       'below_normal_count', 'normal_count', 'above_normal_count', 'updated_at']
+
+
+@admin.register(NormativeDataVersion)
+class NormativeDataVersionAdmin(admin.ModelAdmin):
+    list_display = ['version', 'description', 'is_active', 'created_at', 'activated_at']
+    list_filter = ['is_active']
+    readonly_fields = ['version', 'data', 'is_active', 'created_at', 'activated_at']
+    
+    def has_add_permission(self, request):
+        # Versões são cadastradas e ativadas pelos comandos import_normative_data/activate_normative_data
+        return False
+
+
+@admin.register(WeightProfile)
+class WeightProfileAdmin(admin.ModelAdmin):
+    list_display = ['slug', 'name', 'description', 'created_at']
+    search_fields = ['slug', 'name']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Pesos não mudam depois de criados (avaliações já pontuadas com o perfil)
+        if obj is not None:
+            return ['slug', 'weights', 'created_at']
+        return ['created_at']
+
+
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'assessment', 'status', 'attempts', 'run_after', 'locked_by', 'finished_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    # __str__ da avaliação usa o nome do paciente
+    list_select_related = ['assessment__patient']
+    search_fields = ['assessment__patient__full_name', 'idempotency_key']
+    readonly_fields = [
+        'assessment', 'idempotency_key', 'attempts', 'last_error', 'locked_at', 'locked_by',
+        'created_at', 'updated_at', 'finished_at',
+    ]
+    actions = ['retry_jobs']
+    
+    @admin.action(description='Executar novamente')
+    def retry_jobs(self, request, queryset):
+        jobs = queryset.exclude(status='RUNNING')
+        assessment_ids = list(jobs.values_list('assessment_id', flat=True))
+        updated = jobs.update(status='PENDING', attempts=0, run_after=timezone.now(), finished_at=None)
+        Assessment.objects.filter(pk__in=assessment_ids).update(scoring_status='QUEUED')
+        self.message_user(request, f'{updated} cálculos voltaram para a fila.')
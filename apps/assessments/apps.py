@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class AssessmentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.assessments'
+
+    def ready(self):
+        # Registra os signals que mantêm as estatísticas diárias atualizadas
+        from . import signals  # noqa: F401
+        # Compila a tabela normativa na carga da aplicação (antes do fork dos workers com --preload)
+        from . import services  # noqa: F401
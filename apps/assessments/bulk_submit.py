@@ -0,0 +1,217 @@
+"""
+Submissão em lote dos resultados de teste (tablets que sincronizam offline).
+
+Cada item traz o id de uma avaliação e os resultados de um ou mais testes,
+validados pelos mesmos ``Submit*Serializer`` dos endpoints individuais. Os
+itens válidos são gravados juntos: uma única transação, um ``bulk_create`` por
+tipo de resultado (com pontuação total e Z-score preenchidos antes, já que o
+``bulk_create`` não chama o ``save()``), um UPDATE do status das avaliações e
+os jobs da pontuação final criados em lote (``scoring_queue``). Como nada disso
+dispara signals, o rollup diário é recalculado uma vez por dia afetado e o
+cache das páginas invalidado uma vez por paciente. Os itens inválidos (ou em
+conflito com uma submissão concorrente) não impedem a gravação dos demais;
+cada item recebe o seu próprio status.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+
+from apps.core.view_cache import schedule_data_version_bump
+from .daily_stats import assessment_local_date, schedule_daily_stats_refresh
+from .models import Assessment, DigitSpanResult, MeemResult, StroopResult, TMTResult
+from .serializers import (
+    SubmitDigitSpanSerializer, SubmitMeemSerializer, SubmitStroopSerializer, SubmitTMTSerializer,
+)
+from .scoring_queue import enqueue_if_complete_many
+from .services import score_calculator
+
+# Máximo de avaliações por requisição
+MAX_BULK_ITEMS = 200
+
+# Teste (campo do item e de AssessmentResults): model do resultado
+BULK_TESTS = {
+    'digit_span': DigitSpanResult,
+    'tmt': TMTResult,
+    'stroop': StroopResult,
+    'meem': MeemResult,
+}
+
+
+class BulkSubmitSerializer(serializers.Serializer):
+    """Payload do lote: ``{"items": [{"assessment_id": 1, "tmt": {...}, ...}, ...]}``"""
+    items = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_BULK_ITEMS
+    )
+
+
+class BulkSubmitItemSerializer(serializers.Serializer):
+    """Um item do lote: a avaliação e os resultados dos testes realizados"""
+    assessment_id = serializers.IntegerField()
+    digit_span = SubmitDigitSpanSerializer(required=False)
+    tmt = SubmitTMTSerializer(required=False)
+    stroop = SubmitStroopSerializer(required=False)
+    meem = SubmitMeemSerializer(required=False)
+
+    def validate(self, data):
+        if not any(test in data for test in BULK_TESTS):
+            raise serializers.ValidationError(
+                f"Informe o resultado de ao menos um teste: {', '.join(BULK_TESTS)}"
+            )
+        return data
+
+
+def _error(assessment_id, http_status, errors):
+    return {'assessment_id': assessment_id, 'status': http_status, 'errors': errors}
+
+
+def _validate_items(items, user):
+    """
+    Valida os itens e carrega as avaliações (uma consulta).
+
+    Chamada dentro da transação da gravação: as avaliações ficam travadas
+    (SELECT ... FOR UPDATE) até o commit, então dois lotes com a mesma
+    avaliação não passam os dois pela verificação de resultado já submetido.
+
+    Returns:
+        tuple: (lista de saída com os erros já preenchidos e None nas posições
+        aceitas, [(posição, avaliação, dados validados)] aceitos)
+    """
+    outcomes = [None] * len(items)
+    validated = []
+    for position, item in enumerate(items):
+        serializer = BulkSubmitItemSerializer(data=item)
+        if serializer.is_valid():
+            validated.append((position, serializer.validated_data))
+        else:
+            outcomes[position] = _error(item.get('assessment_id'), status.HTTP_400_BAD_REQUEST, serializer.errors)
+
+    assessments = (
+        Assessment.objects.select_related('patient').with_results()
+        .select_for_update(of=('self',))
+        .in_bulk([data['assessment_id'] for _, data in validated])
+    )
+
+    accepted = []
+    seen = set()
+    for position, data in validated:
+        assessment_id = data['assessment_id']
+        assessment = assessments.get(assessment_id)
+        if assessment is None:
+            outcomes[position] = _error(assessment_id, status.HTTP_404_NOT_FOUND, 'Avaliação não encontrada')
+        elif assessment.assessor_id != user.pk:
+            outcomes[position] = _error(
+                assessment_id, status.HTTP_403_FORBIDDEN, 'Você não tem permissão para modificar esta avaliação'
+            )
+        elif assessment_id in seen:
+            outcomes[position] = _error(
+                assessment_id, status.HTTP_400_BAD_REQUEST, 'Avaliação repetida no lote'
+            )
+        else:
+            results = assessment.results
+            submitted = [test for test in BULK_TESTS if test in data and getattr(results, test) is not None]
+            if submitted:
+                outcomes[position] = _error(
+                    assessment_id, status.HTTP_400_BAD_REQUEST,
+                    f"Resultado já submetido para esta avaliação: {', '.join(submitted)}"
+                )
+            else:
+                accepted.append((position, assessment, data))
+        seen.add(assessment_id)
+    return outcomes, accepted
+
+
+def _build_results(accepted):
+    """
+    Resultados ainda não salvos de cada teste, com pontuação total e Z-score
+    (mesmos campos que o save() preencheria, já que o bulk_create não o chama).
+    """
+    new_results = {test: [] for test in BULK_TESTS}
+    for _, assessment, data in accepted:
+        for test, model in BULK_TESTS.items():
+            if test in data:
+                result = model(assessment=assessment, **data[test])
+                result.prepare_for_save(score_calculator)
+                new_results[test].append(result)
+    return new_results
+
+
+def _already_submitted(accepted):
+    """Ids das avaliações aceitas que já têm gravado algum dos resultados do item"""
+    conflicts = set()
+    for test, model in BULK_TESTS.items():
+        assessment_ids = [assessment.pk for _, assessment, data in accepted if test in data]
+        if assessment_ids:
+            conflicts.update(
+                model.objects.filter(assessment_id__in=assessment_ids).values_list('assessment_id', flat=True)
+            )
+    return conflicts
+
+
+def submit_results_bulk(items, user):
+    """
+    Grava os resultados de um lote de avaliações do avaliador ``user``.
+
+    Args:
+        items: itens do lote (dicts, ver BulkSubmitItemSerializer)
+        user: avaliador; só as avaliações dele são aceitas
+
+    Returns:
+        list: um dict por item, na ordem recebida, com ``status`` (201, 400,
+        403, 404 ou 409) e os testes gravados ou os erros
+    """
+    with transaction.atomic():
+        outcomes, accepted = _validate_items(items, user)
+
+        # Os endpoints de um teste não travam a avaliação: um resultado gravado por
+        # eles depois da verificação viola a restrição um-para-um. O item em
+        # conflito recebe 409 e os demais são gravados de novo, sem ele
+        while accepted:
+            new_results = _build_results(accepted)
+            try:
+                with transaction.atomic():
+                    for test, model in BULK_TESTS.items():
+                        if new_results[test]:
+                            model.objects.bulk_create(new_results[test])
+                break
+            except IntegrityError:
+                conflicts = _already_submitted(accepted)
+                if not conflicts:
+                    raise
+                for position, assessment, _ in accepted:
+                    if assessment.pk in conflicts:
+                        outcomes[position] = _error(
+                            assessment.pk, status.HTTP_409_CONFLICT,
+                            'Resultado submetido para esta avaliação por outra requisição'
+                        )
+                accepted = [item for item in accepted if item[1].pk not in conflicts]
+
+        assessments = [assessment for _, assessment, _ in accepted]
+        if assessments:
+            Assessment.objects.filter(pk__in=[assessment.pk for assessment in assessments]).update(status='IN_PROGRESS')
+        assessment_ids_by_patient = defaultdict(list)
+        for assessment in assessments:
+            assessment.status = 'IN_PROGRESS'
+            assessment_ids_by_patient[assessment.patient_id].append(assessment.pk)
+
+        # Uma vez por avaliação, já com todos os resultados do lote
+        jobs = enqueue_if_complete_many(assessments)
+
+        # Sem signals (bulk_create e update): rollup e cache atualizados aqui, depois do commit
+        for day in {assessment_local_date(assessment.created_at) for assessment in assessments}:
+            schedule_daily_stats_refresh(day)
+        for patient_id, assessment_ids in assessment_ids_by_patient.items():
+            schedule_data_version_bump(patient_id, assessment_ids)
+
+        for position, assessment, data in accepted:
+            job = jobs.get(assessment.pk)
+            outcomes[position] = {
+                'assessment_id': assessment.pk,
+                'status': status.HTTP_201_CREATED,
+                'created': [test for test in BULK_TESTS if test in data],
+                'assessment_status': assessment.status,
+                'scoring_job': job.pk if job else None,
+                'scoring_status': assessment.scoring_status,
+            }
+    return outcomes
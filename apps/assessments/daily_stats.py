@@ -0,0 +1,201 @@
+"""
+Manutenção da tabela de estatísticas diárias (DailyAssessmentStats).
+
+As linhas de um dia são sempre recalculadas a partir das avaliações daquele
+dia, então a atualização incremental (um dia por vez, disparada por signals) e
+a reconstrução completa (comando ``rebuild_daily_stats``) produzem o mesmo
+resultado. O recálculo é uma única consulta agregada no banco (contagens, somas
+e faixas por status e teste, com a normalização dos Z-scores em SQL), sem
+carregar as avaliações do dia.
+
+Os dias alterados em uma transação são acumulados e cada um é recalculado uma
+única vez depois do commit, por mais avaliações e resultados que a transação
+grave.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from apps.core.view_cache import bump_all_data_versions
+from apps.core.z_score_utils import get_test_type
+from .models import Assessment, DailyAssessmentStats
+
+# Cortes das faixas de déficit usados nos dashboards
+BELOW_NORMAL_CUTOFF = -1.5
+ABOVE_NORMAL_CUTOFF = 1.5
+
+
+def assessment_local_date(created_at):
+    """Dia (no fuso do projeto) ao qual uma avaliação pertence"""
+    if created_at is None:
+        return None
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return created_at.date()
+
+
+def local_day_bounds(day):
+    """Intervalo [início, fim) de um dia no fuso do projeto, para filtrar created_at pelo índice"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+_EMPTY_BUCKET = {
+    'count': 0,
+    'z_score_sum': 0.0,
+    'z_score_sum_squares': 0.0,
+    'below_normal_count': 0,
+    'normal_count': 0,
+    'above_normal_count': 0,
+}
+
+
+# Coluna do Z-score de cada teste, a partir de Assessment
+TEST_Z_SCORE_COLUMNS = {
+    'digit_span': 'digit_span_result__z_score',
+    'tmt_a': 'tmt_result__z_score_a',
+    'tmt_b': 'tmt_result__z_score_b',
+    'stroop': 'stroop_result__z_score',
+    'meem': 'meem_result__z_score',
+    'clock_drawing': 'clock_drawing_result__z_score',
+}
+
+
+def normalized_z_score_expression(test_name):
+    """
+    Z-score normalizado (negativo = déficit) do teste como expressão SQL, com a
+    mesma regra de ``normalize_z_score_for_deficit``.
+    """
+    column = F(TEST_Z_SCORE_COLUMNS[test_name])
+    if get_test_type(test_name) == 'time':
+        return -Abs(column)
+    return column
+
+
+def compute_daily_rows(day):
+    """
+    Calcula as linhas de rollup de um dia com uma única consulta agregada
+    (nenhuma avaliação é carregada no Python).
+
+    Returns:
+        dict: {(status, test): valores agregados}
+    """
+    start, end = local_day_bounds(day)
+    aliases = {f'z_{test}': normalized_z_score_expression(test) for test in TEST_Z_SCORE_COLUMNS}
+    aggregates = {'assessments': Count('pk')}
+    for test in TEST_Z_SCORE_COLUMNS:
+        z_score = f'z_{test}'
+        aggregates.update({
+            f'{test}__count': Count(z_score),
+            f'{test}__sum': Sum(z_score),
+            f'{test}__sum_squares': Sum(F(z_score) * F(z_score)),
+            f'{test}__below': Count(z_score, filter=Q(**{f'{z_score}__lt': BELOW_NORMAL_CUTOFF})),
+            f'{test}__above': Count(z_score, filter=Q(**{f'{z_score}__gt': ABOVE_NORMAL_CUTOFF})),
+        })
+    rows = (
+        Assessment.objects.filter(created_at__gte=start, created_at__lt=end)
+        .alias(**aliases).values('status').annotate(**aggregates).order_by()
+    )
+
+    buckets = {}
+    for row in rows:
+        status = row['status']
+        buckets[(status, 'ALL')] = dict(_EMPTY_BUCKET, count=row['assessments'])
+        for test in TEST_Z_SCORE_COLUMNS:
+            count = row[f'{test}__count']
+            if not count:
+                continue
+            below, above = row[f'{test}__below'], row[f'{test}__above']
+            buckets[(status, test)] = {
+                'count': count,
+                'z_score_sum': row[f'{test}__sum'],
+                'z_score_sum_squares': row[f'{test}__sum_squares'],
+                'below_normal_count': below,
+                'normal_count': count - below - above,
+                'above_normal_count': above,
+            }
+    return buckets
+
+
+def refresh_daily_stats(day):
+    """Recalcula e substitui as linhas de rollup de um dia"""
+    buckets = compute_daily_rows(day)
+    with transaction.atomic():
+        DailyAssessmentStats.objects.filter(date=day).delete()
+        DailyAssessmentStats.objects.bulk_create([
+            DailyAssessmentStats(date=day, status=status, test=test, **values)
+            for (status, test), values in buckets.items()
+        ])
+
+
+def _pending_days(connection):
+    """Dias aguardando recálculo na transação atual da conexão"""
+    pending = getattr(connection, '_daily_stats_pending', None)
+    if pending is None:
+        pending = connection._daily_stats_pending = set()
+    return pending
+
+
+def _refresh_pending_days(connection):
+    """Recalcula (uma vez cada) os dias acumulados; os callbacks seguintes do mesmo commit não fazem nada"""
+    pending = _pending_days(connection)
+    while pending:
+        refresh_daily_stats(pending.pop())
+
+
+def schedule_daily_stats_refresh(day):
+    """Agenda o recálculo de um dia para depois do commit da transação atual"""
+    if day is None:
+        return
+    connection = transaction.get_connection()
+    _pending_days(connection).add(day)
+    # Um callback por chamada (barato): se o savepoint que registrou o primeiro
+    # for desfeito, outro callback da transação ainda recalcula o dia
+    transaction.on_commit(lambda: _refresh_pending_days(connection))
+
+
+def rebuild_daily_stats(start_date=None, end_date=None):
+    """
+    Reconstrói o rollup para um intervalo de datas (padrão: todo o histórico).
+
+    Returns:
+        int: número de dias processados
+    """
+    if start_date is None or end_date is None:
+        dates = Assessment.objects.order_by().dates('created_at', 'day')
+        if start_date is None and end_date is None:
+            # Reconstrução completa: descarta também dias sem avaliações
+            DailyAssessmentStats.objects.all().delete()
+        if not dates:
+            return 0
+        start_date = start_date or dates[0]
+        end_date = end_date or dates[len(dates) - 1]
+
+    days = 0
+    current = start_date
+    while current <= end_date:
+        refresh_daily_stats(current)
+        current += timedelta(days=1)
+        days += 1
+    bump_all_data_versions()
+    return days
+
+
+def get_daily_rows(start_date, end_date, status=None, tests=None):
+    """
+    Lê o rollup de um intervalo de datas.
+
+    Returns:
+        QuerySet de dicts com date, status, test, count e z_score_sum
+    """
+    rows = DailyAssessmentStats.objects.filter(date__gte=start_date, date__lte=end_date)
+    if status:
+        rows = rows.filter(status=status)
+    if tests:
+        rows = rows.filter(test__in=tests)
+    return rows.values('date', 'status', 'test', 'count', 'z_score_sum')
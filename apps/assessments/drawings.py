@@ -0,0 +1,281 @@
+"""
+Armazenamento dos desenhos do Teste do Relógio.
+
+Os desenhos são gravados como PNG no armazenamento de arquivos do Django
+(``default_storage``), com nome derivado do SHA-256 do conteúdo: o mesmo
+desenho nunca é gravado duas vezes e o hash serve de ETag. Quando o Pillow está
+instalado também é gerada uma miniatura. O ClockDrawingResult guarda apenas os
+nomes dos arquivos; a imagem é servida em blocos por ``drawing_response``, com
+suporte a ETag (If-None-Match) e Range.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import json
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+
+DRAWINGS_DIR = 'clock_drawings'
+THUMBNAILS_DIR = f'{DRAWINGS_DIR}/thumbnails'
+
+# Tamanho máximo aceito para um desenho (PNG decodificado)
+MAX_DRAWING_BYTES = 2 * 1024 * 1024
+
+THUMBNAIL_SIZE = (200, 200)
+
+# Desenhos antigos (traços em JSON) são renderizados com esta margem e espessura
+STROKE_MARGIN = 10
+STROKE_WIDTH = 3
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class DrawingError(ValueError):
+    """Desenho inválido (formato, codificação ou tamanho)"""
+
+
+def _load_pillow():
+    """(Image, ImageDraw) do Pillow, ou None se ele não estiver instalado (sem miniaturas)"""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return None
+    return Image, ImageDraw
+
+
+def decode_drawing_data(value):
+    """
+    Converte o valor enviado pelo formulário/API em bytes PNG.
+
+    Aceita data URL (``data:image/png;base64,...``), base64 puro ou a lista de
+    traços em JSON gravada pelas versões anteriores do formulário.
+
+    Returns:
+        bytes | None: PNG, ou None se não há desenho (ou traços sem Pillow)
+
+    Raises:
+        DrawingError: conteúdo que não é um PNG válido ou maior que MAX_DRAWING_BYTES
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+
+    if value.startswith('['):
+        try:
+            strokes = json.loads(value)
+            return render_strokes(strokes)
+        except (TypeError, ValueError, KeyError):
+            raise DrawingError('Traços do desenho em formato inválido.')
+
+    if value.startswith('data:'):
+        header, _, value = value.partition(',')
+        if header != 'data:image/png;base64':
+            raise DrawingError('O desenho deve ser uma imagem PNG em base64.')
+
+    # base64 ocupa ~4/3 do tamanho decodificado
+    if len(value) > MAX_DRAWING_BYTES * 4 // 3 + 4:
+        raise DrawingError('Desenho maior que o tamanho máximo permitido.')
+    try:
+        content = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise DrawingError('Desenho com codificação base64 inválida.')
+    return validate_png(content)
+
+
+def validate_png(content):
+    """Confere assinatura e tamanho de um PNG; devolve o próprio conteúdo"""
+    if not content.startswith(PNG_SIGNATURE):
+        raise DrawingError('O desenho deve ser uma imagem PNG.')
+    if len(content) > MAX_DRAWING_BYTES:
+        raise DrawingError('Desenho maior que o tamanho máximo permitido.')
+    return content
+
+
+def render_strokes(strokes):
+    """
+    Renderiza a lista de traços ([[{x, y, type}, ...], ...]) do formulário antigo em PNG.
+
+    Returns:
+        bytes | None: PNG, ou None sem traços ou sem Pillow
+    """
+    pillow = _load_pillow()
+    points = [
+        (float(point['x']), float(point['y']))
+        for path in strokes
+        for point in path if isinstance(point, dict) and 'x' in point and 'y' in point
+    ]
+    if pillow is None or not points:
+        return None
+
+    Image, ImageDraw = pillow
+    left = min(x for x, _ in points) - STROKE_MARGIN
+    top = min(y for _, y in points) - STROKE_MARGIN
+    width = int(max(x for x, _ in points) - left + STROKE_MARGIN) + 1
+    height = int(max(y for _, y in points) - top + STROKE_MARGIN) + 1
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    for path in strokes:
+        path_points = [
+            (float(point['x']) - left, float(point['y']) - top)
+            for point in path if isinstance(point, dict) and 'x' in point and 'y' in point
+        ]
+        if len(path_points) > 1:
+            draw.line(path_points, fill='black', width=STROKE_WIDTH, joint='curve')
+        elif path_points:
+            draw.point(path_points, fill='black')
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def make_thumbnail(content):
+    """Miniatura PNG (fundo branco) de um desenho, ou None sem Pillow"""
+    pillow = _load_pillow()
+    if pillow is None:
+        return None
+
+    Image, _ = pillow
+    with Image.open(io.BytesIO(content)) as image:
+        image = image.convert('RGBA')
+        # O canvas do formulário tem fundo transparente
+        background = Image.new('RGBA', image.size, 'white')
+        thumbnail = Image.alpha_composite(background, image).convert('RGB')
+    thumbnail.thumbnail(THUMBNAIL_SIZE)
+    output = io.BytesIO()
+    thumbnail.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def drawing_names(digest):
+    """Nomes (imagem, miniatura) no armazenamento para o SHA-256 de um desenho"""
+    path = f'{digest[:2]}/{digest}.png'
+    return f'{DRAWINGS_DIR}/{path}', f'{THUMBNAILS_DIR}/{path}'
+
+
+def _save_once(name, content):
+    # Nome derivado do conteúdo: se o arquivo já existe, é o mesmo desenho
+    if not default_storage.exists(name):
+        saved_name = default_storage.save(name, ContentFile(content))
+        if saved_name != name:
+            raise DrawingError(f'O armazenamento gravou o desenho como {saved_name} em vez de {name}.')
+    return name
+
+
+def store_drawing(content):
+    """
+    Grava um desenho PNG (e sua miniatura) no armazenamento.
+
+    Returns:
+        tuple: (nome da imagem, nome da miniatura ou '' sem Pillow)
+    """
+    validate_png(content)
+    image_name, thumbnail_name = drawing_names(hashlib.sha256(content).hexdigest())
+    _save_once(image_name, content)
+
+    if default_storage.exists(thumbnail_name):
+        return image_name, thumbnail_name
+    thumbnail = make_thumbnail(content)
+    if thumbnail is None:
+        return image_name, ''
+    return image_name, _save_once(thumbnail_name, thumbnail)
+
+
+def parse_range(header, size):
+    """
+    Interpreta um cabeçalho Range de um único intervalo de bytes.
+
+    Returns:
+        tuple | None | bool: (início, fim inclusivo); None se o cabeçalho deve
+        ser ignorado (sintaxe não suportada, ex.: vários intervalos); False se
+        o intervalo não pode ser atendido (416)
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N: os últimos N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _stream(handle, start, length):
+    try:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def drawing_response(request, name, etag):
+    """
+    Resposta com o arquivo ``name`` do armazenamento, em blocos.
+
+    Responde 304 quando o If-None-Match confere com ``etag`` e 206 para um
+    Range de um único intervalo (se o If-Range, quando presente, confere).
+
+    Raises:
+        Http404: arquivo ausente no armazenamento (ex.: disco efêmero apagado
+            em um novo deploy)
+    """
+    # Conferido antes do 304: um arquivo perdido não fica mascarado pelo cache do navegador
+    if not default_storage.exists(name):
+        raise Http404('Arquivo do desenho não encontrado no armazenamento.')
+    etag = f'"{etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            size = default_storage.size(name)
+        except FileNotFoundError:
+            raise Http404('Arquivo do desenho não encontrado no armazenamento.')
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = parse_range(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _stream(default_storage.open(name, 'rb'), start, end - start + 1),
+                status=206, content_type='image/png',
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            response = FileResponse(default_storage.open(name, 'rb'), content_type='image/png')
+            response['Content-Length'] = str(size)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    # Dados de paciente: só no cache do navegador, sempre revalidado pelo ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,85 @@
+"""
+Exportação das avaliações em fluxo (NDJSON ou CSV).
+
+As linhas são lidas com ``QuerySet.iterator()`` em blocos de
+EXPORT_CHUNK_SIZE e cada avaliação é serializada e enviada assim que lida:
+nem o QuerySet nem a resposta guardam o conjunto todo em memória, então o
+consumo é o mesmo para qualquer tamanho de exportação.
+"""
+
+import csv
+import json
+
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Avaliações lidas do banco por vez
+EXPORT_CHUNK_SIZE = 500
+
+
+class _Echo:
+    """Pseudo-arquivo do csv.writer: devolve a linha em vez de gravá-la"""
+
+    def write(self, value):
+        return value
+
+
+def _nested_fields(serializer):
+    return {
+        name for name, field in serializer.fields.items()
+        if isinstance(field, serializers.BaseSerializer)
+    }
+
+
+def csv_columns(serializer):
+    """Colunas do CSV: os campos do serializer, com os aninhados como ``relação.campo``"""
+    nested = _nested_fields(serializer)
+    columns = []
+    for name, field in serializer.fields.items():
+        if name in nested:
+            columns.extend(f'{name}.{child}' for child in field.fields)
+        else:
+            columns.append(name)
+    return columns
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+    return value
+
+
+def _flatten(data, nested):
+    row = {}
+    for name, value in data.items():
+        if name in nested and value is not None:
+            for child, child_value in value.items():
+                row[f'{name}.{child}'] = child_value
+        else:
+            row[name] = value
+    return row
+
+
+def stream_ndjson(queryset, serializer):
+    """Uma avaliação serializada (JSON) por linha"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield encoder.encode(serializer.to_representation(instance)) + '\n'
+
+
+def stream_csv(queryset, serializer):
+    """Cabeçalho e uma linha por avaliação; testes não realizados ficam em branco"""
+    columns = csv_columns(serializer)
+    nested = _nested_fields(serializer)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = _flatten(serializer.to_representation(instance), nested)
+        yield writer.writerow([_csv_value(row.get(column)) for column in columns])
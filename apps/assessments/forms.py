@@ -1,4 +1,5 @@
 from django import forms
+from .drawings import DrawingError, decode_drawing_data
 from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult, ClockDrawingResult
 
 class AssessmentForm(forms.ModelForm):
@@ -246,6 +247,9 @@ class MeemForm(forms.ModelForm):
 class ClockDrawingForm(forms.ModelForm):
     """Formulário para o Teste do Relógio"""
     
+    # PNG do canvas em data URL; gravado no armazenamento de arquivos ao salvar
+    drawing_data = forms.CharField(required=False, widget=forms.HiddenInput())
+    
     class Meta:
         model = ClockDrawingResult
         fields = [
@@ -254,7 +258,6 @@ class ClockDrawingForm(forms.ModelForm):
             'numbers_score', 
             'hands_score',
             'observations',
-            'drawing_data'
         ]
         
         widgets = {
@@ -276,7 +279,6 @@ class ClockDrawingForm(forms.ModelForm):
                 'rows': 4,
                 'placeholder': 'Descreva o processo de execução, dificuldades observadas, comportamentos durante o teste...'
             }),
-            'drawing_data': forms.HiddenInput()
         }
     
     def __init__(self, *args, **kwargs):
@@ -313,6 +315,22 @@ class ClockDrawingForm(forms.ModelForm):
         
         return cleaned_data
     
+    def clean_drawing_data(self):
+        """Decodifica o desenho em bytes PNG (None se não houver desenho)"""
+        try:
+            return decode_drawing_data(self.cleaned_data.get('drawing_data'))
+        except DrawingError as e:
+            raise forms.ValidationError(str(e))
+    
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        drawing = self.cleaned_data.get('drawing_data')
+        if drawing:
+            instance.set_drawing(drawing)
+        if commit:
+            instance.save()
+        return instance
+    
     def get_score_breakdown(self):
         """Retorna detalhamento da pontuação"""
         if not self.instance.pk:
@@ -1,7 +1,108 @@
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from apps.core.z_score_utils import normalize_z_score_for_deficit
+from .drawings import DRAWINGS_DIR, THUMBNAILS_DIR, store_drawing
+from .weights import DEFAULT_PROFILE_SLUG, WeightProfileError, compile_weight_profile
+
+# Relações um-para-um de Assessment com os resultados de teste, na ordem de AssessmentResults
+RESULT_RELATIONS = ('digit_span_result', 'tmt_result', 'stroop_result', 'meem_result', 'clock_drawing_result')
+
+# Colunas de Assessment com o Z-score normalizado (negativo = déficit) de cada teste
+NORMALIZED_Z_SCORE_FIELDS = {
+    'digit_span': 'digit_span_z_score',
+    'tmt_a': 'tmt_a_z_score',
+    'tmt_b': 'tmt_b_z_score',
+    'stroop': 'stroop_z_score',
+    'meem': 'meem_z_score',
+    'clock_drawing': 'clock_drawing_z_score',
+}
+
+
+# Situação do cálculo do risco final (Assessment.scoring_status)
+SCORING_STATUS_CHOICES = [
+    ('NONE', 'Não solicitado'),
+    ('QUEUED', 'Na fila'),
+    ('RUNNING', 'Calculando'),
+    ('DONE', 'Calculado'),
+    ('FAILED', 'Falhou'),
+]
+
+# Avaliações ainda abertas (índice parcial assess_active_idx)
+ACTIVE_STATUSES = ('PENDING', 'IN_PROGRESS')
+
+
+class AssessmentQuerySet(models.QuerySet):
+    def active(self):
+        """Avaliações pendentes ou em andamento"""
+        return self.filter(status__in=ACTIVE_STATUSES)
+    
+    def with_results(self):
+        """
+        Carrega os cinco resultados de teste no mesmo JOIN (sem uma consulta por resultado).
+        
+        Os campos pesados dos resultados (HEAVY_FIELDS) ficam adiados.
+        """
+        return self.select_related(*RESULT_RELATIONS).defer(*_deferred_result_fields())
+
+
+def _deferred_result_fields():
+    """Caminhos ``relação__campo`` dos campos pesados de todos os resultados"""
+    return [
+        f'{relation}__{field}'
+        for relation in RESULT_RELATIONS
+        for field in Assessment._meta.get_field(relation).related_model.HEAVY_FIELDS
+    ]
+
+
+class ResultQuerySet(models.QuerySet):
+    def with_heavy_fields(self):
+        """Carrega também os campos pesados (adiados por padrão)"""
+        return self.defer(None)
+
+
+class ResultManager(models.Manager.from_queryset(ResultQuerySet)):
+    """Manager padrão dos resultados: adia os campos pesados (HEAVY_FIELDS) do model"""
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.model.HEAVY_FIELDS:
+            queryset = queryset.defer(*self.model.HEAVY_FIELDS)
+        return queryset
+
+
+class AssessmentResults(NamedTuple):
+    """Resultados de teste de uma avaliação (None para testes não realizados)"""
+    digit_span: Optional['DigitSpanResult']
+    tmt: Optional['TMTResult']
+    stroop: Optional['StroopResult']
+    meem: Optional['MeemResult']
+    clock_drawing: Optional['ClockDrawingResult']
+    
+    @property
+    def completed(self):
+        """{teste: realizado?}"""
+        return {test: result is not None for test, result in self._asdict().items()}
+    
+    def present(self):
+        """Resultados realizados, na ordem dos campos"""
+        return [result for result in self if result is not None]
+    
+    def normalized_z_scores(self):
+        """Z-scores normalizados (negativo = déficit) dos testes realizados, por teste"""
+        normalized_scores = {}
+        for result in self.present():
+            for test_name, z_score in result.normalized_z_scores().items():
+                if z_score is not None:
+                    normalized_scores[test_name] = z_score
+        return normalized_scores
+
+
 class Assessment(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pendente'),
@@ -67,24 +168,178 @@ class Assessment(models.Model):
         help_text='Nível de confiança da avaliação baseado no número de testes completados'
     )
     
+    # Z-scores normalizados por teste (cópia dos resultados gravada ao concluir
+    # ou recalcular a avaliação), para estatísticas agregadas direto em SQL
+    digit_span_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - Digit Span')
+    tmt_a_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - TMT-A')
+    tmt_b_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - TMT-B')
+    stroop_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - Stroop')
+    meem_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - MEEM')
+    clock_drawing_z_score = models.FloatField(blank=True, null=True, verbose_name='Z-Score Normalizado - Teste do Relógio')
+    
+    # Protocolo de pesos do Z-score final; vazio = perfil padrão da instalação
+    weight_profile = models.ForeignKey(
+        'WeightProfile',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name='assessments',
+        verbose_name='Perfil de Pesos'
+    )
+    
+    # Situação do cálculo do risco final na fila (ScoringJob)
+    scoring_status = models.CharField(
+        max_length=10,
+        choices=SCORING_STATUS_CHOICES,
+        default='NONE',
+        verbose_name='Cálculo do Risco Final'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     
+    objects = AssessmentQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Avaliação'
         verbose_name_plural = 'Avaliações'
         ordering = ['-created_at']
+        # Filtros por paciente/avaliador/status seguidos da ordenação por data
+        # (os padrões de acesso conferidos por ``ensure_indexes --check``)
+        indexes = [
+            models.Index(fields=['-created_at'], name='assess_created_idx'),
+            models.Index(fields=['patient', '-created_at'], name='assess_patient_created_idx'),
+            models.Index(fields=['patient', 'status', '-created_at'], name='assess_patient_status_idx'),
+            models.Index(fields=['assessor', 'status', '-created_at'], name='assess_assessor_status_idx'),
+            models.Index(fields=['status', '-created_at'], name='assess_status_created_idx'),
+            models.Index(
+                fields=['-created_at'],
+                name='assess_active_idx',
+                condition=models.Q(status__in=ACTIVE_STATUSES),
+            ),
+        ]
     
     def __str__(self):
         return f"Avaliação {self.id} - {self.patient.full_name}"
     
+    @property
+    def results(self):
+        """
+        Resultados de teste da avaliação (AssessmentResults).
+        
+        Sem consultas extras quando a avaliação vem de ``with_results()``;
+        caso contrário, cada resultado ainda não carregado custa uma consulta.
+        """
+        return AssessmentResults(*(self._get_result(relation) for relation in RESULT_RELATIONS))
+    
+    def _get_result(self, relation):
+        try:
+            return getattr(self, relation)
+        except ObjectDoesNotExist:
+            return None
+    
+    def normalized_z_scores(self):
+        """Z-scores normalizados gravados na avaliação, por teste (sem consultar os resultados)"""
+        normalized_scores = {}
+        for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+            z_score = getattr(self, field)
+            if z_score is not None:
+                normalized_scores[test_name] = z_score
+        return normalized_scores
+    
+    def set_normalized_z_scores(self, normalized_scores):
+        """Copia os Z-scores normalizados dos resultados para as colunas da avaliação"""
+        for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+            setattr(self, field, normalized_scores.get(test_name))
+    
     def mark_completed(self):
         """Marca a avaliação como concluída"""
         self.status = 'COMPLETED'
         self.completed_at = timezone.now()
         self.save()
 
-class DigitSpanResult(models.Model):
+def _normalize_time_z_score(z_score):
+    if z_score is None:
+        return None
+    return normalize_z_score_for_deficit(z_score, 'time')
+
+
+class ZScoreResultMixin:
+    """
+    Cálculo do Z-score dos resultados de teste.
+    
+    O Z-score só é recalculado quando ainda não existe, quando foi calculado com
+    outra versão dos dados normativos ou quando algum campo de entrada
+    (Z_SCORE_INPUT_FIELDS) mudou desde a leitura do banco. Assim salvar um
+    resultado sem alterar as entradas não consulta as normas de novo.
+    """
+    Z_SCORE_FIELDS = ('z_score',)
+    Z_SCORE_INPUT_FIELDS = ()
+    # Campos grandes e raramente lidos, adiados nas consultas (ResultManager, with_results)
+    HEAVY_FIELDS = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_z_inputs = instance._z_score_inputs()
+        return instance
+    
+    def _z_score_inputs(self):
+        # Campos adiados (defer/only) ficam de fora da comparação
+        return {name: self.__dict__[name] for name in self.Z_SCORE_INPUT_FIELDS if name in self.__dict__}
+    
+    def z_score_is_stale(self, norm_version):
+        """Indica se o Z-score precisa ser recalculado com a versão de normas informada"""
+        if any(getattr(self, name) is None for name in self.Z_SCORE_FIELDS):
+            return True
+        if self.norm_version != norm_version:
+            return True
+        loaded = getattr(self, '_loaded_z_inputs', None)
+        if loaded is None:
+            # Instância nova com Z-score informado explicitamente
+            return False
+        return any(getattr(self, name) != value for name, value in loaded.items())
+    
+    def calculate_z_scores(self, calculator, patient):
+        """Preenche os campos de Z-score (implementado por cada resultado)"""
+        raise NotImplementedError
+    
+    def refresh_z_scores(self, calculator=None, force=False):
+        """
+        Recalcula o Z-score se estiver desatualizado (não salva).
+        
+        Returns:
+            bool: True se os campos de Z-score foram recalculados
+        """
+        if calculator is None:
+            from .services import score_calculator as calculator
+        
+        norm_version = calculator.norm_version
+        if not force and not self.z_score_is_stale(norm_version):
+            return False
+        
+        self.calculate_z_scores(calculator, self.assessment.patient)
+        self.norm_version = norm_version
+        self._loaded_z_inputs = self._z_score_inputs()
+        return True
+    
+    def prepare_for_save(self, calculator=None):
+        """
+        Preenche os campos calculados antes da gravação (Z-score e, nos testes
+        que os têm, pontuação total e interpretação). Chamado pelo ``save()``
+        e antes de ``bulk_create``, que não passa pelo ``save()``.
+        """
+        self.refresh_z_scores(calculator)
+    
+    def normalized_z_scores(self):
+        """Z-scores normalizados (negativo = déficit) por teste"""
+        raise NotImplementedError
+
+
+class DigitSpanResult(ZScoreResultMixin, models.Model):
+    Z_SCORE_INPUT_FIELDS = ('forward_score', 'backward_score')
+    
+
     assessment = models.OneToOneField(
         Assessment,
         on_delete=models.CASCADE,
@@ -118,8 +373,17 @@ class DigitSpanResult(models.Model):
         verbose_name='Z-Score'
     )
     
+    norm_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Versão das Normas',
+        help_text='Versão dos dados normativos usada no cálculo do Z-Score'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ResultManager()
+    
     class Meta:
         verbose_name = 'Resultado Span de Dígitos'
         verbose_name_plural = 'Resultados Span de Dígitos'
@@ -134,27 +398,23 @@ class DigitSpanResult(models.Model):
         backward = self.backward_score or 0
         return forward + backward
     
+    def calculate_z_scores(self, calculator, patient):
+        raw_z_score = calculator.calculate_digit_span_z_score(patient, self.total_score)
+        # Normalizar para déficit (Digit Span é teste de performance)
+        self.z_score = calculator.normalize_z_score_for_deficit(raw_z_score, 'performance')
+    
+    def normalized_z_scores(self):
+        return {'digit_span': self.z_score}
+    
     def save(self, *args, **kwargs):
         """Calcula automaticamente o Z-score normalizado"""
-        # Calcular Z-score se ainda não foi calculado
-        if self.z_score is None and self.total_score > 0:
-            from .services import AssessmentScoreCalculator
-            calculator = AssessmentScoreCalculator()
-            
-            # Calcular Z-score bruto
-            raw_z_score = calculator.calculate_digit_span_z_score(
-                self.assessment.patient, 
-                self.total_score
-            )
-            
-            # Normalizar para déficit (Digit Span é teste de performance)
-            self.z_score = calculator.normalize_z_score_for_deficit(
-                raw_z_score, 'performance'
-            )
-        
+        self.refresh_z_scores()
         super().save(*args, **kwargs)
 
-class TMTResult(models.Model):
+class TMTResult(ZScoreResultMixin, models.Model):
+    Z_SCORE_FIELDS = ('z_score_a', 'z_score_b')
+    Z_SCORE_INPUT_FIELDS = ('time_a_seconds', 'time_b_seconds', 'errors_a', 'errors_b')
+    
     assessment = models.OneToOneField(
         Assessment,
         on_delete=models.CASCADE,
@@ -192,8 +452,17 @@ class TMTResult(models.Model):
         verbose_name='Z-Score TMT-B'
     )
     
+    norm_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Versão das Normas',
+        help_text='Versão dos dados normativos usada no cálculo do Z-Score'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ResultManager()
+    
     class Meta:
         verbose_name = 'Resultado TMT'
         verbose_name_plural = 'Resultados TMT'
@@ -201,33 +470,32 @@ class TMTResult(models.Model):
     def __str__(self):
         return f"TMT - {self.assessment.patient.full_name}"
     
+    def calculate_z_scores(self, calculator, patient):
+        raw_z_score_a, raw_z_score_b = calculator.calculate_tmt_z_scores(
+            patient,
+            self.time_a_seconds,
+            self.time_b_seconds,
+            self.errors_a,
+            self.errors_b
+        )
+        # Normalizar para déficit (TMT são testes de tempo)
+        self.z_score_a = calculator.normalize_z_score_for_deficit(raw_z_score_a, 'time')
+        self.z_score_b = calculator.normalize_z_score_for_deficit(raw_z_score_b, 'time')
+    
+    def normalized_z_scores(self):
+        return {
+            'tmt_a': _normalize_time_z_score(self.z_score_a),
+            'tmt_b': _normalize_time_z_score(self.z_score_b),
+        }
+    
     def save(self, *args, **kwargs):
         """Calcula automaticamente os Z-scores normalizados"""
-        # Calcular Z-scores se ainda não foram calculados
-        if (self.z_score_a is None or self.z_score_b is None) and self.time_a_seconds and self.time_b_seconds:
-            from .services import AssessmentScoreCalculator
-            calculator = AssessmentScoreCalculator()
-            
-            # Calcular Z-scores brutos
-            raw_z_score_a, raw_z_score_b = calculator.calculate_tmt_z_scores(
-                self.assessment.patient, 
-                self.time_a_seconds, 
-                self.time_b_seconds,
-                self.errors_a,
-                self.errors_b
-            )
-            
-            # Normalizar para déficit (TMT são testes de tempo)
-            self.z_score_a = calculator.normalize_z_score_for_deficit(
-                raw_z_score_a, 'time'
-            )
-            self.z_score_b = calculator.normalize_z_score_for_deficit(
-                raw_z_score_b, 'time'
-            )
-        
+        self.refresh_z_scores()
         super().save(*args, **kwargs)
 
-class StroopResult(models.Model):
+class StroopResult(ZScoreResultMixin, models.Model):
+    Z_SCORE_INPUT_FIELDS = ('card_3_time',)
+    
     assessment = models.OneToOneField(
         Assessment,
         on_delete=models.CASCADE,
@@ -268,8 +536,17 @@ class StroopResult(models.Model):
         verbose_name='Z-Score'
     )
     
+    norm_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Versão das Normas',
+        help_text='Versão dos dados normativos usada no cálculo do Z-Score'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ResultManager()
+    
     class Meta:
         verbose_name = 'Resultado Stroop'
         verbose_name_plural = 'Resultados Stroop'
@@ -281,12 +558,25 @@ class StroopResult(models.Model):
     def interference_time(self):
         """Retorna o tempo de interferência (Cartão 3)"""
         return self.card_3_time
+    
+    def calculate_z_scores(self, calculator, patient):
+        # Persistido sem normalização (histórico); ver normalized_z_scores
+        self.z_score = calculator.calculate_stroop_z_score(patient, self.interference_time)
+    
+    def normalized_z_scores(self):
+        return {'stroop': _normalize_time_z_score(self.z_score)}
+    
+    def save(self, *args, **kwargs):
+        """Calcula automaticamente o Z-score"""
+        self.refresh_z_scores()
+        super().save(*args, **kwargs)
 
-class MeemResult(models.Model):
+class MeemResult(ZScoreResultMixin, models.Model):
     """
     Resultado do Mini Exame do Estado Mental (MEEM)
     Baseado no protocolo de Folstein & Folstein (1975)
     """
+    Z_SCORE_INPUT_FIELDS = ('total_score',)
     
     # Relacionamento
     assessment = models.OneToOneField(
@@ -499,10 +789,19 @@ class MeemResult(models.Model):
         verbose_name='Z-Score'
     )
     
+    norm_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Versão das Normas',
+        help_text='Versão dos dados normativos usada no cálculo do Z-Score'
+    )
+    
     # Metadados
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ResultManager()
+    
     class Meta:
         verbose_name = "Resultado MEEM"
         verbose_name_plural = "Resultados MEEM"
@@ -511,10 +810,20 @@ class MeemResult(models.Model):
         return f"MEEM - {self.assessment.patient.full_name} - {self.total_score}/30"
     
     def save(self, *args, **kwargs):
-        """Calcula automaticamente a pontuação total e interpretação"""
+        """Calcula automaticamente a pontuação total, interpretação e Z-score"""
+        self.prepare_for_save()
+        super().save(*args, **kwargs)
+    
+    def prepare_for_save(self, calculator=None):
         self.calculate_total_score()
         self.interpret_score()
-        super().save(*args, **kwargs)
+        super().prepare_for_save(calculator)
+    
+    def calculate_z_scores(self, calculator, patient):
+        self.z_score = calculator.calculate_meem_z_score(patient, self.total_score)
+    
+    def normalized_z_scores(self):
+        return {'meem': self.z_score}
     
     def calculate_total_score(self):
         """Calcula a pontuação total do MEEM (0-30 pontos)"""
@@ -633,11 +942,13 @@ class MeemResult(models.Model):
         else:
             return 29, ">11 anos de escolaridade"
 
-class ClockDrawingResult(models.Model):
+class ClockDrawingResult(ZScoreResultMixin, models.Model):
     """
     Resultado do Teste do Relógio (Clock Drawing Test)
     Baseado no protocolo de Cacho-Gutiérrez et al. (1999)
     """
+    Z_SCORE_INPUT_FIELDS = ('total_score',)
+    HEAVY_FIELDS = ('observations', 'drawing_data')
     
     # Relacionamento
     assessment = models.OneToOneField(
@@ -707,6 +1018,13 @@ class ClockDrawingResult(models.Model):
         verbose_name='Z-Score'
     )
     
+    norm_version = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Versão das Normas',
+        help_text='Versão dos dados normativos usada no cálculo do Z-Score'
+    )
+    
     # Classificação baseada no ponto de corte (≤6 = deterioração)
     CLASSIFICATION_CHOICES = [
         ('NORMAL', 'Normal (>6 pontos)'),
@@ -727,11 +1045,28 @@ class ClockDrawingResult(models.Model):
         help_text='Detalhes sobre o processo de execução, dificuldades observadas, etc.'
     )
     
-    # Dados do desenho (armazenado como base64)
+    # Desenho em PNG no armazenamento de arquivos (ver apps.assessments.drawings);
+    # a linha guarda só os nomes dos arquivos
+    drawing_image = models.FileField(
+        upload_to=DRAWINGS_DIR,
+        max_length=255,
+        blank=True,
+        verbose_name='Imagem do Desenho',
+        help_text='PNG nomeado pelo SHA-256 do conteúdo'
+    )
+    drawing_thumbnail = models.FileField(
+        upload_to=THUMBNAILS_DIR,
+        max_length=255,
+        blank=True,
+        verbose_name='Miniatura do Desenho'
+    )
+    
+    # Legado: desenho em base64/JSON gravado na própria linha. Esvaziado pelo
+    # comando migrate_clock_drawings, que move o conteúdo para drawing_image
     drawing_data = models.TextField(
         blank=True,
-        verbose_name='Dados do Desenho',
-        help_text='Imagem do desenho em formato base64'
+        verbose_name='Dados do Desenho (legado)',
+        help_text='Imagem do desenho em formato base64 (versões anteriores)'
     )
     
     # Metadados
@@ -742,6 +1077,8 @@ class ClockDrawingResult(models.Model):
         verbose_name='Duração (segundos)'
     )
     
+    objects = ResultManager()
+    
     class Meta:
         verbose_name = 'Resultado do Teste do Relógio'
         verbose_name_plural = 'Resultados do Teste do Relógio'
@@ -751,7 +1088,15 @@ class ClockDrawingResult(models.Model):
         return f"Clock Drawing - {self.assessment.patient.full_name} ({self.total_score}/10)"
     
     def save(self, *args, **kwargs):
-        # Calcular pontuação total automaticamente
+        self.prepare_for_save()
+        super().save(*args, **kwargs)
+    
+    def prepare_for_save(self, calculator=None):
+        self.calculate_total_score()
+        super().prepare_for_save(calculator)
+    
+    def calculate_total_score(self):
+        """Calcula a pontuação total (0-10) e a classificação pelo ponto de corte"""
         self.total_score = self.circle_score + self.numbers_score + self.hands_score
         
         # Determinar classificação baseada no ponto de corte
@@ -759,8 +1104,22 @@ class ClockDrawingResult(models.Model):
             self.classification = 'NORMAL'
         else:
             self.classification = 'IMPAIRED'
-        
-        super().save(*args, **kwargs)
+    
+    def calculate_z_scores(self, calculator, patient):
+        self.z_score = calculator.calculate_clock_drawing_z_score(patient, self.total_score)
+    
+    def set_drawing(self, content):
+        """Grava o PNG do desenho (e a miniatura) no armazenamento e guarda a referência"""
+        self.drawing_image.name, self.drawing_thumbnail.name = store_drawing(content)
+        self.drawing_data = ''
+    
+    @property
+    def drawing_etag(self):
+        """SHA-256 do desenho (parte do nome do arquivo), usado como ETag"""
+        return Path(self.drawing_image.name).stem if self.drawing_image else None
+    
+    def normalized_z_scores(self):
+        return {'clock_drawing': self.z_score}
     
     def get_component_scores(self):
         """Retorna dicionário com pontuações por componente"""
@@ -806,4 +1165,263 @@ class ClockDrawingResult(models.Model):
         elif self.numbers_score >= 2:
             feedback.append("△ Números presentes mas com alguns erros")
         else:
-            feedback.append("✗ Números ausentes ou incorretos")
\ No newline at end of file
+            feedback.append("✗ Números ausentes ou incorretos")
+class DailyAssessmentStats(models.Model):
+    """
+    Estatísticas diárias pré-agregadas das avaliações (rollup).
+
+    Uma linha por (dia, status, teste). A linha com teste ``ALL`` guarda apenas
+    a contagem de avaliações do dia; as demais guardam a soma, a soma dos
+    quadrados e a distribuição por faixa dos Z-scores normalizados do teste.
+    Mantida por signals (ver ``apps.assessments.signals``) e reconstruída pelo
+    comando ``rebuild_daily_stats``.
+    """
+    TEST_CHOICES = [
+        ('ALL', 'Todas as avaliações'),
+        ('digit_span', 'Span de Dígitos'),
+        ('tmt_a', 'TMT-A'),
+        ('tmt_b', 'TMT-B'),
+        ('stroop', 'Stroop'),
+        ('meem', 'MEEM'),
+        ('clock_drawing', 'Teste do Relógio'),
+    ]
+    
+    date = models.DateField(verbose_name='Data')
+    
+    status = models.CharField(
+        max_length=15,
+        choices=Assessment.STATUS_CHOICES,
+        verbose_name='Status'
+    )
+    
+    test = models.CharField(
+        max_length=15,
+        choices=TEST_CHOICES,
+        verbose_name='Teste'
+    )
+    
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Contagem'
+    )
+    
+    z_score_sum = models.FloatField(
+        default=0.0,
+        verbose_name='Soma dos Z-Scores normalizados'
+    )
+    
+    z_score_sum_squares = models.FloatField(
+        default=0.0,
+        verbose_name='Soma dos quadrados dos Z-Scores normalizados'
+    )
+    
+    # Faixas de déficit (mesmos cortes do dashboard de pacientes)
+    below_normal_count = models.IntegerField(
+        default=0,
+        verbose_name='Abaixo do normal (Z < -1.5)'
+    )
+    
+    normal_count = models.IntegerField(
+        default=0,
+        verbose_name='Normal (-1.5 ≤ Z ≤ 1.5)'
+    )
+    
+    above_normal_count = models.IntegerField(
+        default=0,
+        verbose_name='Acima do normal (Z > 1.5)'
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estatística Diária de Avaliações'
+        verbose_name_plural = 'Estatísticas Diárias de Avaliações'
+        ordering = ['date', 'status', 'test']
+        unique_together = [('date', 'status', 'test')]
+    
+    def __str__(self):
+        return f"{self.date} - {self.status} - {self.test}: {self.count}"
+    
+    @property
+    def z_score_mean(self):
+        """Média dos Z-scores normalizados do dia"""
+        if not self.count:
+            return None
+        return self.z_score_sum / self.count
+
+
+class NormativeDataVersion(models.Model):
+    """
+    Versão dos dados normativos usada no cálculo dos Z-scores.
+
+    O conteúdo segue o formato de ``normative_data.json`` e é validado antes de
+    ser gravado. No máximo uma versão fica ativa; a troca é feita em uma
+    transação pelo comando ``activate_normative_data`` e os processos passam a
+    usá-la sem reinício (ver ``apps.assessments.norm_store``). Versões não são
+    alteradas depois de criadas, de forma que um Z-score pode ser recalculado
+    com a mesma versão registrada no resultado.
+    """
+    version = models.CharField(
+        max_length=20,
+        unique=True,
+        verbose_name='Versão'
+    )
+    
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Descrição'
+    )
+    
+    data = models.JSONField(
+        verbose_name='Dados Normativos'
+    )
+    
+    is_active = models.BooleanField(
+        default=False,
+        verbose_name='Ativa'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Versão dos Dados Normativos'
+        verbose_name_plural = 'Versões dos Dados Normativos'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='unique_active_normative_data_version',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Normas {self.version}{' (ativa)' if self.is_active else ''}"
+
+
+class ScoringJob(models.Model):
+    """
+    Cálculo do risco final de uma avaliação, na fila do banco.
+
+    Criado ao submeter/finalizar uma avaliação e processado pelo comando
+    ``process_scoring_jobs`` (ver ``apps.assessments.scoring_queue``). A chave
+    de idempotência identifica a avaliação e os resultados que ela tinha no
+    pedido: pedir o mesmo cálculo de novo devolve o job existente. Falhas são
+    repetidas com espera crescente até ``max_attempts``.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendente'),
+        ('RUNNING', 'Em execução'),
+        ('DONE', 'Concluído'),
+        ('FAILED', 'Falhou'),
+    ]
+    
+    assessment = models.ForeignKey(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='scoring_jobs',
+        verbose_name='Avaliação'
+    )
+    
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Chave de Idempotência'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='PENDING',
+        verbose_name='Status'
+    )
+    
+    attempts = models.IntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    
+    max_attempts = models.IntegerField(
+        default=5,
+        verbose_name='Máximo de Tentativas'
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último Erro'
+    )
+    
+    # Próxima execução (espera entre tentativas)
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Executar a partir de')
+    locked_at = models.DateTimeField(blank=True, null=True, verbose_name='Início da Execução')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Cálculo de Risco Final'
+        verbose_name_plural = 'Cálculos de Risco Final'
+        ordering = ['-created_at']
+        indexes = [
+            # Busca dos próximos jobs pelo worker
+            models.Index(fields=['status', 'run_after'], name='scoring_job_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Cálculo {self.id} - Avaliação {self.assessment_id} ({self.status})"
+
+
+class WeightProfile(models.Model):
+    """
+    Perfil de pesos por domínio cognitivo do Z-score final.
+
+    ``weights`` traz o peso de cada domínio e a composição do TMT, no formato
+    ``{"digit_span": 1.5, "tmt": 2.0, "stroop": 1.8, "meem": 2.5,
+    "clock_drawing": 1.2, "tmt_a": 0.4, "tmt_b": 0.6}``. A avaliação usa o
+    perfil escolhido nela ou, sem perfil, o de ``settings.DEFAULT_WEIGHT_PROFILE``
+    (ver ``apps.assessments.weights``). Os pesos não são alterados depois de
+    criados: para mudar pesos cadastra-se outro perfil e as avaliações são
+    recalculadas com ``rescore_assessments --weights-only``.
+    """
+    slug = models.SlugField(
+        max_length=40,
+        unique=True,
+        verbose_name='Identificador'
+    )
+    
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Nome'
+    )
+    
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Descrição'
+    )
+    
+    weights = models.JSONField(
+        verbose_name='Pesos'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Perfil de Pesos'
+        verbose_name_plural = 'Perfis de Pesos'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.slug})"
+    
+    def clean(self):
+        if self.slug == DEFAULT_PROFILE_SLUG:
+            raise ValidationError({'slug': f'"{DEFAULT_PROFILE_SLUG}" é reservado ao perfil padrão embutido'})
+        try:
+            compile_weight_profile(self.weights, self.slug)
+        except WeightProfileError as e:
+            raise ValidationError({'weights': str(e)})
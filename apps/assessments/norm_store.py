@@ -0,0 +1,198 @@
+"""
+Armazenamento versionado dos dados normativos.
+
+A versão ativa fica na tabela NormativeDataVersion. Cada processo mantém a
+NormTable compilada em memória e verifica no banco, no máximo a cada
+``settings.NORMS_REFRESH_SECONDS`` segundos, se a versão ativa mudou; quando
+muda, a nova tabela é compilada e trocada por referência (troca atômica para as
+threads do processo). Sem versão ativa no banco, vale o arquivo
+``normative_data.json`` distribuído com o código.
+"""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .norms import NormativeDataError, compile_norm_table
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_NORMS_PATH = Path(__file__).parent / 'normative_data.json'
+
+# Intervalo padrão entre verificações da versão ativa (segundos)
+DEFAULT_REFRESH_SECONDS = 30
+
+
+def load_bundled_normative_data():
+    """Lê o arquivo de dados normativos distribuído com o código"""
+    with open(BUNDLED_NORMS_PATH, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+class NormStore:
+    """
+    Fornece a NormTable da versão ativa e de versões específicas.
+
+    Args:
+        default_table: tabela usada quando não há versão ativa no banco
+    """
+
+    def __init__(self, default_table):
+        self.default_table = default_table
+        self._active_table = default_table
+        self._active_pk = None
+        self._checked_at = None
+        self._tables_by_version = {}
+        self._lock = threading.Lock()
+
+    @property
+    def refresh_seconds(self):
+        return getattr(settings, 'NORMS_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+
+    def get_active_table(self):
+        """NormTable da versão ativa (recarregada se a versão ativa mudou)"""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.refresh_seconds:
+            self.refresh()
+        return self._active_table
+
+    def refresh(self, force=False):
+        """Verifica a versão ativa no banco e troca a tabela se necessário"""
+        from .models import NormativeDataVersion
+
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+
+            try:
+                active = NormativeDataVersion.objects.filter(is_active=True).values_list('pk', 'version').first()
+            except DatabaseError:
+                # Tabela ainda não criada (antes do migrate): mantém o arquivo
+                logger.debug("Tabela de versões normativas indisponível; usando arquivo", exc_info=True)
+                return
+
+            if active is None:
+                self._active_pk = None
+                self._active_table = self.default_table
+                return
+
+            pk, version = active
+            if pk == self._active_pk:
+                return
+            try:
+                table = self.get_table(version)
+            except NormativeDataError:
+                logger.exception("Versão normativa ativa %s inválida; mantendo %s", version, self._active_table.version)
+                return
+            self._active_pk = pk
+            self._active_table = table
+            logger.info("Dados normativos ativos: versão %s", version)
+
+    def get_table(self, version):
+        """
+        NormTable de uma versão específica (cadastrada no banco ou a do arquivo).
+
+        Raises:
+            NormativeDataError: se a versão não existir
+        """
+        table = self._tables_by_version.get(version)
+        if table is not None:
+            return table
+
+        from .models import NormativeDataVersion
+
+        # A versão do arquivo é reservada: nunca é lida do banco
+        data = None
+        if version != self.default_table.version:
+            data = NormativeDataVersion.objects.filter(version=version).values_list('data', flat=True).first()
+        if data is not None:
+            table = compile_norm_table(data, version=version)
+        elif version == self.default_table.version:
+            table = self.default_table
+        else:
+            raise NormativeDataError(f"Versão de dados normativos não encontrada: {version}")
+
+        # Versões não mudam depois de criadas, então a tabela compilada pode ser reaproveitada
+        self._tables_by_version[version] = table
+        return table
+
+
+def create_norm_version(data, version=None, description='', activate=False):
+    """
+    Valida e grava uma nova versão dos dados normativos.
+
+    A versão identifica as normas nas chaves do cache de pontuação e no
+    registro dos resultados, então não pode repetir a de outra versão (sem
+    diferenciar maiúsculas) nem a do arquivo distribuído.
+
+    Args:
+        data: dicionário no formato de ``normative_data.json``
+        version: versão (padrão: ``metadata.version``)
+        activate: se True, torna a nova versão ativa na mesma transação
+
+    Raises:
+        NormativeDataError: se os dados forem incompletos ou a versão já existir
+        ou for a do arquivo distribuído
+    """
+    from .models import NormativeDataVersion
+    from .services import score_calculator
+
+    version = str(version or data.get('metadata', {}).get('version') or '').strip()
+    if not version:
+        raise NormativeDataError("Versão não informada (use metadata.version ou --norm-version)")
+    bundled_version = score_calculator.norm_store.default_table.version
+    if bundled_version and version.lower() == str(bundled_version).lower():
+        raise NormativeDataError(
+            f"Versão {version} é a do arquivo distribuído; cadastre os dados com outra versão (--norm-version)"
+        )
+
+    compile_norm_table(data, version=version)
+
+    try:
+        with transaction.atomic():
+            if NormativeDataVersion.objects.filter(version__iexact=version).exists():
+                raise NormativeDataError(f"Versão de dados normativos já existe: {version}")
+            norm_version = NormativeDataVersion.objects.create(
+                version=version,
+                description=description,
+                data=data,
+            )
+            if activate:
+                activate_norm_version(version)
+                norm_version.refresh_from_db()
+    except IntegrityError:
+        # Cadastro concorrente da mesma versão (version é única no banco)
+        raise NormativeDataError(f"Versão de dados normativos já existe: {version}")
+    return norm_version
+
+
+def activate_norm_version(version):
+    """
+    Torna uma versão ativa (as demais são desativadas na mesma transação).
+
+    Raises:
+        NormativeDataError: se a versão não existir
+    """
+    from .models import NormativeDataVersion
+
+    with transaction.atomic():
+        versions = NormativeDataVersion.objects.select_for_update()
+        if not versions.filter(version=version).exists():
+            raise NormativeDataError(f"Versão de dados normativos não encontrada: {version}")
+        versions.filter(is_active=True).exclude(version=version).update(is_active=False)
+        versions.filter(version=version).update(is_active=True, activated_at=timezone.now())
+
+
+def deactivate_norm_versions():
+    """Desativa todas as versões do banco (volta a valer o arquivo distribuído)"""
+    from .models import NormativeDataVersion
+
+    NormativeDataVersion.objects.filter(is_active=True).update(is_active=False)
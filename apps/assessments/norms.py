@@ -0,0 +1,334 @@
+"""
+Tabela normativa compilada.
+
+Os dados normativos (``normative_data.json`` ou uma versão cadastrada em
+``NormativeDataVersion``) são compilados uma única vez em matrizes densas
+indexadas por (teste, faixa etária, faixa de escolaridade), com média e desvio
+padrão. As matrizes são somente leitura, então
+a mesma tabela é compartilhada por todo o processo (e entre os workers do
+Gunicorn quando a aplicação é carregada com ``--preload``).
+
+Formato de cada teste nos dados normativos::
+
+    "tmt_a": {
+        "60-69": {"low_education": {"mean": 42.3, "sd": 16.7}, "high_education": {...}},
+        ...
+    }
+
+Rótulos de faixa etária aceitos: ``"A-B"``, ``"A+"``, ``"<A"`` e ``"all"``.
+Chaves iniciadas por ``_`` são opções do teste (ex.: ``"_education_rule"``).
+"""
+
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Testes que toda versão de dados normativos precisa cobrir
+REQUIRED_TESTS = ("tmt_a", "tmt_b", "digit_span", "stroop", "meem", "clock_drawing")
+
+# Faixas etárias históricas (AssessmentScoreCalculator._get_age_group)
+AGE_GROUPS = ("50-59", "60-69", "70-79", "80+")
+EDUCATION_GROUPS = ("low_education", "high_education")
+
+# Faixas etárias internas da tabela: <50, 50-59, 60-64, 65-69, 70-74, 75-79, 80+.
+# Os rótulos dos dados normativos precisam coincidir com estes limites.
+AGE_BAND_EDGES = (50, 60, 65, 70, 75, 80)
+AGE_BANDS = ("<50", "50-59", "60-64", "65-69", "70-74", "75-79", "80+")
+
+# Regras de faixa de escolaridade por teste
+# - education_group: nível de escolaridade (ou anos > 7), ver _get_education_group
+# - education_years_gt_8: anos de estudo > 8 (vazio ou zero contam como 8)
+EDUCATION_RULES = ("education_group", "education_years_gt_8")
+DEFAULT_EDUCATION_RULE = "education_group"
+
+# Faixa usada para idades não cobertas por nenhum rótulo (histórico: idades
+# abaixo de 50 usam as normas de "80+")
+DEFAULT_AGE_FALLBACK = "80+"
+
+# Maior idade com faixa pré-calculada; idades acima usam a última posição
+MAX_INDEXED_AGE = 130
+
+_AGE_LABEL_RANGE = re.compile(r'^(\d+)-(\d+)$')
+_AGE_LABEL_PLUS = re.compile(r'^(\d+)\+$')
+_AGE_LABEL_BELOW = re.compile(r'^<(\d+)$')
+
+
+def _age_group_index(age):
+    if 50 <= age <= 59:
+        return 0
+    elif 60 <= age <= 69:
+        return 1
+    elif 70 <= age <= 79:
+        return 2
+    return 3
+
+
+# Faixa etária histórica de cada idade inteira (0..MAX_INDEXED_AGE)
+AGE_GROUP_BY_AGE = np.array([_age_group_index(age) for age in range(MAX_INDEXED_AGE + 1)], dtype=np.intp)
+AGE_GROUP_BY_AGE.flags.writeable = False
+
+# Faixa etária interna de cada idade inteira (0..MAX_INDEXED_AGE): consulta O(1)
+AGE_BAND_BY_AGE = np.searchsorted(AGE_BAND_EDGES, np.arange(MAX_INDEXED_AGE + 1), side='right').astype(np.intp)
+AGE_BAND_BY_AGE.flags.writeable = False
+
+
+class NormativeDataError(KeyError):
+    """Dados normativos incompletos ou inválidos"""
+
+    def __str__(self):
+        return str(self.args[0]) if self.args else ''
+
+
+def parse_age_label(label):
+    """
+    Converte um rótulo de faixa etária nas faixas internas que ele cobre.
+
+    Raises:
+        NormativeDataError: se o rótulo for inválido ou não coincidir com AGE_BAND_EDGES
+    """
+    bounds = (0,) + AGE_BAND_EDGES + (MAX_INDEXED_AGE + 1,)
+
+    if label == 'all':
+        low, high = 0, MAX_INDEXED_AGE + 1
+    elif _AGE_LABEL_RANGE.match(label):
+        start, end = _AGE_LABEL_RANGE.match(label).groups()
+        low, high = int(start), int(end) + 1
+    elif _AGE_LABEL_PLUS.match(label):
+        low, high = int(_AGE_LABEL_PLUS.match(label).group(1)), MAX_INDEXED_AGE + 1
+    elif _AGE_LABEL_BELOW.match(label):
+        low, high = 0, int(_AGE_LABEL_BELOW.match(label).group(1))
+    else:
+        raise NormativeDataError(f"Faixa etária inválida: {label}")
+
+    if low not in bounds or high not in bounds or low >= high:
+        raise NormativeDataError(
+            f"Faixa etária {label} não coincide com os limites suportados {AGE_BAND_EDGES}"
+        )
+    return list(range(bounds.index(low), bounds.index(high)))
+
+
+class NormTable:
+    """
+    Tabela normativa compilada e somente leitura.
+
+    Attributes:
+        tests: nomes dos testes, na ordem do primeiro eixo das matrizes
+        test_ids: {nome do teste: índice}
+        education_rules: {nome do teste: regra de faixa de escolaridade}
+        mean, sd: matrizes (testes x AGE_BANDS x EDUCATION_GROUPS)
+        version: versão dos dados normativos
+    """
+
+    def __init__(self, tests, mean, sd, version=None, education_rules=None):
+        self.tests = tuple(tests)
+        self.test_ids = {test: i for i, test in enumerate(self.tests)}
+        self.education_rules = dict(education_rules or {})
+        self.mean = mean
+        self.sd = sd
+        self.version = version
+        for array in (self.mean, self.sd):
+            array.flags.writeable = False
+
+    def __contains__(self, test_name):
+        return test_name in self.test_ids
+
+    def __repr__(self):
+        return f"<NormTable version={self.version} tests={self.tests}>"
+
+    def education_rule(self, test_name):
+        return self.education_rules.get(test_name, DEFAULT_EDUCATION_RULE)
+
+    @staticmethod
+    def age_group_index(age):
+        """Índice da faixa etária histórica (AGE_GROUPS) de uma idade"""
+        return int(AGE_GROUP_BY_AGE[min(max(int(age), 0), MAX_INDEXED_AGE)])
+
+    @staticmethod
+    def age_group_indices(ages):
+        """Índices das faixas etárias históricas de um array de idades"""
+        ages = np.clip(np.asarray(ages).astype(np.intp), 0, MAX_INDEXED_AGE)
+        return AGE_GROUP_BY_AGE[ages]
+
+    @staticmethod
+    def age_band_index(age):
+        """Índice da faixa etária interna de uma idade"""
+        return int(AGE_BAND_BY_AGE[min(max(int(age), 0), MAX_INDEXED_AGE)])
+
+    @staticmethod
+    def age_band_indices(ages):
+        """Índices das faixas etárias internas de um array de idades"""
+        ages = np.clip(np.asarray(ages).astype(np.intp), 0, MAX_INDEXED_AGE)
+        return AGE_BAND_BY_AGE[ages]
+
+    @staticmethod
+    def education_group_index(education_group):
+        """Índice de um grupo educacional ('low_education'/'high_education')"""
+        return EDUCATION_GROUPS.index(education_group)
+
+    @staticmethod
+    def education_group_indices(education_groups):
+        """Índices de um array de grupos educacionais (strings ou índices)"""
+        education_groups = np.asarray(education_groups)
+        if education_groups.dtype.kind in 'iu':
+            return education_groups.astype(np.intp)
+        return (education_groups == EDUCATION_GROUPS[1]).astype(np.intp)
+
+    def _test_id(self, test_name):
+        if test_name not in self.test_ids:
+            raise NormativeDataError(f"Teste sem dados normativos: {test_name}")
+        return self.test_ids[test_name]
+
+    def _missing_error(self, test_name, band_idx, edu_idx):
+        return NormativeDataError(
+            f"Normas {test_name} faltando para faixa etária {AGE_BANDS[band_idx]} "
+            f"education_group={EDUCATION_GROUPS[edu_idx]}"
+        )
+
+    def lookup(self, test_name, age, education_group):
+        """
+        Média e desvio padrão de um teste para uma idade e grupo educacional.
+
+        Returns:
+            tuple: (mean, sd) como floats
+        """
+        test_id = self._test_id(test_name)
+        band_idx = self.age_band_index(age)
+        edu_idx = self.education_group_index(education_group)
+        mean = self.mean[test_id, band_idx, edu_idx]
+        sd = self.sd[test_id, band_idx, edu_idx]
+        if np.isnan(mean) or np.isnan(sd):
+            raise self._missing_error(test_name, band_idx, edu_idx)
+        return float(mean), float(sd)
+
+    def lookup_batch(self, test_name, ages, education_groups):
+        """
+        Médias e desvios padrão de um teste para arrays de idades e grupos.
+
+        Returns:
+            tuple: (means, sds) como arrays
+        """
+        test_id = self._test_id(test_name)
+        band_idx = self.age_band_indices(ages)
+        edu_idx = self.education_group_indices(education_groups)
+        means = self.mean[test_id][band_idx, edu_idx]
+        sds = self.sd[test_id][band_idx, edu_idx]
+        missing = np.isnan(means) | np.isnan(sds)
+        if missing.any():
+            first = int(np.argmax(missing))
+            raise self._missing_error(test_name, band_idx[first], edu_idx[first])
+        return means, sds
+
+
+def _compile_test(test_name, section, age_fallback):
+    """
+    Compila a seção de um teste em matrizes (AGE_BANDS x EDUCATION_GROUPS).
+
+    Returns:
+        tuple: (mean, sd, regra de escolaridade, lista de células ausentes)
+    """
+    shape = (len(AGE_BANDS), len(EDUCATION_GROUPS))
+    mean = np.full(shape, np.nan)
+    sd = np.full(shape, np.nan)
+
+    education_rule = section.get('_education_rule', DEFAULT_EDUCATION_RULE)
+    if education_rule not in EDUCATION_RULES:
+        raise NormativeDataError(f"Regra de escolaridade inválida para {test_name}: {education_rule}")
+
+    band_labels = {}
+    for label, groups in section.items():
+        if label.startswith('_'):
+            continue
+        for band in parse_age_label(label):
+            band_labels[band] = label
+
+    missing = []
+    for band, band_name in enumerate(AGE_BANDS):
+        label = band_labels.get(band)
+        if label is None and age_fallback in section:
+            label = age_fallback
+        for e, education_group in enumerate(EDUCATION_GROUPS):
+            norms = section.get(label, {}).get(education_group) if label else None
+            if _valid_cell(norms):
+                mean[band, e] = norms["mean"]
+                sd[band, e] = norms["sd"]
+            else:
+                missing.append((test_name, band_name, education_group))
+    return mean, sd, education_rule, missing
+
+
+def _compile_sections(normative_data):
+    metadata = normative_data.get("metadata", {})
+    age_fallback = metadata.get("age_fallback", DEFAULT_AGE_FALLBACK)
+
+    tests = []
+    means = []
+    sds = []
+    education_rules = {}
+    missing = []
+    for test_name, section in normative_data.items():
+        if test_name in ("metadata", "education_criteria", "notes") or not isinstance(section, dict):
+            continue
+        mean, sd, education_rule, test_missing = _compile_test(test_name, section, age_fallback)
+        tests.append(test_name)
+        means.append(mean)
+        sds.append(sd)
+        education_rules[test_name] = education_rule
+        missing.extend(test_missing)
+
+    for test_name in REQUIRED_TESTS:
+        if test_name not in tests:
+            missing.append((test_name, '*', '*'))
+    return tests, means, sds, education_rules, missing
+
+
+def find_missing_cells(normative_data):
+    """
+    Lista as células (teste, faixa etária, grupo educacional) ausentes ou
+    inválidas nos dados normativos, incluindo testes obrigatórios ausentes.
+    """
+    return _compile_sections(normative_data)[-1]
+
+
+def compile_norm_table(normative_data, allow_missing=False, version=None):
+    """
+    Compila os dados normativos em uma NormTable.
+
+    Args:
+        normative_data: dicionário no formato de ``normative_data.json``
+        allow_missing: se True, células ausentes ficam como NaN e só geram erro
+            quando consultadas; caso contrário a compilação falha
+        version: versão a registrar na tabela (padrão: ``metadata.version``)
+
+    Raises:
+        NormativeDataError: se houver células ausentes e allow_missing for False
+    """
+    tests, means, sds, education_rules, missing = _compile_sections(normative_data)
+
+    if missing and not allow_missing:
+        cells = ', '.join(f"{test}/{age}/{edu}" for test, age, edu in missing)
+        raise NormativeDataError(f"Dados normativos incompletos: {cells}")
+    if missing:
+        logger.warning("Dados normativos incompletos (%d células ausentes)", len(missing))
+
+    shape = (len(tests), len(AGE_BANDS), len(EDUCATION_GROUPS))
+    mean = np.stack(means) if means else np.empty(shape)
+    sd = np.stack(sds) if sds else np.empty(shape)
+    return NormTable(
+        tests, mean, sd,
+        version=version or normative_data.get("metadata", {}).get("version"),
+        education_rules=education_rules,
+    )
+
+
+def _valid_cell(norms):
+    if not isinstance(norms, dict):
+        return False
+    try:
+        mean = float(norms["mean"])
+        sd = float(norms["sd"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return bool(np.isfinite(mean) and np.isfinite(sd) and sd >= 0)
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AssessmentCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) da listagem de avaliações.
+
+    A próxima página continua a partir da última avaliação vista
+    (``created_at`` e ``id``) em vez de ``OFFSET``, e não há ``COUNT(*)``:
+    o custo de cada página não cresce com o histórico. A ordenação segue o
+    índice ``assess_created_idx`` (ou o índice por status quando filtrado).
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
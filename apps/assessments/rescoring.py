@@ -0,0 +1,453 @@
+"""
+Recálculo em lote dos Z-scores e do risco final das avaliações concluídas.
+
+As avaliações são lidas em blocos por chave primária (``pk > último pk``), só
+com os campos necessários (``values()`` + ``iterator()``). Cada bloco é
+pontuado com o cálculo vetorizado do AssessmentScoreCalculator, opcionalmente
+em um pool de processos, e gravado com ``bulk_update``. A memória usada depende
+do tamanho do bloco, não do volume do histórico.
+
+O resultado é idêntico ao de ``calculate_final_risk_score`` com os Z-scores
+recalculados pela mesma versão das normas.
+
+Quando só os pesos mudam (outro perfil de pesos), ``reweight_rows`` recalcula o
+Z-score final e o risco a partir dos Z-scores normalizados já gravados na
+avaliação, sem ler nem gravar as tabelas de resultados.
+
+``backfill_normalized_z_scores`` só preenche as colunas normalizadas vazias a
+partir dos Z-scores gravados nos resultados: nada é recalculado (a idade do
+paciente na data da avaliação não muda o histórico).
+"""
+
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Q
+
+from apps.core.view_cache import bump_all_data_versions
+from apps.core.z_score_utils import get_test_type, normalize_z_score_for_deficit
+from .daily_stats import TEST_Z_SCORE_COLUMNS, assessment_local_date, refresh_daily_stats
+from .models import (
+    NORMALIZED_Z_SCORE_FIELDS, Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult,
+    ClockDrawingResult,
+)
+from .services import score_calculator
+from .weights import WeightVector
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Campos do Assessment atualizados pelo recálculo
+ASSESSMENT_SCORE_FIELDS = (
+    'final_z_score', 'final_risk_score', 'total_tests_completed', 'confidence_level',
+    *NORMALIZED_Z_SCORE_FIELDS.values(),
+)
+
+# Resultado de teste: relação em Assessment, model e campos de Z-score
+RESULT_MODELS = {
+    'digit_span_result': DigitSpanResult,
+    'tmt_result': TMTResult,
+    'stroop_result': StroopResult,
+    'meem_result': MeemResult,
+    'clock_drawing_result': ClockDrawingResult,
+}
+
+ROW_FIELDS = (
+    'pk', 'created_at', 'weight_profile_id', *ASSESSMENT_SCORE_FIELDS,
+    'patient__birth_date', 'patient__education_level', 'patient__education_years',
+    'digit_span_result__id', 'digit_span_result__forward_score', 'digit_span_result__backward_score',
+    'digit_span_result__z_score', 'digit_span_result__norm_version',
+    'tmt_result__id', 'tmt_result__time_a_seconds', 'tmt_result__time_b_seconds',
+    'tmt_result__z_score_a', 'tmt_result__z_score_b', 'tmt_result__norm_version',
+    'stroop_result__id', 'stroop_result__card_3_time', 'stroop_result__z_score', 'stroop_result__norm_version',
+    'meem_result__id', 'meem_result__total_score', 'meem_result__z_score', 'meem_result__norm_version',
+    'clock_drawing_result__id', 'clock_drawing_result__total_score', 'clock_drawing_result__z_score',
+    'clock_drawing_result__norm_version',
+)
+
+# Campos lidos quando só os pesos mudam (sem as tabelas de resultados)
+REWEIGHT_ROW_FIELDS = ('pk', 'created_at', 'weight_profile_id', *ASSESSMENT_SCORE_FIELDS)
+
+# Campos lidos no preenchimento das colunas normalizadas vazias
+BACKFILL_ROW_FIELDS = ('pk', *NORMALIZED_Z_SCORE_FIELDS.values(), *TEST_Z_SCORE_COLUMNS.values())
+
+# Dados do paciente no formato esperado por get_patient_arrays
+PatientInputs = namedtuple('PatientInputs', ['age', 'education_level', 'education_years'])
+
+# Resultado da pontuação de uma avaliação
+RescoredAssessment = namedtuple(
+    'RescoredAssessment', ['pk', 'created_at', 'old_risk', 'new_risk', 'assessment_fields', 'result_updates']
+)
+
+
+def _age(birth_date, today):
+    # Mesmo cálculo de Patient.age
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def _present(rows, relation):
+    return np.array([row[f'{relation}__id'] is not None for row in rows], dtype=bool)
+
+
+def _column(rows, field, mask):
+    return np.array([row[field] for row, present in zip(rows, mask) if present], dtype=np.float64)
+
+
+def _scatter(values, mask):
+    """Espalha os valores dos resultados existentes em um array do tamanho do bloco (NaN nos ausentes)"""
+    full = np.full(len(mask), np.nan)
+    full[mask] = values
+    return full
+
+
+def _row_weights(rows, weights):
+    """Pesos (avaliações x DOMAINS) e composição do TMT (avaliações x 2) de cada linha"""
+    if weights is not None:
+        return weights.weights, weights.tmt_weights
+    store = score_calculator.weight_store
+    vectors = {profile_id: store.get(profile_id) for profile_id in {row['weight_profile_id'] for row in rows}}
+    row_vectors = [vectors[row['weight_profile_id']] for row in rows]
+    return (
+        np.array([vector.weights for vector in row_vectors]).reshape(len(rows), -1),
+        np.array([vector.tmt_weights for vector in row_vectors]).reshape(len(rows), 2),
+    )
+
+
+def _rescored(rows, normalized, weights, result_updates_for):
+    """
+    Z-score final e risco de cada linha e os campos a gravar.
+
+    Args:
+        normalized: {teste: Z-scores normalizados} (NaN nos ausentes)
+        weights: WeightVector aplicado a todas as linhas (gravado como perfil da
+            avaliação) ou None para o perfil de cada avaliação
+        result_updates_for: função (posição da linha, linha) -> resultados a atualizar
+    """
+    domain_weights, tmt_weights = _row_weights(rows, weights)
+    # Produto escalar dos Z-scores por domínio com os pesos do perfil de cada linha
+    domain_z_scores = WeightVector.domain_z_scores(normalized, tmt_weights)
+    final_z_scores, total_weight, tests_completed = WeightVector.final_z_scores(domain_z_scores, domain_weights)
+    risk_scores = score_calculator.classify_risk_batch(final_z_scores)
+
+    rescored = []
+    final_list = final_z_scores.tolist()
+    normalized_lists = {test: values.tolist() for test, values in normalized.items()}
+    for i, row in enumerate(rows):
+        if total_weight[i] <= 0:
+            continue
+
+        tests = int(tests_completed[i])
+        assessment_fields = {
+            'final_z_score': round(final_list[i], 3),
+            'final_risk_score': str(risk_scores[i]),
+            'total_tests_completed': tests,
+            'confidence_level': min(100, (tests / 5) * 100),
+        }
+        for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+            z_score = normalized_lists[test_name][i]
+            assessment_fields[field] = None if np.isnan(z_score) else z_score
+        if weights is not None:
+            assessment_fields['weight_profile_id'] = weights.profile_id
+        new_risk = assessment_fields['final_risk_score']
+        if all(row[field] == value for field, value in assessment_fields.items()):
+            assessment_fields = None
+
+        rescored.append(RescoredAssessment(
+            row['pk'], row['created_at'], row['final_risk_score'], new_risk, assessment_fields,
+            result_updates_for(i, row),
+        ))
+    return rescored
+
+
+def score_rows(rows, norm_table, today, weights=None):
+    """
+    Recalcula Z-scores e risco final de um bloco de avaliações.
+
+    Args:
+        rows: dicts com os campos de ROW_FIELDS
+        norm_table: NormTable usada no cálculo
+        today: data de referência para a idade dos pacientes
+        weights: WeightVector a aplicar (padrão: o perfil de cada avaliação)
+
+    Returns:
+        list[RescoredAssessment]: apenas avaliações com pelo menos um teste
+    """
+    calculator = score_calculator
+    patients = [
+        PatientInputs(
+            _age(row['patient__birth_date'], today),
+            row['patient__education_level'],
+            row['patient__education_years'],
+        )
+        for row in rows
+    ]
+    ages, education_groups = calculator.get_patient_arrays(patients)
+    education_years = np.array([patient.education_years for patient in patients], dtype=object)
+
+    def z_scores(test_name, mask, raw_scores):
+        return calculator.calculate_test_z_scores_batch(
+            test_name, ages[mask], education_groups[mask], raw_scores,
+            education_years=education_years[mask], norm_table=norm_table,
+        )
+
+    stored = {}  # relation -> (mask, {campo: valores})
+    normalized = {}  # teste -> Z-score normalizado (NaN nos ausentes)
+
+    mask = _present(rows, 'digit_span_result')
+    # Mesmo cálculo de DigitSpanResult.total_score
+    total = [
+        (row['digit_span_result__forward_score'] or 0) + (row['digit_span_result__backward_score'] or 0)
+        for row, present in zip(rows, mask) if present
+    ]
+    digit = calculator.normalize_z_scores_for_deficit_batch(z_scores('digit_span', mask, total), 'performance')
+    stored['digit_span_result'] = (mask, {'z_score': digit})
+    normalized['digit_span'] = _scatter(digit, mask)
+
+    mask = _present(rows, 'tmt_result')
+    tmt_a = calculator.normalize_z_scores_for_deficit_batch(
+        z_scores('tmt_a', mask, _column(rows, 'tmt_result__time_a_seconds', mask)), 'time'
+    )
+    tmt_b = calculator.normalize_z_scores_for_deficit_batch(
+        z_scores('tmt_b', mask, _column(rows, 'tmt_result__time_b_seconds', mask)), 'time'
+    )
+    stored['tmt_result'] = (mask, {'z_score_a': tmt_a, 'z_score_b': tmt_b})
+    normalized['tmt_a'] = _scatter(tmt_a, mask)
+    normalized['tmt_b'] = _scatter(tmt_b, mask)
+
+    mask = _present(rows, 'stroop_result')
+    # Persistido sem normalização (ver StroopResult.calculate_z_scores)
+    stroop = z_scores('stroop', mask, _column(rows, 'stroop_result__card_3_time', mask))
+    stored['stroop_result'] = (mask, {'z_score': stroop})
+    normalized['stroop'] = _scatter(calculator.normalize_z_scores_for_deficit_batch(stroop, 'time'), mask)
+
+    mask = _present(rows, 'meem_result')
+    meem = z_scores('meem', mask, _column(rows, 'meem_result__total_score', mask))
+    stored['meem_result'] = (mask, {'z_score': meem})
+    normalized['meem'] = _scatter(meem, mask)
+
+    mask = _present(rows, 'clock_drawing_result')
+    clock = calculator.calculate_clock_drawing_z_scores_batch(
+        ages[mask], education_years[mask], _column(rows, 'clock_drawing_result__total_score', mask),
+        norm_table=norm_table,
+    )
+    stored['clock_drawing_result'] = (mask, {'z_score': clock})
+    normalized['clock_drawing'] = _scatter(clock, mask)
+
+    # Posição de cada avaliação dentro dos arrays de cada resultado
+    positions = {relation: np.cumsum(mask) - 1 for relation, (mask, _) in stored.items()}
+
+    def result_updates(i, row):
+        updates = []
+        for relation, (mask, values) in stored.items():
+            if not mask[i]:
+                continue
+            position = positions[relation][i]
+            fields = {field: float(array[position]) for field, array in values.items()}
+            fields['norm_version'] = norm_table.version
+            if any(row[f'{relation}__{field}'] != value for field, value in fields.items()):
+                updates.append((relation, row[f'{relation}__id'], fields))
+        return updates
+
+    return _rescored(rows, normalized, weights, result_updates)
+
+
+def reweight_rows(rows, weights=None):
+    """
+    Recalcula só o Z-score final e o risco de um bloco de avaliações, a partir
+    dos Z-scores normalizados gravados nelas (as tabelas de resultados não são lidas).
+
+    Args:
+        rows: dicts com os campos de REWEIGHT_ROW_FIELDS
+        weights: WeightVector a aplicar (padrão: o perfil de cada avaliação)
+
+    Returns:
+        list[RescoredAssessment]: apenas avaliações com pelo menos um teste
+    """
+    normalized = {
+        test_name: np.array([np.nan if row[field] is None else row[field] for row in rows], dtype=np.float64)
+        for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items()
+    }
+    return _rescored(rows, normalized, weights, lambda i, row: [])
+
+
+def write_rescored(rescored):
+    """Grava um bloco recalculado (bulk_update por tabela, em uma transação)"""
+    assessments = [
+        Assessment(pk=item.pk, **item.assessment_fields)
+        for item in rescored if item.assessment_fields
+    ]
+    results = {relation: [] for relation in RESULT_MODELS}
+    for item in rescored:
+        for relation, result_pk, fields in item.result_updates:
+            results[relation].append(RESULT_MODELS[relation](pk=result_pk, **fields))
+
+    fields = list(ASSESSMENT_SCORE_FIELDS)
+    if any('weight_profile_id' in item.assessment_fields for item in rescored if item.assessment_fields):
+        # Pontuação com outro perfil de pesos: o perfil passa a ser o da avaliação
+        fields.append('weight_profile')
+
+    with transaction.atomic():
+        if assessments:
+            Assessment.objects.bulk_update(assessments, fields)
+        for relation, instances in results.items():
+            if instances:
+                model = RESULT_MODELS[relation]
+                model.objects.bulk_update(instances, [*model.Z_SCORE_FIELDS, 'norm_version'])
+
+
+def iter_assessment_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE, fields=ROW_FIELDS):
+    """Percorre o queryset em blocos por chave primária, só com os campos informados"""
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values(*fields)[:chunk_size].iterator()
+        )
+        if not rows:
+            return
+        last_pk = rows[-1]['pk']
+        yield rows
+
+
+# Estado dos processos do pool (definido em _init_worker)
+_worker_state = {}
+
+
+def _init_worker(norm_table, today, weights):
+    import django
+    django.setup()
+    _worker_state['norm_table'] = norm_table
+    _worker_state['today'] = today
+    _worker_state['weights'] = weights
+
+
+def _score_rows_in_worker(rows):
+    return score_rows(rows, _worker_state['norm_table'], _worker_state['today'], _worker_state['weights'])
+
+
+def rescore_assessments(queryset, norm_table=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                        dry_run=False, progress=None, weights=None, weights_only=False):
+    """
+    Recalcula as avaliações do queryset.
+
+    Args:
+        queryset: avaliações a recalcular (normalmente as concluídas)
+        norm_table: NormTable a usar (padrão: versão ativa)
+        workers: número de processos (1 = no próprio processo)
+        weights: WeightVector a aplicar, gravado como perfil das avaliações
+            (padrão: o perfil de cada avaliação)
+        weights_only: se True, só o Z-score final e o risco são recalculados, a
+            partir dos Z-scores normalizados gravados nas avaliações
+            (``reweight_rows``, no próprio processo; as normas não são usadas)
+        dry_run: se True, só calcula o relatório, sem gravar
+        progress: callback opcional chamado com o número de avaliações processadas
+
+    Returns:
+        dict: totais e Counter de transições de risco {(antes, depois): n}
+    """
+    norm_table = norm_table or score_calculator.norm_table
+    today = date.today()
+    report = {
+        'processed': 0,
+        'assessments_updated': 0,
+        'results_updated': 0,
+        'risk_changes': Counter(),
+        'norm_version': None if weights_only else norm_table.version,
+        'weight_profile': weights.slug if weights else None,
+    }
+    touched_days = set()
+
+    def handle(rescored):
+        report['processed'] += len(rescored)
+        for item in rescored:
+            if item.assessment_fields:
+                report['assessments_updated'] += 1
+            report['results_updated'] += len(item.result_updates)
+            if item.old_risk != item.new_risk:
+                report['risk_changes'][(item.old_risk, item.new_risk)] += 1
+            if item.result_updates:
+                touched_days.add(assessment_local_date(item.created_at))
+        if not dry_run:
+            write_rescored(rescored)
+        if progress:
+            progress(report['processed'])
+
+    if weights_only:
+        for rows in iter_assessment_chunks(queryset, chunk_size, REWEIGHT_ROW_FIELDS):
+            handle(reweight_rows(rows, weights))
+    elif workers <= 1:
+        for rows in iter_assessment_chunks(queryset, chunk_size):
+            handle(score_rows(rows, norm_table, today, weights))
+    else:
+        # Conexões não podem ser compartilhadas com processos filhos
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(norm_table, today, weights)) as pool:
+            pending = []
+            for rows in iter_assessment_chunks(queryset, chunk_size):
+                pending.append(pool.submit(_score_rows_in_worker, rows))
+                # Limita os blocos em voo para manter a memória constante
+                if len(pending) >= workers * 2:
+                    handle(pending.pop(0).result())
+            for future in pending:
+                handle(future.result())
+
+    # bulk_update não dispara signals: atualiza o rollup diário dos dias afetados
+    # e invalida as páginas em cache
+    if not dry_run:
+        for day in sorted(touched_days):
+            refresh_daily_stats(day)
+        if report['assessments_updated'] or report['results_updated']:
+            bump_all_data_versions()
+
+    return report
+
+
+def missing_normalized_z_scores(queryset):
+    """Avaliações com o Z-score de um teste gravado no resultado e a coluna normalizada vazia"""
+    condition = Q()
+    for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+        condition |= Q(**{f'{field}__isnull': True, f'{TEST_Z_SCORE_COLUMNS[test_name]}__isnull': False})
+    return queryset.filter(condition)
+
+
+def backfill_normalized_z_scores(queryset, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Preenche as colunas normalizadas vazias a partir dos Z-scores gravados nos
+    resultados. Os Z-scores, o Z-score final e o risco já gravados não mudam.
+
+    Returns:
+        dict: totais no formato de ``rescore_assessments``
+    """
+    report = {
+        'processed': 0,
+        'assessments_updated': 0,
+        'results_updated': 0,
+        'risk_changes': Counter(),
+        'norm_version': None,
+        'weight_profile': None,
+    }
+    fields = list(NORMALIZED_Z_SCORE_FIELDS.values())
+    for rows in iter_assessment_chunks(missing_normalized_z_scores(queryset), chunk_size, BACKFILL_ROW_FIELDS):
+        assessments = []
+        for row in rows:
+            values = {}
+            for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+                z_score = row[TEST_Z_SCORE_COLUMNS[test_name]]
+                if row[field] is None and z_score is not None:
+                    values[field] = normalize_z_score_for_deficit(z_score, get_test_type(test_name))
+            if values:
+                current = {field: row[field] for field in fields}
+                assessments.append(Assessment(pk=row['pk'], **dict(current, **values)))
+        report['processed'] += len(rows)
+        report['assessments_updated'] += len(assessments)
+        if assessments and not dry_run:
+            Assessment.objects.bulk_update(assessments, fields)
+        if progress:
+            progress(report['processed'])
+
+    # As colunas normalizadas não entram no rollup diário: só as páginas em cache
+    if report['assessments_updated'] and not dry_run:
+        bump_all_data_versions()
+    return report
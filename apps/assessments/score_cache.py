@@ -0,0 +1,149 @@
+"""
+Cache da pontuação composta (risco final) por impressão digital das entradas.
+
+O resultado de ``calculate_final_risk_score`` depende só das entradas dos
+testes realizados (Z_SCORE_INPUT_FIELDS), da faixa etária e das faixas de
+escolaridade do paciente, da versão das normas e da versão dos pesos. A chave
+(``composite_key``) é o hash desses valores: avaliações com as mesmas entradas
+compartilham a entrada do cache, e uma mudança de normas ou pesos muda todas as
+chaves, sem invalidação explícita.
+
+Há dois níveis: um LRU em memória no processo (SCORE_CACHE_SIZE entradas) e,
+com SCORE_CACHE_SHARED, o cache do Django (compartilhado entre processos quando
+configurado com CACHE_DIR). Os contadores de acertos e faltas saem em
+``/query-budget/``.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .norms import NormTable, REQUIRED_TESTS
+
+KEY_PREFIX = 'caresense:score'
+
+DEFAULT_SIZE = 1024
+DEFAULT_TIMEOUT = 24 * 60 * 60
+
+
+class CompositeScore(NamedTuple):
+    """Pontuação composta calculada para um conjunto de entradas"""
+    result_z_scores: Dict[str, Tuple[Tuple[str, float], ...]]  # teste -> ((campo, Z-score), ...)
+    normalized_z_scores: Dict[str, float]
+    test_scores: Dict[str, dict]
+    final_z_score: float
+    risk_score: str
+    confidence: float
+
+
+def composite_key(results, patient, norm_table, weights_version, calculator):
+    """
+    Impressão digital das entradas do risco final.
+
+    Args:
+        results: AssessmentResults da avaliação
+        patient: paciente (idade e escolaridade)
+        norm_table: NormTable usada no cálculo
+        weights_version: versão dos pesos por domínio
+        calculator: AssessmentScoreCalculator (regras de faixa de escolaridade)
+    """
+    education_bands = tuple(
+        calculator._get_test_education_group(patient, test_name, norm_table) for test_name in REQUIRED_TESTS
+    )
+    parts = [norm_table.version, weights_version, NormTable.age_band_index(patient.age), education_bands]
+    for test, result in results._asdict().items():
+        if result is not None:
+            parts.append((test, tuple(getattr(result, name) for name in result.Z_SCORE_INPUT_FIELDS)))
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class ScoreCache:
+    """LRU em memória (seguro entre threads) com nível compartilhado opcional"""
+
+    def __init__(self, max_size=DEFAULT_SIZE, shared=False, timeout=DEFAULT_TIMEOUT):
+        self.max_size = max_size
+        self.shared = shared
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ('local_hits', 'shared_hits', 'misses', 'mismatches', 'sets', 'evictions'), 0
+        )
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 or self.shared
+
+    def _store_local(self, key, value):
+        # Chamado com o lock
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def get(self, key, validate=None):
+        """
+        Pontuação guardada para a chave (None se ausente).
+
+        ``validate`` recebe a entrada encontrada; se devolver False a entrada
+        não é usada (contada em ``mismatches``).
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        counter = 'local_hits'
+        if value is None and self.shared:
+            value = cache.get(f'{KEY_PREFIX}:{key}')
+            counter = 'shared_hits'
+
+        if value is None:
+            counter = 'misses'
+        elif validate is not None and not validate(value):
+            value, counter = None, 'mismatches'
+        with self._lock:
+            self._counters[counter] += 1
+            if counter == 'shared_hits':
+                self._store_local(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._counters['sets'] += 1
+            self._store_local(key, value)
+        if self.shared:
+            cache.set(f'{KEY_PREFIX}:{key}', value, self.timeout)
+
+    def clear(self):
+        """Descarta as entradas do processo e zera os contadores (o nível compartilhado expira sozinho)"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def stats(self):
+        """Contadores e ocupação do cache neste processo"""
+        with self._lock:
+            stats = dict(self._counters, size=len(self._entries))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses'] + stats['mismatches']
+        stats.update(
+            max_size=self.max_size,
+            shared=self.shared,
+            hit_rate=round((stats['local_hits'] + stats['shared_hits']) / lookups, 3) if lookups else None,
+        )
+        return stats
+
+
+# Cache do processo (usado por AssessmentScoreCalculator.calculate_final_risk_score)
+score_cache = ScoreCache(
+    max_size=getattr(settings, 'SCORE_CACHE_SIZE', DEFAULT_SIZE),
+    shared=getattr(settings, 'SCORE_CACHE_SHARED', False),
+    timeout=getattr(settings, 'SCORE_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+)
@@ -0,0 +1,257 @@
+"""
+Fila do cálculo do risco final (tabela ScoringJob, sem broker).
+
+As submissões só enfileiram o cálculo (``enqueue_final_risk``); o comando
+``process_scoring_jobs`` executa os jobs pendentes. Cada job é reservado por
+um UPDATE condicional (status e tentativas lidos), o que funciona em qualquer
+banco e impede que dois workers executem o mesmo job; um job reservado por um
+worker que parou volta a ficar disponível depois de LOCK_TIMEOUT. Falhas são
+repetidas com espera exponencial e a situação fica em
+``Assessment.scoring_status``; um job que esgotou as tentativas (FAILED) volta
+para a fila quando o cálculo é pedido de novo. O cálculo em si (``calculate_final_risk``) parte
+sempre dos resultados gravados, então executar um job de novo é inofensivo.
+
+Com ``settings.SCORING_QUEUE_EAGER`` o job é executado logo após o commit, no
+próprio processo (desenvolvimento e instalações sem worker).
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Assessment, ScoringJob
+from .services import calculate_final_risk, score_calculator
+
+logger = logging.getLogger(__name__)
+
+# Testes exigidos para enfileirar a pontuação final ao submeter resultados pela API
+FINAL_SCORE_TESTS = ('digit_span', 'tmt', 'stroop', 'meem')
+
+# Job em execução há mais tempo que isto é considerado abandonado (worker parou)
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+# Espera antes da nova tentativa: RETRY_DELAY * 2^(tentativas - 1), até MAX_RETRY_DELAY
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def scoring_key(assessment):
+    """
+    Chave de idempotência do cálculo: a avaliação, as versões das normas e dos
+    pesos e as entradas dos resultados presentes. Muda quando um resultado é
+    incluído ou alterado; repetir o pedido sem mudanças dá a mesma chave.
+    """
+    parts = [
+        str(assessment.pk), score_calculator.norm_version,
+        score_calculator.weight_store.for_assessment(assessment).version,
+    ]
+    for result in assessment.results.present():
+        inputs = [getattr(result, name) for name in result.Z_SCORE_INPUT_FIELDS]
+        parts.append(f'{type(result).__name__}:{result.pk}:{inputs}')
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+    return f'final-risk:{assessment.pk}:{digest}'
+
+
+def _requeue(jobs, statuses):
+    """
+    Volta para PENDING os jobs encerrados (``statuses``) cuja chave foi pedida
+    de novo: tentativas zeradas, execução imediata e reserva desfeita.
+
+    Returns:
+        int: jobs reenfileirados
+    """
+    # Status conferido no próprio UPDATE: um job reservado nesse meio-tempo não é alterado
+    return jobs.filter(status__in=statuses).update(
+        status='PENDING', attempts=0, run_after=timezone.now(), locked_at=None, locked_by='', finished_at=None,
+    )
+
+
+def enqueue_final_risk(assessment, force=False):
+    """
+    Enfileira o cálculo do risco final da avaliação (uma vez por chave).
+
+    Um job com a mesma chave que falhou (FAILED) volta para a fila; com
+    ``force`` (recálculo pedido pelo usuário) também um já concluído (DONE).
+
+    Returns:
+        tuple: (ScoringJob, enfileirado agora?)
+    """
+    job, created = ScoringJob.objects.get_or_create(
+        idempotency_key=scoring_key(assessment),
+        defaults={'assessment': assessment},
+    )
+    queued = created
+    statuses = ('FAILED', 'DONE') if force else ('FAILED',)
+    if not created and job.status in statuses:
+        queued = bool(_requeue(ScoringJob.objects.filter(pk=job.pk), statuses))
+        job.refresh_from_db()
+    if queued:
+        # UPDATE só da coluna: não sobrescreve o que outra requisição gravou na avaliação
+        Assessment.objects.filter(pk=assessment.pk).update(scoring_status='QUEUED')
+        assessment.scoring_status = 'QUEUED'
+        if getattr(settings, 'SCORING_QUEUE_EAGER', False):
+            transaction.on_commit(lambda: run_job_now(job.pk))
+    return job, queued
+
+
+def enqueue_final_risk_many(assessments):
+    """
+    Enfileira o cálculo do risco final de várias avaliações (submissão em lote)
+    com um número fixo de consultas, seja qual for o tamanho do lote. Jobs com
+    a mesma chave que falharam voltam para a fila.
+
+    Returns:
+        dict: {pk da avaliação: ScoringJob}
+    """
+    keys = {assessment.pk: scoring_key(assessment) for assessment in assessments}
+    if not keys:
+        return {}
+    existing = dict(
+        ScoringJob.objects.filter(idempotency_key__in=keys.values()).values_list('idempotency_key', 'status')
+    )
+    created = [pk for pk, key in keys.items() if key not in existing]
+    # ignore_conflicts: uma chave criada ao mesmo tempo por outra requisição não derruba o lote
+    ScoringJob.objects.bulk_create(
+        [ScoringJob(assessment_id=pk, idempotency_key=keys[pk]) for pk in created],
+        ignore_conflicts=True,
+    )
+    failed = {key for key, job_status in existing.items() if job_status == 'FAILED'}
+    if failed:
+        _requeue(ScoringJob.objects.filter(idempotency_key__in=failed), ('FAILED',))
+    jobs = ScoringJob.objects.in_bulk(list(keys.values()), field_name='idempotency_key')
+
+    queued = {pk for pk, key in keys.items() if key not in existing or key in failed}
+    if queued:
+        Assessment.objects.filter(pk__in=queued).update(scoring_status='QUEUED')
+        for assessment in assessments:
+            if assessment.pk in queued:
+                assessment.scoring_status = 'QUEUED'
+        if getattr(settings, 'SCORING_QUEUE_EAGER', False):
+            job_ids = [jobs[keys[pk]].pk for pk in queued]
+            transaction.on_commit(lambda: run_jobs_now(job_ids))
+    return {pk: jobs[key] for pk, key in keys.items()}
+
+
+def _is_complete(assessment):
+    results = assessment.results
+    return all(getattr(results, test) is not None for test in FINAL_SCORE_TESTS)
+
+
+def enqueue_if_complete(assessment):
+    """
+    Enfileira o risco final quando todos os FINAL_SCORE_TESTS foram submetidos.
+
+    Returns:
+        ScoringJob | None
+    """
+    if not _is_complete(assessment):
+        return None
+    job, _ = enqueue_final_risk(assessment)
+    return job
+
+
+def enqueue_if_complete_many(assessments):
+    """
+    Versão em lote de ``enqueue_if_complete``.
+
+    Returns:
+        dict: {pk da avaliação: ScoringJob} só das avaliações completas
+    """
+    return enqueue_final_risk_many([assessment for assessment in assessments if _is_complete(assessment)])
+
+
+def _claim(job_id, expected_status, expected_attempts, worker, now):
+    # Só um worker consegue mudar a linha a partir do estado lido
+    return ScoringJob.objects.filter(
+        pk=job_id, status=expected_status, attempts=expected_attempts
+    ).update(status='RUNNING', locked_at=now, locked_by=worker, attempts=F('attempts') + 1) == 1
+
+
+def claim_due_jobs(worker, limit):
+    """Reserva até ``limit`` jobs prontos para execução (ou abandonados); devolve os reservados"""
+    now = timezone.now()
+    candidates = (
+        ScoringJob.objects
+        .filter(Q(status='PENDING', run_after__lte=now) | Q(status='RUNNING', locked_at__lt=now - LOCK_TIMEOUT))
+        .order_by('run_after', 'id')
+        .values_list('pk', 'status', 'attempts')[:limit]
+    )
+    claimed = [pk for pk, status, attempts in candidates if _claim(pk, status, attempts, worker, now)]
+    return list(ScoringJob.objects.filter(pk__in=claimed).order_by('run_after', 'id'))
+
+
+def run_job(job):
+    """
+    Executa um job já reservado (status RUNNING).
+
+    Returns:
+        bool: True se o risco final foi calculado
+    """
+    Assessment.objects.filter(pk=job.assessment_id).update(scoring_status='RUNNING')
+    try:
+        # Savepoint: uma falha não deixa inválida a transação de quem chamou (run_jobs_now)
+        with transaction.atomic():
+            calculate_final_risk(job.assessment_id)
+    except Exception as e:
+        logger.exception("Erro no cálculo do risco final da avaliação %s (tentativa %d)", job.assessment_id, job.attempts)
+        _fail(job, e)
+        return False
+
+    job.status = 'DONE'
+    job.finished_at = timezone.now()
+    job.last_error = ''
+    job.save(update_fields=['status', 'finished_at', 'last_error', 'updated_at'])
+    Assessment.objects.filter(pk=job.assessment_id).update(scoring_status='DONE')
+    return True
+
+
+def _fail(job, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts >= job.max_attempts:
+        job.status = 'FAILED'
+        job.finished_at = timezone.now()
+        scoring_status = 'FAILED'
+    else:
+        job.status = 'PENDING'
+        job.run_after = timezone.now() + min(RETRY_DELAY * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+        scoring_status = 'QUEUED'
+    job.save(update_fields=['status', 'finished_at', 'run_after', 'last_error', 'updated_at'])
+    Assessment.objects.filter(pk=job.assessment_id).update(scoring_status=scoring_status)
+
+
+def run_job_now(job_id, worker='eager'):
+    """Reserva e executa um job específico, se ainda estiver pendente"""
+    job = ScoringJob.objects.filter(pk=job_id, status='PENDING').first()
+    if job is None or not _claim(job.pk, 'PENDING', job.attempts, worker, timezone.now()):
+        return False
+    job.refresh_from_db()
+    return run_job(job)
+
+
+def run_jobs_now(job_ids, worker='eager'):
+    """
+    Executa vários jobs pendentes em uma única transação: o rollup diário de
+    cada dia afetado é recalculado uma vez, no commit, e não uma vez por job.
+
+    Returns:
+        int: jobs com o risco final calculado
+    """
+    with transaction.atomic():
+        return sum(1 for job_id in job_ids if run_job_now(job_id, worker))
+
+
+def process_due_jobs(worker, limit=20):
+    """
+    Reserva e executa um bloco de jobs prontos.
+
+    Returns:
+        tuple: (jobs executados, jobs com falha)
+    """
+    jobs = claim_due_jobs(worker, limit)
+    failed = sum(1 for job in jobs if not run_job(job))
+    return len(jobs), failed
@@ -1,39 +1,88 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult
+from .drawings import DrawingError, decode_drawing_data
+from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult, WeightProfile
 from apps.patients.models import Patient
 
-class DigitSpanResultSerializer(serializers.ModelSerializer):
+# Parâmetro de consulta do fieldset esparso (?fields=id,status)
+SPARSE_FIELDS_PARAM = 'fields'
+
+
+def requested_fields(request):
+    """Campos pedidos em ``?fields=`` numa leitura (None se não informado)"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    value = request.query_params.get(SPARSE_FIELDS_PARAM)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Fieldset esparso: ``?fields=id,status`` limita os campos da resposta.
+    
+    Vale para o serializer raiz (e para cada item de uma lista), não para os
+    aninhados. Nomes desconhecidos geram erro 400. ``field_columns`` indica as
+    colunas lidas para os campos que não são colunas do model, para que a view
+    monte o ``QuerySet.only()`` com ``columns_for``.
+    """
+    field_columns = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {SPARSE_FIELDS_PARAM: f"Campos desconhecidos: {', '.join(sorted(unknown))}"}
+            )
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+    
+    @classmethod
+    def columns_for(cls, field_names):
+        """Colunas (caminhos do ORM) necessárias para serializar ``field_names``"""
+        columns = []
+        for name in field_names:
+            columns.extend(cls.field_columns.get(name, (name,)))
+        return columns
+
+
+class DigitSpanResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     total_score = serializers.ReadOnlyField()
     
     class Meta:
         model = DigitSpanResult
         fields = [
             'forward_score', 'forward_span', 'backward_score', 
-            'backward_span', 'total_score', 'z_score', 'created_at'
+            'backward_span', 'total_score', 'z_score', 'norm_version', 'created_at'
         ]
-        read_only_fields = ['z_score', 'created_at']
+        read_only_fields = ['z_score', 'norm_version', 'created_at']
 
-class TMTResultSerializer(serializers.ModelSerializer):
+class TMTResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TMTResult
         fields = [
             'time_a_seconds', 'errors_a', 'time_b_seconds', 
-            'errors_b', 'z_score_a', 'z_score_b', 'created_at'
+            'errors_b', 'z_score_a', 'z_score_b', 'norm_version', 'created_at'
         ]
-        read_only_fields = ['z_score_a', 'z_score_b', 'created_at']
+        read_only_fields = ['z_score_a', 'z_score_b', 'norm_version', 'created_at']
 
-class StroopResultSerializer(serializers.ModelSerializer):
+class StroopResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     interference_time = serializers.ReadOnlyField()
     
     class Meta:
         model = StroopResult
         fields = [
             'card_1_time', 'card_1_errors', 'card_2_time', 'card_2_errors',
-            'card_3_time', 'card_3_errors', 'interference_time', 'z_score', 'created_at'
+            'card_3_time', 'card_3_errors', 'interference_time', 'z_score', 'norm_version', 'created_at'
         ]
-        read_only_fields = ['z_score', 'created_at']
+        read_only_fields = ['z_score', 'norm_version', 'created_at']
 
-class MeemResultSerializer(serializers.ModelSerializer):
+class MeemResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     total_score = serializers.ReadOnlyField()
     interpretation = serializers.ReadOnlyField()
     z_score = serializers.ReadOnlyField()
@@ -67,35 +116,57 @@ class MeemResultSerializer(serializers.ModelSerializer):
             # Habilidade Construtiva
             'copy_pentagons',
             # Campos calculados
-            'total_score', 'interpretation', 'z_score', 'created_at'
+            'total_score', 'interpretation', 'z_score', 'norm_version', 'created_at'
         ]
-        read_only_fields = ['total_score', 'interpretation', 'z_score', 'created_at']
+        read_only_fields = ['total_score', 'interpretation', 'z_score', 'norm_version', 'created_at']
 
-class ClockDrawingResultSerializer(serializers.ModelSerializer):
+class ClockDrawingResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     total_score = serializers.ReadOnlyField()
     interpretation = serializers.ReadOnlyField()
     component_scores = serializers.ReadOnlyField()
     detailed_feedback = serializers.ReadOnlyField()
+    # O desenho não vai na resposta: só os endereços da imagem e da miniatura
+    drawing_url = serializers.SerializerMethodField()
+    drawing_thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = ClockDrawingResult
         fields = [
             'requested_time', 'circle_score', 'numbers_score', 'hands_score',
-            'total_score', 'z_score', 'classification', 'observations',
-            'drawing_data', 'duration_seconds', 'interpretation',
+            'total_score', 'z_score', 'norm_version', 'classification', 'observations',
+            'drawing_url', 'drawing_thumbnail_url', 'duration_seconds', 'interpretation',
             'component_scores', 'detailed_feedback', 'created_at', 'completed_at'
         ]
         read_only_fields = [
-            'total_score', 'z_score', 'classification', 'interpretation',
+            'total_score', 'z_score', 'norm_version', 'classification', 'interpretation',
             'component_scores', 'detailed_feedback', 'created_at', 'completed_at'
         ]
+    
+    def _drawing_url(self, obj, thumbnail=False):
+        url = reverse('assessments:clock_drawing_image', args=[obj.assessment_id])
+        if thumbnail:
+            url += '?thumbnail=1'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_drawing_url(self, obj):
+        return self._drawing_url(obj) if obj.drawing_image else None
+    
+    def get_drawing_thumbnail_url(self, obj):
+        return self._drawing_url(obj, thumbnail=True) if obj.drawing_thumbnail else None
 
-class AssessmentListSerializer(serializers.ModelSerializer):
+class AssessmentListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para listagem de assessments"""
     patient_name = serializers.CharField(source='patient.full_name', read_only=True)
     patient_room = serializers.CharField(source='patient.room_number', read_only=True)
     assessor_name = serializers.CharField(source='assessor.get_full_name', read_only=True)
     
+    field_columns = {
+        'patient_name': ('patient__full_name',),
+        'patient_room': ('patient__room_number',),
+        'assessor_name': ('assessor__first_name', 'assessor__last_name'),
+    }
+    
     class Meta:
         model = Assessment
         fields = [
@@ -103,7 +174,7 @@ class AssessmentListSerializer(serializers.ModelSerializer):
             'status', 'final_risk_score', 'created_at', 'completed_at'
         ]
 
-class AssessmentDetailSerializer(serializers.ModelSerializer):
+class AssessmentDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para detalhes completos do assessment"""
     patient_name = serializers.CharField(source='patient.full_name', read_only=True)
     patient_age = serializers.IntegerField(source='patient.age', read_only=True)
@@ -117,22 +188,37 @@ class AssessmentDetailSerializer(serializers.ModelSerializer):
     tmt_result = TMTResultSerializer(read_only=True)
     stroop_result = StroopResultSerializer(read_only=True)
     meem_result = MeemResultSerializer(read_only=True)
+    # Vazio: perfil padrão da instalação
+    weight_profile = serializers.SlugRelatedField(slug_field='slug', read_only=True)
     
     class Meta:
         model = Assessment
         fields = [
             'id', 'patient', 'patient_name', 'patient_age', 'patient_education',
             'patient_education_level', 'patient_education_years',
-            'assessor', 'assessor_name', 'status', 'final_risk_score',
+            'assessor', 'assessor_name', 'status', 'final_risk_score', 'weight_profile',
             'created_at', 'completed_at', 'digit_span_result', 'tmt_result', 'stroop_result', 'meem_result'
         ]
 
+class AssessmentExportSerializer(AssessmentDetailSerializer):
+    """Avaliação com todos os resultados, para a exportação (NDJSON/CSV)"""
+    clock_drawing_result = ClockDrawingResultSerializer(read_only=True)
+    
+    class Meta(AssessmentDetailSerializer.Meta):
+        fields = AssessmentDetailSerializer.Meta.fields + [
+            'final_z_score', 'confidence_level', 'clock_drawing_result'
+        ]
+
 class AssessmentCreateSerializer(serializers.ModelSerializer):
     """Serializer para criar um novo assessment"""
+    # Protocolo de pesos do risco final (slug); omitido = perfil padrão da instalação
+    weight_profile = serializers.SlugRelatedField(
+        slug_field='slug', queryset=WeightProfile.objects.all(), required=False, allow_null=True
+    )
     
     class Meta:
         model = Assessment
-        fields = ['patient', 'assessor']
+        fields = ['patient', 'assessor', 'weight_profile']
     
     def create(self, validated_data):
         validated_data['status'] = 'PENDING'
@@ -249,6 +335,13 @@ class SubmitClockDrawingSerializer(serializers.Serializer):
             raise serializers.ValidationError(f"Hora deve ser uma das opções: {', '.join(valid_times)}")
         return value
     
+    def validate_drawing_data(self, value):
+        """Decodifica o desenho (data URL ou base64 de um PNG) em bytes"""
+        try:
+            return decode_drawing_data(value)
+        except DrawingError as e:
+            raise serializers.ValidationError(str(e))
+    
     def validate(self, data):
         """Validações customizadas"""
         total = data['circle_score'] + data['numbers_score'] + data['hands_score']
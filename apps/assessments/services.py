@@ -1,8 +1,13 @@
+import copy
 import json
-import os
-from django.conf import settings
-from django.utils import timezone
-from .models import Assessment, DigitSpanResult, TMTResult, StroopResult
+from collections import defaultdict
+import numpy as np
+from django.db import transaction
+from .models import NORMALIZED_Z_SCORE_FIELDS, Assessment
+from .norm_store import NormStore, load_bundled_normative_data
+from .norms import AGE_GROUPS, NormTable, compile_norm_table
+from .score_cache import CompositeScore, composite_key, score_cache
+from .weights import DEFAULT_WEIGHTS, WeightStore
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,25 +18,34 @@ class AssessmentScoreCalculator:
     """
     
     def __init__(self):
+        self.using_example_data = False
         self.normative_data = self._load_normative_data()
+        # Normas do arquivo compiladas e validadas uma única vez (falha aqui, não no meio de uma requisição);
+        # valem enquanto não houver versão ativa em NormativeDataVersion
+        self.default_norm_table = compile_norm_table(self.normative_data, allow_missing=self.using_example_data)
+        self.norm_store = NormStore(self.default_norm_table)
+        self.weight_store = WeightStore()
+    
+    @property
+    def norm_table(self):
+        """NormTable da versão ativa dos dados normativos"""
+        return self.norm_store.get_active_table()
+    
+    @property
+    def norm_version(self):
+        """Versão ativa dos dados normativos (registrada nos resultados)"""
+        return self.norm_table.version
     
     def _load_normative_data(self):
         """
         Carrega os dados normativos dos testes do arquivo JSON
         """
         try:
-            import json
-            from pathlib import Path
-            
-            # Caminho para o arquivo de dados normativos
-            data_path = Path(__file__).parent / 'normative_data.json'
-            
-            with open(data_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-                
+            return load_bundled_normative_data()
         except (FileNotFoundError, json.JSONDecodeError) as e:
             # Fallback para dados exemplo se o arquivo não existir
-            print(f"Aviso: Não foi possível carregar dados normativos do arquivo. Usando dados exemplo. Erro: {e}")
+            logger.warning("Não foi possível carregar dados normativos do arquivo; usando dados exemplo: %s", e)
+            self.using_example_data = True
             return self._get_example_normative_data()
     
     def _get_example_normative_data(self):
@@ -94,19 +108,33 @@ class AssessmentScoreCalculator:
                     "low_education": {"mean": 75.3, "sd": 22.1}, 
                     "high_education": {"mean": 58.9, "sd": 16.7}
                 }
+            },
+            "meem": {
+                "all": {
+                    "low_education": {"mean": 25.2, "sd": 2.3},
+                    "high_education": {"mean": 28.5, "sd": 1.8}
+                }
+            },
+            "clock_drawing": {
+                "_education_rule": "education_years_gt_8",
+                "<65": {
+                    "low_education": {"mean": 8.5, "sd": 1.2},
+                    "high_education": {"mean": 9.2, "sd": 0.9}
+                },
+                "65-74": {
+                    "low_education": {"mean": 7.8, "sd": 1.5},
+                    "high_education": {"mean": 8.7, "sd": 1.1}
+                },
+                "75+": {
+                    "low_education": {"mean": 7.2, "sd": 1.8},
+                    "high_education": {"mean": 8.0, "sd": 1.4}
+                }
             }
         }
     
     def _get_age_group(self, age):
         """Determina o grupo etário baseado na idade"""
-        if 50 <= age <= 59:
-            return "50-59"
-        elif 60 <= age <= 69:
-            return "60-69"
-        elif 70 <= age <= 79:
-            return "70-79"
-        else:
-            return "80+"
+        return AGE_GROUPS[NormTable.age_group_index(age)]
     
     def _get_education_group(self, patient):
         """Determina o grupo educacional baseado no nível de escolaridade"""
@@ -125,6 +153,13 @@ class AssessmentScoreCalculator:
         # Default conservador
         return 'low_education'
     
+    def _get_test_education_group(self, patient, test_name, norm_table):
+        """Grupo educacional do paciente segundo a regra do teste nos dados normativos"""
+        if norm_table.education_rule(test_name) == 'education_years_gt_8':
+            education_years = getattr(patient, 'education_years', 8) or 8
+            return 'high_education' if education_years > 8 else 'low_education'
+        return self._get_education_group(patient)
+    
     def calculate_z_score(self, raw_score, mean, standard_deviation):
         """
         Calcula o Z-Score usando a fórmula: Z = (Escore Bruto - Média) / Desvio Padrão
@@ -178,21 +213,23 @@ class AssessmentScoreCalculator:
         """
         Calcula os Z-Scores para TMT-A e TMT-B
         """
-        age_group = self._get_age_group(patient.age)
-        education_group = self._get_education_group(patient)
+        norm_table = self.norm_table
+        education_group = self._get_test_education_group(patient, "tmt_a", norm_table)
         try:
-            tmt_a_norms = self.normative_data["tmt_a"][age_group][education_group]
-            tmt_b_norms = self.normative_data["tmt_b"][age_group][education_group]
+            mean_a, sd_a = norm_table.lookup("tmt_a", patient.age, education_group)
+            mean_b, sd_b = norm_table.lookup(
+                "tmt_b", patient.age, self._get_test_education_group(patient, "tmt_b", norm_table)
+            )
         except KeyError as e:
-            logger.error("Normas TMT faltando para age_group=%s education_group=%s: %s", age_group, education_group, e)
+            logger.error("Normas TMT faltando: %s", e)
             raise
-        z_score_a = self.calculate_z_score(time_a, tmt_a_norms["mean"], tmt_a_norms["sd"])
-        z_score_b = self.calculate_z_score(time_b, tmt_b_norms["mean"], tmt_b_norms["sd"])
+        z_score_a = self.calculate_z_score(time_a, mean_a, sd_a)
+        z_score_b = self.calculate_z_score(time_b, mean_b, sd_b)
         logger.debug(
-            "calc_tmt_z | age_group=%s edu=%s | A: time=%.2fs mean=%.2f sd=%.2f z=%.3f | B: time=%.2fs mean=%.2f sd=%.2f z=%.3f",
-            age_group, education_group,
-            float(time_a), float(tmt_a_norms["mean"]), float(tmt_a_norms["sd"]), float(z_score_a),
-            float(time_b), float(tmt_b_norms["mean"]), float(tmt_b_norms["sd"]), float(z_score_b)
+            "calc_tmt_z | age=%s edu=%s | A: time=%.2fs mean=%.2f sd=%.2f z=%.3f | B: time=%.2fs mean=%.2f sd=%.2f z=%.3f",
+            patient.age, education_group,
+            float(time_a), mean_a, sd_a, float(z_score_a),
+            float(time_b), mean_b, sd_b, float(z_score_b)
         )
         return z_score_a, z_score_b
     
@@ -200,21 +237,21 @@ class AssessmentScoreCalculator:
         """
         Calcula o Z-Score para Digit Span (soma de forward + backward)
         """
-        age_group = self._get_age_group(patient.age)
-        education_group = self._get_education_group(patient)
+        norm_table = self.norm_table
+        education_group = self._get_test_education_group(patient, "digit_span", norm_table)
         
-        norms = self.normative_data["digit_span"][age_group][education_group]
-        return self.calculate_z_score(total_score, norms["mean"], norms["sd"])
+        mean, sd = norm_table.lookup("digit_span", patient.age, education_group)
+        return self.calculate_z_score(total_score, mean, sd)
     
     def calculate_stroop_z_score(self, patient, interference_time):
         """
         Calcula o Z-Score para Stroop (tempo de interferência)
         """
-        age_group = self._get_age_group(patient.age)
-        education_group = self._get_education_group(patient)
+        norm_table = self.norm_table
+        education_group = self._get_test_education_group(patient, "stroop", norm_table)
         
-        norms = self.normative_data["stroop"][age_group][education_group]
-        return self.calculate_z_score(interference_time, norms["mean"], norms["sd"])
+        mean, sd = norm_table.lookup("stroop", patient.age, education_group)
+        return self.calculate_z_score(interference_time, mean, sd)
     
     def calculate_meem_z_score(self, patient, total_score):
         """
@@ -222,23 +259,12 @@ class AssessmentScoreCalculator:
         Para MEEM: maior pontuação = melhor desempenho (como Digit Span)
         Valores negativos indicam déficit cognitivo
         """
-        age_group = self._get_age_group(patient.age)
-        education_group = self._get_education_group(patient)
+        norm_table = self.norm_table
+        education_group = self._get_test_education_group(patient, "meem", norm_table)
         
-        # Verificar se temos dados normativos para MEEM
-        if "meem" in self.normative_data:
-            norms = self.normative_data["meem"][age_group][education_group]
-            return self.calculate_z_score(total_score, norms["mean"], norms["sd"])
-        else:
-            # Dados normativos baseados em Brucki et al. (2003) - estimativa
-            if education_group == "high_education":
-                mean_score = 28.5
-                sd_score = 1.8
-            else:  # low_education
-                mean_score = 25.2
-                sd_score = 2.3
-            
-            return self.calculate_z_score(total_score, mean_score, sd_score)
+        # Normas baseadas em Brucki et al. (2003) - estimativa
+        mean, sd = norm_table.lookup("meem", patient.age, education_group)
+        return self.calculate_z_score(total_score, mean, sd)
     
     def calculate_clock_drawing_z_score(self, patient, total_score):
         """
@@ -246,162 +272,299 @@ class AssessmentScoreCalculator:
         Baseado em dados normativos de Cacho-Gutiérrez et al. (1999)
         """
         try:
+            norm_table = self.norm_table
             age = getattr(patient, 'age', 65)
-            education_years = getattr(patient, 'education_years', 8) or 8
+            education_group = self._get_test_education_group(patient, "clock_drawing", norm_table)
             
-            # Dados normativos aproximados para Clock Drawing Test
             # Pontuação média varia por idade e escolaridade
-            if age < 65:
-                if education_years <= 8:
-                    mean_score = 8.5
-                    sd = 1.2
-                else:
-                    mean_score = 9.2
-                    sd = 0.9
-            elif age < 75:
-                if education_years <= 8:
-                    mean_score = 7.8
-                    sd = 1.5
-                else:
-                    mean_score = 8.7
-                    sd = 1.1
-            else:  # 75+
-                if education_years <= 8:
-                    mean_score = 7.2
-                    sd = 1.8
-                else:
-                    mean_score = 8.0
-                    sd = 1.4
+            mean_score, sd = norm_table.lookup("clock_drawing", age, education_group)
             
-            # Calcular Z-Score
+            # Calcular Z-Score (desvio padrão zero resulta em Z = 0, como em calculate_z_score)
+            if sd == 0:
+                return 0.0
             z_score = (total_score - mean_score) / sd
             
             return round(z_score, 2)
             
         except Exception as e:
-            print(f"Erro ao calcular Z-Score do Clock Drawing: {e}")
+            logger.exception("Erro ao calcular Z-Score do Clock Drawing")
             return 0.0
     
+    # ------------------------------------------------------------------
+    # Cálculo em lote (NumPy)
+    # ------------------------------------------------------------------
+    
+    def get_age_group_indices(self, ages):
+        """Versão vetorizada de _get_age_group: retorna índices em AGE_GROUPS"""
+        return NormTable.age_group_indices(ages)
+    
+    def get_education_group_indices(self, education_groups):
+        """Converte grupos educacionais ('low_education'/'high_education' ou índices) em índices"""
+        return NormTable.education_group_indices(education_groups)
+    
+    def get_patient_arrays(self, patients):
+        """Idades e grupos educacionais de uma lista de pacientes, prontos para o cálculo em lote"""
+        ages = np.fromiter((patient.age for patient in patients), dtype=np.int64)
+        education_groups = np.array([self._get_education_group(patient) for patient in patients])
+        return ages, education_groups
+    
+    def calculate_z_scores_batch(self, raw_scores, means, sds):
+        """Versão vetorizada de calculate_z_score (desvio padrão zero resulta em Z = 0)"""
+        raw_scores = np.asarray(raw_scores, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = (raw_scores - means) / sds
+        return np.where(sds == 0, 0.0, z_scores)
+    
+    def normalize_z_scores_for_deficit_batch(self, z_scores, test_type):
+        """Versão vetorizada de normalize_z_score_for_deficit"""
+        z_scores = np.asarray(z_scores, dtype=np.float64)
+        if test_type == 'performance':
+            return z_scores
+        elif test_type == 'time':
+            return np.where(z_scores > 0, -np.abs(z_scores), z_scores)
+        else:
+            raise ValueError(f"Tipo de teste inválido: {test_type}")
+    
+    def get_test_education_indices(self, test_name, norm_table, education_groups=None, education_years=None):
+        """Versão vetorizada de _get_test_education_group: retorna índices em EDUCATION_GROUPS"""
+        if norm_table.education_rule(test_name) == 'education_years_gt_8':
+            if education_years is None:
+                raise ValueError(f"Anos de estudo são necessários para {test_name}")
+            years = np.asarray([years or 8 for years in education_years])
+            return (years > 8).astype(np.intp)
+        if education_groups is None:
+            raise ValueError(f"Grupos educacionais são necessários para {test_name}")
+        return self.get_education_group_indices(education_groups)
+    
+    def calculate_test_z_scores_batch(self, test_name, ages, education_groups, raw_scores,
+                                      education_years=None, norm_table=None):
+        """
+        Calcula Z-Scores brutos em lote para um teste.
+        
+        Args:
+            test_name: chave do teste nos dados normativos
+            ages: idades (array-like)
+            education_groups: grupos educacionais (strings ou índices em EDUCATION_GROUPS)
+            raw_scores: escores brutos
+            education_years: anos de estudo (testes com regra ``education_years_gt_8``)
+            norm_table: tabela a usar (padrão: versão ativa)
+        
+        Returns:
+            np.ndarray com os Z-Scores, idênticos aos do cálculo individual
+        """
+        norm_table = norm_table or self.norm_table
+        education_idx = self.get_test_education_indices(test_name, norm_table, education_groups, education_years)
+        means, sds = norm_table.lookup_batch(test_name, ages, education_idx)
+        return self.calculate_z_scores_batch(raw_scores, means, sds)
+    
+    def calculate_tmt_z_scores_batch(self, ages, education_groups, times_a, times_b):
+        """Versão em lote de calculate_tmt_z_scores: retorna (z_a, z_b)"""
+        return (
+            self.calculate_test_z_scores_batch("tmt_a", ages, education_groups, times_a),
+            self.calculate_test_z_scores_batch("tmt_b", ages, education_groups, times_b),
+        )
+    
+    def calculate_digit_span_z_scores_batch(self, ages, education_groups, total_scores):
+        """Versão em lote de calculate_digit_span_z_score"""
+        return self.calculate_test_z_scores_batch("digit_span", ages, education_groups, total_scores)
+    
+    def calculate_stroop_z_scores_batch(self, ages, education_groups, interference_times):
+        """Versão em lote de calculate_stroop_z_score"""
+        return self.calculate_test_z_scores_batch("stroop", ages, education_groups, interference_times)
+    
+    def calculate_meem_z_scores_batch(self, ages, education_groups, total_scores):
+        """Versão em lote de calculate_meem_z_score"""
+        return self.calculate_test_z_scores_batch("meem", ages, education_groups, total_scores)
+    
+    def calculate_clock_drawing_z_scores_batch(self, ages, education_years, total_scores, education_groups=None,
+                                               norm_table=None):
+        """
+        Versão em lote de calculate_clock_drawing_z_score.
+        Usa anos de estudo (vazio ou zero equivalem a 8, como no cálculo individual).
+        """
+        norm_table = norm_table or self.norm_table
+        education_idx = self.get_test_education_indices("clock_drawing", norm_table, education_groups, education_years)
+        means, sds = norm_table.lookup_batch("clock_drawing", ages, education_idx)
+        z_scores = self.calculate_z_scores_batch(total_scores, means, sds)
+        # round() do Python para manter o mesmo arredondamento do cálculo individual
+        return np.fromiter((round(z, 2) for z in z_scores.tolist()), dtype=np.float64, count=len(z_scores))
+    
+    def weighted_test_scores(self, normalized_z_scores, weights=None):
+        """
+        Aplica os pesos por domínio cognitivo aos Z-scores normalizados.
+        
+        Args:
+            normalized_z_scores: {teste: Z-score normalizado} (tmt_a/tmt_b separados)
+            weights: WeightVector do perfil (padrão: perfil embutido)
+        
+        Returns:
+            tuple: ({domínio: {'score', 'weight'}}, soma dos pesos)
+        """
+        test_scores, _, total_weight = (weights or DEFAULT_WEIGHTS).score(normalized_z_scores)
+        return test_scores, total_weight
+    
+    def classify_risk(self, final_z_score):
+        """Classificação de risco a partir do Z-score final ponderado"""
+        # Sistema de classificação aprimorado baseado em evidências clínicas
+        # Critérios mais rigorosos para Z-scores normalizados
+        if final_z_score <= -2.5:
+            return 'CRITICAL'  # Déficit severo (< 1º percentil)
+        elif final_z_score <= -1.5:
+            return 'HIGH'      # Déficit moderado (< 7º percentil)
+        elif final_z_score <= -1.0:
+            return 'MODERATE'  # Déficit leve (< 16º percentil)
+        elif final_z_score <= -0.5:
+            return 'LOW'       # Limítrofe (< 31º percentil)
+        return 'MINIMAL'       # Normal (≥ 31º percentil)
+    
+    def classify_risk_batch(self, final_z_scores):
+        """Versão vetorizada de classify_risk"""
+        final_z_scores = np.asarray(final_z_scores, dtype=np.float64)
+        return np.select(
+            [final_z_scores <= -2.5, final_z_scores <= -1.5, final_z_scores <= -1.0, final_z_scores <= -0.5],
+            ['CRITICAL', 'HIGH', 'MODERATE', 'LOW'],
+            default='MINIMAL',
+        )
+    
+    def composite_score(self, results, weights=None):
+        """
+        Pontuação composta dos Z-scores atuais dos resultados (sem consultar o banco).
+        
+        Args:
+            results: AssessmentResults da avaliação
+            weights: WeightVector do perfil (padrão: perfil embutido)
+        
+        Returns:
+            CompositeScore | None: None se nenhum teste tiver Z-score
+        """
+        normalized_scores = results.normalized_z_scores()
+        # Z-score final: produto escalar dos Z-scores por domínio com os pesos do perfil
+        test_scores, final_z_score, total_weight = (weights or DEFAULT_WEIGHTS).score(normalized_scores)
+        if not test_scores or total_weight <= 0:
+            return None
+        
+        return CompositeScore(
+            result_z_scores={
+                test: tuple((field, getattr(result, field)) for field in result.Z_SCORE_FIELDS)
+                for test, result in results._asdict().items() if result is not None
+            },
+            normalized_z_scores=normalized_scores,
+            test_scores=test_scores,
+            final_z_score=final_z_score,
+            risk_score=self.classify_risk(final_z_score),
+            confidence=min(100, (len(test_scores) / 5) * 100),  # Confiança baseada em testes completados
+        )
+    
+    def _stored_z_scores_match(self, results, composite, norm_version):
+        """Os Z-scores gravados (e atuais) dos resultados coincidem com os da pontuação em cache?"""
+        for test, result in results._asdict().items():
+            if result is None or result.z_score_is_stale(norm_version):
+                continue
+            if any(getattr(result, field) != value for field, value in composite.result_z_scores[test]):
+                return False
+        return True
+    
+    def _stored_z_scores_current(self, results, stale_results):
+        """
+        Os Z-scores gravados (não recalculados agora) são os que as entradas e o
+        paciente atuais produzem? Só então a pontuação pode ir para o cache:
+        um Z-score gravado antes de uma mudança de idade ou escolaridade do
+        paciente não corresponde à chave.
+        """
+        for result in results.present():
+            if result in stale_results:
+                continue
+            expected = copy.copy(result)
+            expected.calculate_z_scores(self, result.assessment.patient)
+            if any(getattr(expected, field) != getattr(result, field) for field in result.Z_SCORE_FIELDS):
+                return False
+        return True
+    
+    @staticmethod
+    def _save_z_scores(results):
+        """Grava os Z-scores recalculados: um bulk_update por modelo de resultado"""
+        by_model = defaultdict(list)
+        for result in results:
+            by_model[type(result)].append(result)
+        for model, model_results in by_model.items():
+            model.objects.bulk_update(model_results, [*model.Z_SCORE_FIELDS, 'norm_version'])
+    
     def calculate_final_risk_score(self, assessment_id):
         """
         Calcula a pontuação final de risco baseada nos Z-Scores dos testes com sistema de pesos
         RF05 - Motor de Pontuação Aprimorado
+        
+        Usa os Z-scores já gravados nos resultados; só recalcula os desatualizados
+        (sem Z-score, calculados com outra versão das normas ou com entradas
+        alteradas). Os pesos são os do perfil da avaliação (ou o padrão da
+        instalação). A pontuação composta vem do cache (score_cache) quando as
+        mesmas entradas já foram pontuadas. As gravações são feitas em uma única
+        transação, com um bulk_update por tipo de resultado recalculado; uma
+        avaliação concluída cuja pontuação não mudou não é gravada de novo.
         """
         try:
-            assessment = Assessment.objects.get(id=assessment_id)
-            patient = assessment.patient
-            
-            # Sistema de pontuação com pesos e normalização
-            test_scores = {}
-            total_weight = 0
-            
-            # Digit Span - Peso: 1.5 (memória de trabalho fundamental)
-            if hasattr(assessment, 'digit_span_result'):
-                digit_result = assessment.digit_span_result
-                total_score = digit_result.total_score
-                z_score = self.calculate_digit_span_z_score(patient, total_score)
-                digit_result.z_score = z_score
-                digit_result.save()
-                # Normalizar para déficit (valores negativos = pior)
-                normalized_score = z_score  # Já correto (maior pontuação = melhor)
-                test_scores['digit_span'] = {'score': normalized_score, 'weight': 1.5}
-                total_weight += 1.5
-            
-            # TMT - Peso: 2.0 (função executiva central)
-            if hasattr(assessment, 'tmt_result'):
-                tmt_result = assessment.tmt_result
-                z_score_a_raw, z_score_b_raw = self.calculate_tmt_z_scores(
-                    patient,
-                    tmt_result.time_a_seconds,
-                    tmt_result.time_b_seconds,
-                    tmt_result.errors_a,
-                    tmt_result.errors_b
-                )
-                # Persistir z-scores normalizados para manter consistência (maior tempo = pior = negativo)
-                normalized_a = -abs(z_score_a_raw) if z_score_a_raw > 0 else z_score_a_raw
-                normalized_b = -abs(z_score_b_raw) if z_score_b_raw > 0 else z_score_b_raw
-                # Atualizar somente se mudaram ou estiverem vazios
-                if tmt_result.z_score_a != normalized_a or tmt_result.z_score_b != normalized_b:
-                    tmt_result.z_score_a = round(normalized_a, 2)
-                    tmt_result.z_score_b = round(normalized_b, 2)
-                    tmt_result.save()
-                # Média ponderada TMT-A e TMT-B (TMT-B tem mais peso)
-                tmt_composite = (normalized_a * 0.4 + normalized_b * 0.6)
-                test_scores['tmt'] = {'score': tmt_composite, 'weight': 2.0}
-                total_weight += 2.0
-            
-            # Stroop - Peso: 1.8 (controle inibitório)
-            if hasattr(assessment, 'stroop_result'):
-                stroop_result = assessment.stroop_result
-                interference_time = stroop_result.interference_time
-                z_score = self.calculate_stroop_z_score(patient, interference_time)
-                stroop_result.z_score = z_score
-                stroop_result.save()
-                # Normalizar para déficit (inverter sinal - maior tempo = pior = z negativo)
-                normalized_score = -abs(z_score) if z_score > 0 else z_score
-                test_scores['stroop'] = {'score': normalized_score, 'weight': 1.8}
-                total_weight += 1.8
-            
-            # MEEM - Peso: 2.5 (estado cognitivo global)
-            if hasattr(assessment, 'meem_result'):
-                meem_result = assessment.meem_result
-                total_score = meem_result.total_score
-                z_score = self.calculate_meem_z_score(patient, total_score)
-                meem_result.z_score = z_score
-                meem_result.save()
-                # Normalizar para déficit (valores negativos = pior)
-                normalized_score = z_score  # Já correto (maior pontuação = melhor)
-                test_scores['meem'] = {'score': normalized_score, 'weight': 2.5}
-                total_weight += 2.5
-            
-            # Clock Drawing - Peso: 1.2 (função visuoespacial)
-            if hasattr(assessment, 'clock_drawing_result'):
-                clock_result = assessment.clock_drawing_result
-                total_score = clock_result.total_score
-                z_score = self.calculate_clock_drawing_z_score(patient, total_score)
-                clock_result.z_score = z_score
-                clock_result.save()
-                # Normalizar para déficit (valores negativos = pior)
-                normalized_score = z_score  # Já correto (maior pontuação = melhor)
-                test_scores['clock_drawing'] = {'score': normalized_score, 'weight': 1.2}
-                total_weight += 1.2
-            
-            # Calcular Z-Score final ponderado
-            if test_scores and total_weight > 0:
-                weighted_sum = sum(test['score'] * test['weight'] for test in test_scores.values())
-                final_z_score = weighted_sum / total_weight
-                
-                # Sistema de classificação aprimorado baseado em evidências clínicas
-                # Critérios mais rigorosos para Z-scores normalizados
-                if final_z_score <= -2.5:
-                    risk_score = 'CRITICAL'  # Déficit severo (< 1º percentil)
-                elif final_z_score <= -1.5:
-                    risk_score = 'HIGH'      # Déficit moderado (< 7º percentil)
-                elif final_z_score <= -1.0:
-                    risk_score = 'MODERATE'  # Déficit leve (< 16º percentil)
-                elif final_z_score <= -0.5:
-                    risk_score = 'LOW'       # Limítrofe (< 31º percentil)
-                else:
-                    risk_score = 'MINIMAL'   # Normal (≥ 31º percentil)
-                
-                # Salvar dados adicionais para análise
-                assessment.final_z_score = round(final_z_score, 3)
-                assessment.total_tests_completed = len(test_scores)
-                assessment.confidence_level = min(100, (len(test_scores) / 5) * 100)
-                assessment.final_risk_score = risk_score
-                assessment.mark_completed()
-                
-                return {
-                    'risk_score': risk_score,
-                    'final_z_score': final_z_score,
-                    'test_scores': test_scores,
-                    'confidence': min(100, (len(test_scores) / 5) * 100)  # Confiança baseada em testes completados
-                }
-            
-            return None
-            
+            assessment = Assessment.objects.with_results().select_related('patient').get(id=assessment_id)
         except Assessment.DoesNotExist:
             raise ValueError(f"Assessment with id {assessment_id} not found")
+        
+        results = assessment.results
+        norm_table = self.norm_table
+        weights = self.weight_store.for_assessment(assessment)
+        stale_results = [result for result in results.present() if result.z_score_is_stale(norm_table.version)]
+        
+        key = composite = None
+        if score_cache.enabled:
+            key = composite_key(results, assessment.patient, norm_table, weights.version, self)
+            composite = score_cache.get(
+                key, validate=lambda cached: self._stored_z_scores_match(results, cached, norm_table.version)
+            )
+        
+        if composite is not None:
+            # Z-scores dos resultados desatualizados vêm da mesma entrada do cache
+            for test, result in results._asdict().items():
+                if result in stale_results:
+                    for field, value in composite.result_z_scores[test]:
+                        setattr(result, field, value)
+                    result.norm_version = norm_table.version
+        else:
+            for result in stale_results:
+                result.refresh_z_scores(self, force=True)
+            composite = self.composite_score(results, weights)
+            if key and composite is not None and self._stored_z_scores_current(results, stale_results):
+                score_cache.set(key, composite)
+        
+        if composite is None:
+            with transaction.atomic():
+                self._save_z_scores(stale_results)
+            return None
+        
+        # Salvar dados adicionais para análise
+        score_fields = {
+            'final_z_score': round(composite.final_z_score, 3),
+            'total_tests_completed': len(composite.test_scores),
+            'confidence_level': composite.confidence,
+            'final_risk_score': composite.risk_score,
+        }
+        for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+            score_fields[field] = composite.normalized_z_scores.get(test_name)
+        unchanged = (
+            not stale_results and assessment.status == 'COMPLETED'
+            and all(getattr(assessment, field) == value for field, value in score_fields.items())
+        )
+        if not unchanged:
+            with transaction.atomic():
+                self._save_z_scores(stale_results)
+                for field, value in score_fields.items():
+                    setattr(assessment, field, value)
+                assessment.mark_completed()
+        
+        return {
+            'risk_score': composite.risk_score,
+            'final_z_score': composite.final_z_score,
+            # Cópia: a entrada do cache é compartilhada
+            'test_scores': {domain: dict(score) for domain, score in composite.test_scores.items()},
+            'confidence': composite.confidence
+        }
 
 # Instância global do calculador
 score_calculator = AssessmentScoreCalculator()
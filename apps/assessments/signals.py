@@ -0,0 +1,75 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.view_cache import schedule_data_version_bump
+from apps.patients.models import Patient
+from .daily_stats import assessment_local_date, schedule_daily_stats_refresh
+from .models import (
+    Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult
+)
+
+RESULT_MODELS = (DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult)
+
+
+@receiver(post_init, sender=Assessment)
+def remember_assessment_day(sender, instance, **kwargs):
+    """Guarda o dia original da avaliação para detectar mudanças de created_at"""
+    # Lido de __dict__: com created_at adiado (only/defer) não dispara uma consulta por instância
+    instance._stats_day = assessment_local_date(instance.__dict__.get('created_at'))
+
+
+@receiver(post_save, sender=Assessment)
+@receiver(post_delete, sender=Assessment)
+def refresh_stats_for_assessment(sender, instance, **kwargs):
+    """Atualiza o rollup diário do dia da avaliação (e do dia anterior, se mudou)"""
+    day = assessment_local_date(instance.created_at)
+    previous_day = getattr(instance, '_stats_day', None)
+
+    schedule_daily_stats_refresh(day)
+    if previous_day and previous_day != day:
+        schedule_daily_stats_refresh(previous_day)
+    instance._stats_day = day
+
+
+def refresh_stats_for_result(sender, instance, **kwargs):
+    """Atualiza o rollup diário quando um resultado de teste muda"""
+    try:
+        assessment = instance.assessment
+    except Assessment.DoesNotExist:
+        return
+    schedule_daily_stats_refresh(assessment_local_date(assessment.created_at))
+
+
+for result_model in RESULT_MODELS:
+    post_save.connect(refresh_stats_for_result, sender=result_model, dispatch_uid=f'daily_stats_save_{result_model.__name__}')
+    post_delete.connect(refresh_stats_for_result, sender=result_model, dispatch_uid=f'daily_stats_delete_{result_model.__name__}')
+
+
+@receiver(post_save, sender=Assessment)
+@receiver(post_delete, sender=Assessment)
+def invalidate_cached_views_for_assessment(sender, instance, **kwargs):
+    """Invalida os contextos em cache da avaliação, do paciente e dos dashboards"""
+    schedule_data_version_bump(instance.patient_id, [instance.pk])
+
+
+def invalidate_cached_views_for_result(sender, instance, **kwargs):
+    """Invalida os contextos em cache quando um resultado de teste muda"""
+    try:
+        assessment = instance.assessment
+    except Assessment.DoesNotExist:
+        schedule_data_version_bump()
+        return
+    schedule_data_version_bump(assessment.patient_id, [assessment.pk])
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_cached_views_for_patient(sender, instance, **kwargs):
+    """Invalida os contextos em cache do paciente e das suas avaliações"""
+    assessment_ids = list(Assessment.objects.filter(patient_id=instance.pk).values_list('pk', flat=True))
+    schedule_data_version_bump(instance.pk, assessment_ids)
+
+
+for result_model in RESULT_MODELS:
+    post_save.connect(invalidate_cached_views_for_result, sender=result_model, dispatch_uid=f'view_cache_save_{result_model.__name__}')
+    post_delete.connect(invalidate_cached_views_for_result, sender=result_model, dispatch_uid=f'view_cache_delete_{result_model.__name__}')
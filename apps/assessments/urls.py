@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AssessmentViewSet, meem_test_view, clock_drawing_test_view
+from .views import AssessmentViewSet, meem_test_view, clock_drawing_test_view, clock_drawing_image
 
 # Router para as ViewSets
 router = DefaultRouter()
@@ -15,4 +15,5 @@ urlpatterns = [
     # Views de testes
     path('<int:assessment_id>/meem/', meem_test_view, name='meem_test'),
     path('<int:assessment_id>/clock-drawing/', clock_drawing_test_view, name='clock_drawing_test'),
+    path('<int:assessment_id>/clock-drawing/image/', clock_drawing_image, name='clock_drawing_image'),
 ]
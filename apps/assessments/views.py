@@ -1,3 +1,5 @@
+import hashlib
+
 from django.shortcuts import render, get_object_or_404, redirect
 from rest_framework import generics, status, viewsets, permissions
 from rest_framework.decorators import action
@@ -5,14 +7,23 @@ from rest_framework.response import Response
 from django.db import transaction
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
 
-from .models import Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult
+from .bulk_submit import BulkSubmitSerializer, submit_results_bulk
+from .drawings import drawing_response
+from .export import EXPORT_FORMATS, stream_csv, stream_ndjson
+from .models import RESULT_RELATIONS, Assessment, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult
 from .serializers import (
-    AssessmentListSerializer, AssessmentDetailSerializer, AssessmentCreateSerializer,
+    AssessmentListSerializer, AssessmentDetailSerializer, AssessmentCreateSerializer, AssessmentExportSerializer,
     SubmitDigitSpanSerializer, SubmitTMTSerializer, SubmitStroopSerializer, SubmitMeemSerializer,
-    DigitSpanResultSerializer, TMTResultSerializer, StroopResultSerializer, MeemResultSerializer
+    DigitSpanResultSerializer, TMTResultSerializer, StroopResultSerializer, MeemResultSerializer,
+    requested_fields,
 )
-from .services import calculate_final_risk
+from .pagination import AssessmentCursorPagination
+from .scoring_queue import enqueue_final_risk, enqueue_if_complete
 from .forms import MeemForm
 
 class AssessmentViewSet(viewsets.ModelViewSet):
@@ -22,17 +33,29 @@ class AssessmentViewSet(viewsets.ModelViewSet):
     """
     queryset = Assessment.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AssessmentCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
             return AssessmentListSerializer
         elif self.action == 'create':
             return AssessmentCreateSerializer
+        elif self.action == 'export':
+            return AssessmentExportSerializer
         return AssessmentDetailSerializer
     
     def get_queryset(self):
         """Filtra assessments baseado no usuário logado"""
-        queryset = Assessment.objects.select_related('patient', 'assessor')
+        if self.action == 'list':
+            queryset = self._list_queryset()
+        elif self.action == 'export':
+            # Todos os resultados (com as observações), sem o desenho legado em base64
+            queryset = Assessment.objects.select_related('patient', 'assessor', 'weight_profile', *RESULT_RELATIONS).defer(
+                'clock_drawing_result__drawing_data'
+            )
+        else:
+            # Detalhe e submissões consultam os resultados: mesma consulta
+            queryset = Assessment.objects.select_related('patient', 'assessor', 'weight_profile').with_results()
         
         # Filtros opcionais
         patient_id = self.request.query_params.get('patient_id')
@@ -43,12 +66,67 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
             
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
+    
+    def _list_queryset(self):
+        """Listagem lendo só as colunas dos campos serializados (respeitando ?fields=)"""
+        serializer_class = self.get_serializer_class()
+        requested = requested_fields(self.request)
+        fields = [
+            name for name in serializer_class.Meta.fields
+            if requested is None or name in requested
+        ]
+        columns = serializer_class.columns_for(fields)
+        # Campos da ordenação do cursor: o paginador os lê de cada linha para montar o próximo cursor
+        columns.extend(field.lstrip('-') for field in self.pagination_class.ordering)
+        queryset = Assessment.objects.only(*columns)
+        relations = {column.split('__')[0] for column in columns if '__' in column}
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset
     
     def perform_create(self, serializer):
         """Define o assessor como o usuário logado"""
         serializer.save(assessor=self.request.user)
     
+    @action(detail=False, methods=['post'], url_path='bulk-submit')
+    def bulk_submit(self, request):
+        """
+        Endpoint para submeter resultados de várias avaliações de uma vez (sincronização offline)
+        POST /api/assessments/bulk-submit/
+        {"items": [{"assessment_id": 1, "digit_span": {...}, "tmt": {...}, "stroop": {...}, "meem": {...}}]}
+        
+        Responde 207 com o status de cada item (201, 400, 403, 404 ou 409), na ordem recebida.
+        """
+        serializer = BulkSubmitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = submit_results_bulk(serializer.validated_data['items'], request.user)
+        return Response({'items': items}, status=status.HTTP_207_MULTI_STATUS)
+    
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Exporta todas as avaliações filtradas, com os resultados, em fluxo
+        GET /api/assessments/export/?output=ndjson|csv (aceita os filtros e ?fields= da listagem)
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Formato inválido: use {' ou '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Um serializer para todas as linhas (cada avaliação via to_representation)
+        serializer = self.get_serializer()
+        stream = stream_csv if output == 'csv' else stream_ndjson
+        response = StreamingHttpResponse(
+            stream(self.get_queryset(), serializer), content_type=EXPORT_FORMATS[output]
+        )
+        response['Content-Disposition'] = f'attachment; filename="avaliacoes.{output}"'
+        return response
+    
     @action(detail=True, methods=['post'], url_path='submit-digit-span')
     def submit_digit_span(self, request, pk=None):
         """
@@ -65,7 +143,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
             )
         
         # Verifica se já existe um resultado
-        if hasattr(assessment, 'digit_span_result'):
+        if assessment.results.digit_span is not None:
             return Response(
                 {'error': 'Resultado do Digit Span já foi submetido para esta avaliação'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -106,7 +184,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if hasattr(assessment, 'tmt_result'):
+        if assessment.results.tmt is not None:
             return Response(
                 {'error': 'Resultado do TMT já foi submetido para esta avaliação'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -144,7 +222,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if hasattr(assessment, 'stroop_result'):
+        if assessment.results.stroop is not None:
             return Response(
                 {'error': 'Resultado do Stroop já foi submetido para esta avaliação'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -182,7 +260,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if hasattr(assessment, 'meem_result'):
+        if assessment.results.meem is not None:
             return Response(
                 {'error': 'Resultado do MEEM já foi submetido para esta avaliação'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -208,22 +286,10 @@ class AssessmentViewSet(viewsets.ModelViewSet):
 
     def _check_and_calculate_final_score(self, assessment):
         """
-        Verifica se todos os testes foram completados e calcula a pontuação final
+        Verifica se todos os testes foram completados e enfileira o cálculo da pontuação final
+        (executado pelo worker process_scoring_jobs; acompanhe em /scoring/)
         """
-        has_digit_span = hasattr(assessment, 'digit_span_result')
-        has_tmt = hasattr(assessment, 'tmt_result')
-        has_stroop = hasattr(assessment, 'stroop_result')
-        has_meem = hasattr(assessment, 'meem_result')
-        
-        if has_digit_span and has_tmt and has_stroop and has_meem:
-            # Todos os testes completados, calcular pontuação final
-            try:
-                final_score = calculate_final_risk(assessment.id)
-                if final_score:
-                    assessment.refresh_from_db()  # Recarrega o objeto atualizado
-            except Exception as e:
-                # Log do erro, mas não falha a requisição
-                print(f"Erro ao calcular pontuação final: {e}")
+        enqueue_if_complete(assessment)
     
     @action(detail=True, methods=['get'], url_path='results')
     def get_results(self, request, pk=None):
@@ -233,19 +299,20 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         """
         assessment = self.get_object()
         
+        test_results = assessment.results
         results = {}
         
-        if hasattr(assessment, 'digit_span_result'):
-            results['digit_span'] = DigitSpanResultSerializer(assessment.digit_span_result).data
+        if test_results.digit_span is not None:
+            results['digit_span'] = DigitSpanResultSerializer(test_results.digit_span).data
         
-        if hasattr(assessment, 'tmt_result'):
-            results['tmt'] = TMTResultSerializer(assessment.tmt_result).data
+        if test_results.tmt is not None:
+            results['tmt'] = TMTResultSerializer(test_results.tmt).data
         
-        if hasattr(assessment, 'stroop_result'):
-            results['stroop'] = StroopResultSerializer(assessment.stroop_result).data
+        if test_results.stroop is not None:
+            results['stroop'] = StroopResultSerializer(test_results.stroop).data
         
-        if hasattr(assessment, 'meem_result'):
-            results['meem'] = MeemResultSerializer(assessment.meem_result).data
+        if test_results.meem is not None:
+            results['meem'] = MeemResultSerializer(test_results.meem).data
         
         return Response({
             'assessment_id': assessment.id,
@@ -254,6 +321,46 @@ class AssessmentViewSet(viewsets.ModelViewSet):
             'results': results
         })
     
+    @action(detail=True, methods=['get'], url_path='scoring')
+    def scoring(self, request, pk=None):
+        """
+        Situação do cálculo do risco final (para consulta periódica)
+        GET /api/assessments/<id>/scoring/
+        
+        Responde 304 quando o If-None-Match confere com o ETag (nada mudou).
+        """
+        assessment = self.get_object()
+        job = assessment.scoring_jobs.order_by('-created_at', '-id').first()
+        
+        data = {
+            'assessment_id': assessment.id,
+            'status': assessment.status,
+            'scoring_status': assessment.scoring_status,
+            'final_risk_score': assessment.final_risk_score,
+            'final_z_score': assessment.final_z_score,
+            'job': None,
+        }
+        if job is not None:
+            data['job'] = {
+                'id': job.id,
+                'status': job.status,
+                'attempts': job.attempts,
+                'last_error': job.last_error,
+                'run_after': job.run_after,
+                'finished_at': job.finished_at,
+            }
+        
+        fingerprint = f"{data['status']}|{data['scoring_status']}|{data['final_z_score']}|{job.pk if job else ''}|{job.updated_at if job else ''}"
+        etag = f'"{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        
+        response = Response(data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
     @action(detail=True, methods=['post'], url_path='recalculate-score')
     def recalculate_score(self, request, pk=None):
         """
@@ -268,27 +375,38 @@ class AssessmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        try:
-            final_score = calculate_final_risk(assessment.id)
-            assessment.refresh_from_db()
-            
+        # Pela fila (mesmo job idempotente da finalização); force: roda de novo um job já concluído
+        job, _ = enqueue_final_risk(assessment, force=True)
+        job.refresh_from_db()
+        assessment.refresh_from_db()
+        
+        if job.status == 'FAILED':
+            return Response(
+                {'error': f'Erro ao recalcular pontuação: {job.last_error}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if job.status == 'DONE':
             return Response({
                 'message': 'Pontuação recalculada com sucesso',
                 'final_risk_score': assessment.final_risk_score,
-                'status': assessment.status
+                'status': assessment.status,
+                'scoring_job': job.pk,
+                'scoring_status': assessment.scoring_status,
             })
-        except Exception as e:
-            return Response(
-                {'error': f'Erro ao recalcular pontuação: {str(e)}'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response({
+            'message': 'Recálculo da pontuação enfileirado',
+            'final_risk_score': assessment.final_risk_score,
+            'status': assessment.status,
+            'scoring_job': job.pk,
+            'scoring_status': assessment.scoring_status,
+        }, status=status.HTTP_202_ACCEPTED)
 
 @login_required
 def meem_test_view(request, assessment_id):
     """
     View para aplicação do teste MEEM
     """
-    assessment = get_object_or_404(Assessment, id=assessment_id)
+    assessment = get_object_or_404(Assessment.objects.with_results(), id=assessment_id)
     
     # Verificar se o usuário tem permissão
     if assessment.assessor != request.user:
@@ -296,7 +414,7 @@ def meem_test_view(request, assessment_id):
         return redirect('assessment_list')
     
     # Verificar se já existe resultado MEEM
-    if hasattr(assessment, 'meem_result'):
+    if assessment.results.meem is not None:
         messages.info(request, 'O teste MEEM já foi aplicado nesta avaliação.')
         return redirect('run_tests', assessment_id=assessment.id)
     
@@ -306,16 +424,7 @@ def meem_test_view(request, assessment_id):
             # Criar resultado MEEM
             meem_result = form.save(commit=False)
             meem_result.assessment = assessment
-            meem_result.save()
-            
-            # Calcular Z-score usando dados normativos brasileiros
-            from .services import score_calculator
-            patient = assessment.patient
-            total_score = meem_result.total_score
-            z_score = score_calculator.calculate_meem_z_score(patient, total_score)
-            
-            # Atualizar resultado com z-score
-            meem_result.z_score = round(z_score, 2)
+            # Pontuação total e Z-score calculados em MeemResult.save
             meem_result.save()
             
             # Atualizar status do assessment
@@ -342,7 +451,7 @@ def clock_drawing_test_view(request, assessment_id):
     """
     View para aplicação do Teste do Relógio (Clock Drawing Test)
     """
-    assessment = get_object_or_404(Assessment, id=assessment_id)
+    assessment = get_object_or_404(Assessment.objects.with_results(), id=assessment_id)
     
     # Verificar se o usuário tem permissão
     if assessment.assessor != request.user:
@@ -350,7 +459,7 @@ def clock_drawing_test_view(request, assessment_id):
         return redirect('assessment_list')
     
     # Verificar se já existe resultado do Clock Drawing Test
-    if hasattr(assessment, 'clock_drawing_result'):
+    if assessment.results.clock_drawing is not None:
         messages.info(request, 'O Teste do Relógio já foi aplicado nesta avaliação.')
         return redirect('run_tests', assessment_id=assessment.id)
     
@@ -361,16 +470,7 @@ def clock_drawing_test_view(request, assessment_id):
             # Criar resultado do Clock Drawing Test
             clock_result = form.save(commit=False)
             clock_result.assessment = assessment
-            clock_result.save()
-            
-            # Calcular Z-score usando dados normativos
-            from .services import score_calculator
-            patient = assessment.patient
-            total_score = clock_result.total_score
-            z_score = score_calculator.calculate_clock_drawing_z_score(patient, total_score)
-            
-            # Atualizar resultado com z-score
-            clock_result.z_score = round(z_score, 2)
+            # Pontuação total e Z-score calculados em ClockDrawingResult.save
             clock_result.save()
             
             # Atualizar status do assessment
@@ -391,4 +491,31 @@ def clock_drawing_test_view(request, assessment_id):
         'patient': assessment.patient,
     }
     
-    return render(request, 'assessments/tests/clock_drawing_test.html', context)
\ No newline at end of file
+    return render(request, 'assessments/tests/clock_drawing_test.html', context)
+
+
+@login_required
+@require_safe
+def clock_drawing_image(request, assessment_id):
+    """
+    Imagem do desenho do Teste do Relógio (``?thumbnail=1`` para a miniatura).
+    
+    Servida em blocos a partir do armazenamento de arquivos, com ETag e Range.
+    """
+    clock_result = get_object_or_404(
+        ClockDrawingResult.objects.select_related('assessment').only(
+            'drawing_image', 'drawing_thumbnail', 'assessment__assessor_id'
+        ),
+        assessment_id=assessment_id,
+    )
+    if clock_result.assessment.assessor_id != request.user.id and not request.user.is_staff:
+        raise PermissionDenied
+    
+    name = clock_result.drawing_image.name
+    etag = clock_result.drawing_etag
+    if request.GET.get('thumbnail') and clock_result.drawing_thumbnail:
+        name = clock_result.drawing_thumbnail.name
+        etag = f'{etag}-thumbnail'
+    if not name:
+        raise Http404('Avaliação sem desenho do Teste do Relógio.')
+    return drawing_response(request, name, etag)
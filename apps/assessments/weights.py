@@ -0,0 +1,234 @@
+"""
+Perfis de pesos do Z-score final.
+
+O Z-score final é a média ponderada dos Z-scores normalizados por domínio
+cognitivo (DOMAINS; o TMT entra como a combinação de TMT-A e TMT-B). Os pesos
+vêm de um perfil: o padrão (TEST_WEIGHTS e TMT_WEIGHTS) ou um WeightProfile
+cadastrado, escolhido por avaliação (protocolo) ou para a instalação toda
+(``settings.DEFAULT_WEIGHT_PROFILE``). Cada perfil é compilado uma vez em um
+WeightVector, e o Z-score final de uma ou de muitas avaliações é o produto
+escalar do vetor de Z-scores dos domínios com o vetor de pesos, dividido pela
+soma dos pesos dos domínios realizados.
+
+O produto escalar é somado domínio a domínio, na ordem de DOMAINS (e não com
+``np.dot``, cuja ordem de soma depende da biblioteca de álgebra linear), para
+que o resultado seja idêntico ao já gravado nas avaliações.
+"""
+
+import hashlib
+import json
+import threading
+
+import numpy as np
+from django.conf import settings
+
+# Domínios cognitivos, na ordem de composição do Z-score final
+DOMAINS = ('digit_span', 'tmt', 'stroop', 'meem', 'clock_drawing')
+
+# Pesos por domínio cognitivo do perfil padrão
+TEST_WEIGHTS = {
+    'digit_span': 1.5,     # memória de trabalho fundamental
+    'tmt': 2.0,            # função executiva central
+    'stroop': 1.8,         # controle inibitório
+    'meem': 2.5,           # estado cognitivo global
+    'clock_drawing': 1.2,  # função visuoespacial
+}
+
+# Composição do domínio TMT no perfil padrão
+TMT_WEIGHTS = {'tmt_a': 0.4, 'tmt_b': 0.6}
+
+DEFAULT_PROFILE_SLUG = 'padrao'
+
+
+class WeightProfileError(ValueError):
+    """Perfil de pesos inválido ou inexistente"""
+
+
+class WeightVector:
+    """
+    Perfil de pesos compilado.
+
+    Attributes:
+        slug: identificador do perfil
+        profile_id: chave de WeightProfile (None no perfil padrão embutido)
+        weights: pesos na ordem de DOMAINS
+        tmt_weights: pesos de TMT-A e TMT-B no domínio TMT
+        version: hash dos pesos (perfis com os mesmos pesos têm a mesma versão)
+    """
+
+    def __init__(self, slug, domain_weights, tmt_weights, profile_id=None):
+        self.slug = slug
+        self.profile_id = profile_id
+        self.weights = np.array([float(domain_weights[domain]) for domain in DOMAINS], dtype=np.float64)
+        self.tmt_weights = np.array([float(tmt_weights['tmt_a']), float(tmt_weights['tmt_b'])], dtype=np.float64)
+        for array in (self.weights, self.tmt_weights):
+            array.flags.writeable = False
+        self.version = hashlib.sha256(
+            json.dumps([self.weights.tolist(), self.tmt_weights.tolist()]).encode()
+        ).hexdigest()[:12]
+
+    def __repr__(self):
+        return f"<WeightVector {self.slug} version={self.version}>"
+
+    def as_dict(self):
+        """Pesos no formato de WeightProfile.weights"""
+        weights = dict(zip(DOMAINS, self.weights.tolist()))
+        weights.update(zip(('tmt_a', 'tmt_b'), self.tmt_weights.tolist()))
+        return weights
+
+    @staticmethod
+    def domain_z_scores(normalized_z_scores, tmt_weights):
+        """
+        Matriz (avaliações x DOMAINS) dos Z-scores por domínio.
+
+        Args:
+            normalized_z_scores: {teste: array de Z-scores normalizados} (NaN nos ausentes;
+                tmt_a/tmt_b separados)
+            tmt_weights: array (2,) ou (avaliações, 2) com os pesos de TMT-A e TMT-B
+
+        Returns:
+            np.ndarray com NaN nos domínios não realizados
+        """
+        tmt_weights = np.asarray(tmt_weights, dtype=np.float64).reshape(-1, 2)
+        # Média ponderada TMT-A e TMT-B (ausente se faltar um dos dois)
+        tmt = normalized_z_scores['tmt_a'] * tmt_weights[:, 0] + normalized_z_scores['tmt_b'] * tmt_weights[:, 1]
+        columns = [tmt if domain == 'tmt' else normalized_z_scores[domain] for domain in DOMAINS]
+        return np.column_stack([np.asarray(column, dtype=np.float64) for column in columns])
+
+    @staticmethod
+    def final_z_scores(domain_z_scores, weights):
+        """
+        Z-score final ponderado de cada avaliação.
+
+        Args:
+            domain_z_scores: matriz (avaliações x DOMAINS), NaN nos domínios não realizados
+            weights: pesos (DOMAINS,) ou (avaliações x DOMAINS)
+
+        Returns:
+            tuple: (Z-scores finais, soma dos pesos, domínios realizados); o Z-score
+            é NaN nas avaliações sem peso
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), domain_z_scores.shape)
+        present = ~np.isnan(domain_z_scores)
+        terms = np.where(present, domain_z_scores * weights, 0.0)
+        domain_weights = np.where(present, weights, 0.0)
+
+        # Produto escalar por linha, somado na ordem de DOMAINS
+        weighted_sum = np.zeros(len(domain_z_scores))
+        total_weight = np.zeros(len(domain_z_scores))
+        for column in range(len(DOMAINS)):
+            weighted_sum += terms[:, column]
+            total_weight += domain_weights[:, column]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            final_z_scores = np.where(total_weight > 0, weighted_sum / total_weight, np.nan)
+        return final_z_scores, total_weight, present.sum(axis=1)
+
+    def score(self, normalized_z_scores):
+        """
+        Pontuação de uma avaliação.
+
+        Args:
+            normalized_z_scores: {teste: Z-score normalizado} dos testes realizados
+
+        Returns:
+            tuple: ({domínio: {'score', 'weight'}}, Z-score final ou None, soma dos pesos)
+        """
+        columns = {
+            test: np.array([normalized_z_scores.get(test, np.nan)], dtype=np.float64)
+            for test in ('tmt_a', 'tmt_b', *DOMAINS) if test != 'tmt'
+        }
+        domain_z_scores = self.domain_z_scores(columns, self.tmt_weights)
+        final_z_scores, total_weight, _ = self.final_z_scores(domain_z_scores, self.weights)
+        test_scores = {
+            domain: {'score': score, 'weight': weight}
+            for domain, score, weight in zip(DOMAINS, domain_z_scores[0].tolist(), self.weights.tolist())
+            if not np.isnan(score)
+        }
+        final_z_score = final_z_scores[0].item()
+        return test_scores, None if np.isnan(final_z_score) else final_z_score, total_weight[0].item()
+
+
+def compile_weight_profile(weights, slug, profile_id=None):
+    """
+    Valida os pesos de um perfil e o compila em um WeightVector.
+
+    Args:
+        weights: {domínio: peso, 'tmt_a': peso, 'tmt_b': peso}
+
+    Raises:
+        WeightProfileError: se faltar algum peso, houver chave desconhecida ou
+        valor inválido (negativo ou não numérico) ou se todos os domínios tiverem peso zero
+    """
+    if not isinstance(weights, dict):
+        raise WeightProfileError("Os pesos devem ser um objeto {domínio: peso}")
+    expected = (*DOMAINS, 'tmt_a', 'tmt_b')
+    missing = [key for key in expected if key not in weights]
+    unknown = sorted(set(weights) - set(expected))
+    if missing or unknown:
+        raise WeightProfileError(
+            f"Pesos faltando: {', '.join(missing) or '-'}; chaves desconhecidas: {', '.join(unknown) or '-'}"
+        )
+    for key in expected:
+        value = weights[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value) or value < 0:
+            raise WeightProfileError(f"Peso inválido para {key}: {value!r}")
+    if not any(weights[domain] > 0 for domain in DOMAINS):
+        raise WeightProfileError("Ao menos um domínio precisa ter peso maior que zero")
+    return WeightVector(slug, weights, weights, profile_id=profile_id)
+
+
+# Perfil padrão embutido (vale sem DEFAULT_WEIGHT_PROFILE)
+DEFAULT_WEIGHTS = compile_weight_profile({**TEST_WEIGHTS, **TMT_WEIGHTS}, DEFAULT_PROFILE_SLUG)
+
+
+class WeightStore:
+    """
+    Fornece o WeightVector de cada perfil.
+
+    Perfis não são alterados depois de criados (para mudar pesos, cadastra-se
+    outro perfil), então cada um é compilado uma única vez por processo.
+    """
+
+    def __init__(self, builtin=DEFAULT_WEIGHTS):
+        self.builtin = builtin
+        self._by_id = {}
+        self._by_slug = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, vector):
+        with self._lock:
+            self._by_id[vector.profile_id] = vector
+            self._by_slug[vector.slug] = vector
+        return vector
+
+    def _load(self, **lookup):
+        from .models import WeightProfile
+
+        row = WeightProfile.objects.filter(**lookup).values_list('pk', 'slug', 'weights').first()
+        if row is None:
+            raise WeightProfileError(f"Perfil de pesos não encontrado: {next(iter(lookup.values()))}")
+        pk, slug, weights = row
+        return self._remember(compile_weight_profile(weights, slug, profile_id=pk))
+
+    def get(self, profile_id=None):
+        """WeightVector de um WeightProfile (pela chave) ou, com None, o perfil padrão da instalação"""
+        if profile_id is None:
+            return self.default()
+        vector = self._by_id.get(profile_id)
+        return vector if vector is not None else self._load(pk=profile_id)
+
+    def get_by_slug(self, slug):
+        """WeightVector de um perfil cadastrado, pelo slug"""
+        vector = self._by_slug.get(slug)
+        return vector if vector is not None else self._load(slug=slug)
+
+    def default(self):
+        """Perfil padrão da instalação (settings.DEFAULT_WEIGHT_PROFILE ou o embutido)"""
+        slug = getattr(settings, 'DEFAULT_WEIGHT_PROFILE', '')
+        if not slug or slug == self.builtin.slug:
+            return self.builtin
+        return self.get_by_slug(slug)
+
+    def for_assessment(self, assessment):
+        """Perfil usado na pontuação da avaliação"""
+        return self.get(assessment.weight_profile_id)
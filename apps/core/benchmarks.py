@@ -0,0 +1,125 @@
+"""
+Benchmark dos caminhos críticos (dashboards, listas, histórico e pontuação).
+
+Uma coorte sintética reproduzível (mesma semente = mesmos dados) é criada em
+lote por ``apps.core.synthetic_data``, já pontuada com o cálculo vetorizado.
+Cada caminho é executado algumas vezes; a latência (mediana e máximo) e o
+número de consultas SQL são comparados com uma linha de base em JSON. O comando ``benchmark_hot_paths`` roda tudo em um banco de teste.
+"""
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.assessments.models import Assessment
+from apps.assessments.services import score_calculator
+from .synthetic_data import DEFAULT_BATCH_SIZE, generate_synthetic_data
+
+# Tamanhos de coorte (pacientes) disponíveis no comando
+COHORT_SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+
+BATCH_SIZE = DEFAULT_BATCH_SIZE
+
+# Regressão: latência acima de (1 + limite) x linha de base, ignorando diferenças
+# menores que MIN_REGRESSION_MS (ruído), ou mais consultas que a linha de base
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_MS = 5.0
+
+BENCHMARK_USERNAME = 'benchmark'
+
+
+def seed_cohort(patients, seed=42, batch_size=BATCH_SIZE):
+    """
+    Cria a coorte sintética em lote, já com Z-scores e risco final.
+
+    Returns:
+        User: avaliador dono das avaliações (staff, usado nas requisições)
+    """
+    assessor = get_user_model().objects.create_user(
+        BENCHMARK_USERNAME, password=None, is_staff=True, is_superuser=True
+    )
+    generate_synthetic_data(patients, assessor, seed=seed, batch_size=batch_size)
+    return assessor
+
+
+def _time_runs(run, repeat):
+    """Executa ``run`` uma vez para aquecer e depois ``repeat`` vezes; mediana, máximo e consultas"""
+    run()
+    durations = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            run()
+            durations.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+    return {
+        'median_ms': round(statistics.median(durations), 2),
+        'max_ms': round(max(durations), 2),
+        'queries': queries,
+    }
+
+
+def hot_paths(user):
+    """{nome: função sem argumentos} dos caminhos medidos"""
+    client = Client()
+    client.force_login(user)
+
+    patient_id = (
+        Assessment.objects.order_by().values('patient_id')
+        .annotate(total=Count('id')).order_by('-total', 'patient_id')
+        .values_list('patient_id', flat=True).first()
+    )
+    assessment_id = (
+        Assessment.objects.filter(status='COMPLETED').order_by('-created_at').values_list('id', flat=True).first()
+    )
+
+    def get(url):
+        def run():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} respondeu {response.status_code}')
+        return run
+
+    return {
+        'dashboard': get(reverse('dashboard')),
+        'patients_dashboard': get(reverse('patients_dashboard')),
+        'patient_list': get(reverse('patient_list')),
+        'patient_history': get(reverse('patient_history', args=[patient_id])),
+        'api_assessment_list': get(reverse('assessments:assessment-list')),
+        'calculate_final_risk_score': lambda: score_calculator.calculate_final_risk_score(assessment_id),
+    }
+
+
+def run_benchmarks(user, repeat=5):
+    """Mede todos os caminhos; {nome: {'median_ms', 'max_ms', 'queries'}}"""
+    return {name: _time_runs(run, repeat) for name, run in hot_paths(user).items()}
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compara os resultados com a linha de base.
+
+    Returns:
+        list[str]: descrição de cada regressão (vazia se nenhuma)
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['median_ms'] * (1 + threshold)
+        if current['median_ms'] > limit and current['median_ms'] - base['median_ms'] > MIN_REGRESSION_MS:
+            regressions.append(
+                f"{name}: mediana {current['median_ms']:.1f} ms > {limit:.1f} ms "
+                f"(linha de base {base['median_ms']:.1f} ms)"
+            )
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: {current['queries']} consultas (linha de base {base['queries']})")
+    return regressions
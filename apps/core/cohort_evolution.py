@@ -0,0 +1,167 @@
+"""
+Evolução da coorte de pacientes (dashboard de pacientes).
+
+Para cada paciente com pelo menos duas avaliações concluídas, compara o Z-score
+composto (média dos Z-scores normalizados gravados na avaliação) da primeira e
+da última avaliação. Os valores vêm de uma consulta com funções de janela
+(``FIRST_VALUE``/``LAST_VALUE`` particionadas por paciente), uma linha por
+paciente; as listas são ordenadas e limitadas no banco (ORDER BY/LIMIT sobre a
+variação) e as contagens por tendência são um agregado sobre a mesma consulta.
+Só os pacientes exibidos são carregados como objetos.
+"""
+
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, IntegerField, Q, Value, When, Window
+from django.db.models.functions import Coalesce, FirstValue, LastValue, NullIf, RowNumber
+from django.db.models.expressions import RowRange
+
+from apps.assessments.models import NORMALIZED_Z_SCORE_FIELDS, Assessment
+from apps.patients.models import Patient
+
+# Variação do Z-score composto a partir da qual a tendência deixa de ser estável
+TREND_THRESHOLD = 0.5
+
+# Tendência: (rótulo, cor)
+TRENDS = {
+    'improving': ('Melhorando', '#28a745'),
+    'declining': ('Piorando', '#dc3545'),
+    'stable': ('Estável', '#ffc107'),
+}
+
+
+def composite_z_score_expression():
+    """
+    Z-score composto em SQL: média dos Z-scores normalizados não nulos da
+    avaliação (mesmo cálculo de ``calculate_composite_z_score``); nulo quando
+    nenhum teste tem Z-score.
+    """
+    fields = list(NORMALIZED_Z_SCORE_FIELDS.values())
+    total = Coalesce(F(fields[0]), Value(0.0))
+    count = Case(When(**{f'{fields[0]}__isnull': False}, then=Value(1)), default=Value(0))
+    for field in fields[1:]:
+        total = total + Coalesce(F(field), Value(0.0))
+        count = count + Case(When(**{f'{field}__isnull': False}, then=Value(1)), default=Value(0))
+    return ExpressionWrapper(
+        total / NullIf(ExpressionWrapper(count, output_field=IntegerField()), Value(0)),
+        output_field=FloatField(),
+    )
+
+
+def cohort_queryset():
+    """
+    Primeira e última avaliação concluída de cada paciente com duas ou mais
+    (ambas com Z-score composto), uma linha por paciente, com a variação
+    ``improvement`` entre elas. Ordenação, limites e contagens são aplicados
+    em SQL sobre esta consulta.
+    """
+    partition = {
+        'partition_by': [F('patient_id')],
+        'order_by': [F('created_at').asc(), F('id').asc()],
+    }
+    return (
+        Assessment.objects.filter(status='COMPLETED')
+        .annotate(composite_z=composite_z_score_expression())
+        .annotate(
+            position=Window(RowNumber(), **partition),
+            first_avg_z=Window(FirstValue('composite_z'), **partition),
+            last_avg_z=Window(LastValue('composite_z'), frame=RowRange(None, None), **partition),
+            first_date=Window(FirstValue('created_at'), **partition),
+            last_date=Window(LastValue('created_at'), frame=RowRange(None, None), **partition),
+            assessment_count=Window(Count('id'), partition_by=[F('patient_id')]),
+        )
+        .annotate(improvement=F('last_avg_z') - F('first_avg_z'))
+        .filter(position=1, assessment_count__gte=2, first_avg_z__isnull=False, last_avg_z__isnull=False)
+    )
+
+
+def get_cohort_rows(queryset, *ordering, limit):
+    """
+    Linhas da coorte na ordem informada (empates na ordem dos pacientes), com
+    ORDER BY/LIMIT no banco.
+
+    Returns:
+        list[tuple]: (patient_id, first_avg_z, last_avg_z, first_date, last_date,
+        assessment_count, improvement)
+    """
+    return list(
+        queryset.order_by(*ordering, 'patient__full_name', 'patient_id')
+        .values_list(
+            'patient_id', 'first_avg_z', 'last_avg_z', 'first_date', 'last_date', 'assessment_count',
+            'improvement',
+        )[:limit]
+    )
+
+
+def classify_trend(improvement):
+    """Tendência de uma variação do Z-score composto ('improving'/'declining'/'stable')"""
+    if improvement > TREND_THRESHOLD:
+        return 'improving'
+    if improvement < -TREND_THRESHOLD:
+        return 'declining'
+    return 'stable'
+
+
+def get_trend_counts(queryset):
+    """Número de pacientes por tendência, agregado sobre a consulta com funções de janela"""
+    counts = queryset.aggregate(
+        total=Count('pk'),
+        improving_count=Count('pk', filter=Q(improvement__gt=TREND_THRESHOLD)),
+        declining_count=Count('pk', filter=Q(improvement__lt=-TREND_THRESHOLD)),
+    )
+    return {
+        'improving_count': counts['improving_count'],
+        'declining_count': counts['declining_count'],
+        'stable_count': counts['total'] - counts['improving_count'] - counts['declining_count'],
+    }
+
+
+def get_cohort_evolution(limit=20, highlight_limit=5):
+    """
+    Evolução da coorte para o dashboard de pacientes.
+
+    Args:
+        limit: número de pacientes na lista geral (maiores melhoras primeiro)
+        highlight_limit: número de pacientes nas listas de melhora e declínio
+
+    Returns:
+        dict: 'patients_evolution', 'evolution_stats', 'improving_patients'
+        (maiores melhoras primeiro) e 'declining_patients' (maiores quedas primeiro)
+    """
+    cohort = cohort_queryset()
+    evolution_stats = get_trend_counts(cohort)
+    top = get_cohort_rows(cohort, '-improvement', limit=limit)
+    improving = declining = []
+    if evolution_stats['improving_count']:
+        improving = get_cohort_rows(
+            cohort.filter(improvement__gt=TREND_THRESHOLD), '-improvement', limit=highlight_limit
+        )
+    if evolution_stats['declining_count']:
+        declining = get_cohort_rows(
+            cohort.filter(improvement__lt=-TREND_THRESHOLD), 'improvement', limit=highlight_limit
+        )
+
+    patients = Patient.objects.in_bulk({row[0] for row in [*top, *improving, *declining]})
+
+    def entry(row):
+        patient_id, first_avg, last_avg, first_date, last_date, count, improvement = row
+        trend = classify_trend(improvement)
+        trend_label, trend_color = TRENDS[trend]
+        return {
+            'patient': patients[patient_id],
+            'first_date': first_date,
+            'last_date': last_date,
+            'first_avg_z': round(first_avg, 2),
+            'last_avg_z': round(last_avg, 2),
+            'improvement': round(improvement, 2),
+            'trend': trend,
+            'trend_label': trend_label,
+            'trend_color': trend_color,
+            'assessment_count': count,
+            'days_between': (last_date.date() - first_date.date()).days,
+        }
+
+    return {
+        'patients_evolution': [entry(row) for row in top],
+        'evolution_stats': evolution_stats,
+        'improving_patients': [entry(row) for row in improving],
+        'declining_patients': [entry(row) for row in declining],
+    }
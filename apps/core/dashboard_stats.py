@@ -0,0 +1,333 @@
+"""
+Agregações do dashboard principal do CareSense.
+
+Todas as estatísticas são calculadas no banco de dados com agregações
+condicionais (``Count(filter=...)``, ``Avg``) ou lidas do rollup diário
+(DailyAssessmentStats), de forma que o número de consultas é constante,
+independentemente do volume de pacientes e avaliações.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import Avg, Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.assessments.daily_stats import ABOVE_NORMAL_CUTOFF, BELOW_NORMAL_CUTOFF, get_daily_rows
+from apps.assessments.models import NORMALIZED_Z_SCORE_FIELDS, Assessment, DailyAssessmentStats, TMTResult
+from apps.patients.models import Patient
+
+# Faixas etárias exibidas no dashboard: (chave, idade mínima, idade máxima ou None)
+AGE_BUCKETS = [
+    ('age_18_30', 18, 30),
+    ('age_31_45', 31, 45),
+    ('age_46_60', 46, 60),
+    ('age_60_plus', 61, None),
+]
+
+# Testes exibidos nas linhas do tempo de Z-score
+TIMELINE_TESTS = ('digit_span', 'tmt_a', 'tmt_b', 'stroop', 'meem', 'clock_drawing')
+
+# Janelas (em dias) aceitas para as linhas do tempo; 'all' usa a maior
+TIMELINE_PERIODS = (30, 60, 90, 365)
+DEFAULT_TIMELINE_DAYS = 30
+
+# Grupos das estatísticas por teste do dashboard de pacientes (TMT junta A e B)
+TEST_STATS_GROUPS = {
+    'digit_span': ('digit_span',),
+    'tmt': ('tmt_a', 'tmt_b'),
+    'stroop': ('stroop',),
+    'meem': ('meem',),
+    'clock_drawing': ('clock_drawing',),
+}
+
+
+def _birth_date_range_for_age(min_age, max_age, today):
+    """
+    Converte um intervalo de idades em um filtro sobre ``birth_date``.
+
+    Idade >= N equivale a ``birth_date <= hoje - N anos``; idade <= M equivale a
+    ``birth_date > hoje - (M + 1) anos``. Assim a faixa etária é resolvida em SQL
+    sem precisar carregar os pacientes para calcular ``Patient.age``.
+    """
+    condition = Q(birth_date__lte=today - relativedelta(years=min_age))
+    if max_age is not None:
+        condition &= Q(birth_date__gt=today - relativedelta(years=max_age + 1))
+    return condition
+
+
+def get_assessment_stats():
+    """
+    Totais por status, contagem de resultados por teste e Z-score final médio
+    em uma única consulta (os resultados são relações um-para-um, então os
+    LEFT JOINs não multiplicam linhas).
+    """
+    totals = Assessment.objects.order_by().aggregate(
+        total_assessments=Count('id'),
+        pending_assessments=Count('id', filter=Q(status='PENDING')),
+        in_progress_assessments=Count('id', filter=Q(status='IN_PROGRESS')),
+        completed_assessments=Count('id', filter=Q(status='COMPLETED')),
+        cancelled_assessments=Count('id', filter=Q(status='CANCELLED')),
+        digit_span_count=Count('digit_span_result'),
+        tmt_count=Count('tmt_result'),
+        stroop_count=Count('stroop_result'),
+        meem_count=Count('meem_result'),
+        clock_count=Count('clock_drawing_result'),
+        avg_final_z_score=Avg('final_z_score', filter=Q(status='COMPLETED')),
+    )
+
+    stats = {
+        'total_assessments': totals['total_assessments'],
+        'pending_assessments': totals['pending_assessments'],
+        'in_progress_assessments': totals['in_progress_assessments'],
+        'completed_assessments': totals['completed_assessments'],
+        'cancelled_assessments': totals['cancelled_assessments'],
+    }
+    test_stats = {
+        'digit_span_count': totals['digit_span_count'],
+        'tmt_count': totals['tmt_count'],
+        'stroop_count': totals['stroop_count'],
+        'meem_count': totals['meem_count'],
+        'clock_count': totals['clock_count'],
+    }
+    return stats, test_stats, totals['avg_final_z_score']
+
+
+def get_patient_stats(today=None):
+    """Total de pacientes e distribuição por faixa etária em uma única consulta"""
+    today = today or timezone.localdate()
+    aggregates = {'total_patients': Count('id')}
+    for key, min_age, max_age in AGE_BUCKETS:
+        aggregates[key] = Count('id', filter=_birth_date_range_for_age(min_age, max_age, today))
+
+    totals = Patient.objects.order_by().aggregate(**aggregates)
+    age_stats = {key: totals[key] for key, _, _ in AGE_BUCKETS}
+    return totals['total_patients'], age_stats
+
+
+def get_daily_assessment_counts(days=30, end_date=None):
+    """
+    Número de avaliações criadas por dia nos últimos ``days`` dias,
+    lido do rollup diário (DailyAssessmentStats).
+
+    Returns:
+        tuple: (labels 'dd/mm', contagens), com zero nos dias sem avaliações
+    """
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=days - 1)
+
+    rows = (
+        DailyAssessmentStats.objects.order_by()
+        .filter(test='ALL', date__gte=start_date, date__lte=end_date)
+        .values('date')
+        .annotate(total=Sum('count'))
+    )
+    counts_by_day = {row['date']: row['total'] for row in rows}
+
+    labels = []
+    data = []
+    for i in range(days):
+        current_date = start_date + timedelta(days=i)
+        labels.append(current_date.strftime('%d/%m'))
+        data.append(counts_by_day.get(current_date, 0))
+    return labels, data
+
+
+def timeline_days_for_period(period):
+    """Número de dias da linha do tempo para o parâmetro ``period`` do dashboard"""
+    if period == 'all':
+        return max(TIMELINE_PERIODS)
+    try:
+        days = int(period)
+    except (TypeError, ValueError):
+        return DEFAULT_TIMELINE_DAYS
+    return days if days in TIMELINE_PERIODS else DEFAULT_TIMELINE_DAYS
+
+
+def _build_timeline(rows, start_date, days, tests):
+    """
+    Monta as séries diárias a partir de linhas (data, teste, soma, contagem).
+
+    Dias sem avaliações ficam com zero. As médias são calculadas em arrays
+    (testes x dias), sem laço por dia.
+
+    Returns:
+        tuple: (labels, médias gerais por dia, {teste: {'labels', 'data'}})
+    """
+    test_index = {test: i for i, test in enumerate(tests)}
+    sums = np.zeros((len(tests), days))
+    counts = np.zeros((len(tests), days))
+    for day, test, z_score_sum, count in rows:
+        offset = (day - start_date).days
+        if 0 <= offset < days and test in test_index and count:
+            sums[test_index[test], offset] += z_score_sum
+            counts[test_index[test], offset] += count
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        test_averages = np.where(counts > 0, sums / counts, 0.0)
+        day_counts = counts.sum(axis=0)
+        day_averages = np.where(day_counts > 0, sums.sum(axis=0) / day_counts, 0.0)
+
+    labels = [(start_date + timedelta(days=i)).strftime('%d/%m') for i in range(days)]
+    timeline_data = [round(value, 2) for value in day_averages.tolist()]
+    test_performance_data = {
+        test: {'labels': list(labels), 'data': [round(value, 2) for value in test_averages[i].tolist()]}
+        for test, i in test_index.items()
+    }
+    return labels, timeline_data, test_performance_data
+
+
+def get_z_score_timeline(days=30, end_date=None, tests=TIMELINE_TESTS):
+    """
+    Médias diárias dos Z-scores normalizados das avaliações concluídas,
+    lidas do rollup diário.
+
+    Returns:
+        tuple: (labels, médias gerais por dia, {teste: {'labels', 'data'}})
+    """
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=days - 1)
+
+    rows = (
+        (row['date'], row['test'], row['z_score_sum'], row['count'])
+        for row in get_daily_rows(start_date, end_date, status='COMPLETED', tests=tests)
+    )
+    return _build_timeline(rows, start_date, days, tests)
+
+
+def get_assessment_z_score_timeline(assessments, days=30, end_date=None, tests=TIMELINE_TESTS):
+    """
+    Médias diárias dos Z-scores normalizados das avaliações concluídas do
+    queryset (ex.: de um paciente), em uma única consulta agrupada por dia
+    sobre as colunas ``*_z_score`` de Assessment.
+
+    Returns:
+        tuple: (labels, médias gerais por dia, {teste: {'labels', 'data'}})
+    """
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=days - 1)
+
+    aggregates = {}
+    for test in tests:
+        field = NORMALIZED_Z_SCORE_FIELDS[test]
+        aggregates[f'{test}_sum'] = Sum(field)
+        aggregates[f'{test}_count'] = Count(field)
+    daily = (
+        assessments.filter(status='COMPLETED', created_at__date__gte=start_date, created_at__date__lte=end_date)
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values('day')
+        .annotate(**aggregates)
+    )
+
+    rows = [
+        (row['day'], test, row[f'{test}_sum'], row[f'{test}_count'])
+        for row in daily
+        for test in tests
+    ]
+    return _build_timeline(rows, start_date, days, tests)
+
+
+def get_test_z_score_stats(assessments):
+    """
+    Estatísticas dos Z-scores normalizados por teste das avaliações do queryset,
+    em uma única consulta sobre as colunas ``*_z_score`` de Assessment.
+
+    Returns:
+        dict: {grupo: {'count', 'avg_z_score', 'min_z_score', 'max_z_score',
+        'below_normal', 'normal', 'above_normal'}}
+    """
+    aggregates = {}
+    for test_name, field in NORMALIZED_Z_SCORE_FIELDS.items():
+        aggregates[f'{test_name}_count'] = Count(field)
+        aggregates[f'{test_name}_sum'] = Sum(field)
+        aggregates[f'{test_name}_min'] = Min(field)
+        aggregates[f'{test_name}_max'] = Max(field)
+        aggregates[f'{test_name}_below'] = Count(field, filter=Q(**{f'{field}__lt': BELOW_NORMAL_CUTOFF}))
+        aggregates[f'{test_name}_above'] = Count(field, filter=Q(**{f'{field}__gt': ABOVE_NORMAL_CUTOFF}))
+    totals = assessments.order_by().aggregate(**aggregates)
+
+    test_stats = {}
+    for group, tests in TEST_STATS_GROUPS.items():
+        count = sum(totals[f'{test}_count'] for test in tests)
+        if not count:
+            test_stats[group] = {
+                'count': 0, 'avg_z_score': 0, 'min_z_score': 0, 'max_z_score': 0,
+                'below_normal': 0, 'normal': 0, 'above_normal': 0
+            }
+            continue
+
+        present = [test for test in tests if totals[f'{test}_count']]
+        below = sum(totals[f'{test}_below'] for test in tests)
+        above = sum(totals[f'{test}_above'] for test in tests)
+        test_stats[group] = {
+            'count': count,
+            'avg_z_score': round(sum(totals[f'{test}_sum'] for test in present) / count, 2),
+            'min_z_score': round(min(totals[f'{test}_min'] for test in present), 2),
+            'max_z_score': round(max(totals[f'{test}_max'] for test in present), 2),
+            'below_normal': below,
+            'normal': count - below - above,
+            'above_normal': above,
+        }
+    return test_stats
+
+
+def get_tmt_stats():
+    """Tempo médio (A + B) e número de execuções sem erros do TMT"""
+    return TMTResult.objects.order_by().aggregate(
+        count=Count('id'),
+        avg_total_time=Avg(F('time_a_seconds') + F('time_b_seconds')),
+        no_error_count=Count('id', filter=Q(errors_a=0, errors_b=0)),
+    )
+
+
+def get_dashboard_data():
+    """
+    Monta todas as estatísticas do dashboard principal.
+
+    Executa um número fixo de consultas (pacientes, avaliações, linha do tempo
+    e TMT), independente do volume de dados.
+    """
+    total_patients, age_stats = get_patient_stats()
+    assessment_stats, test_stats, avg_final_z = get_assessment_stats()
+    timeline_labels, timeline_data = get_daily_assessment_counts(30)
+    tmt = get_tmt_stats()
+
+    stats = {'total_patients': total_patients, **assessment_stats}
+
+    # Estatísticas de performance (normalizadas 0-100)
+    # 1) Taxa de conclusão
+    total_assessments = stats['total_assessments']
+    completed_assessments = stats['completed_assessments']
+    completion_rate = round((completed_assessments / total_assessments * 100) if total_assessments > 0 else 0)
+
+    # 2) Z-score médio final convertido para um índice 0-100 simples (centro em 50)
+    avg_final_z = avg_final_z if avg_final_z is not None else 0.0
+    z_score_index = max(0, min(100, round(50 + (avg_final_z * 10))))
+
+    # 3) Índice de tempo médio do TMT: 0s -> 100, 180s -> 0
+    # 4) Acurácia aproximada baseada em erros do TMT (sem erros = 100)
+    if tmt['count']:
+        tmt_time_index = 100 - min(100, round((tmt['avg_total_time'] / 180.0) * 100))
+        accuracy = round((tmt['no_error_count'] / tmt['count']) * 100)
+    else:
+        tmt_time_index = 0
+        accuracy = 0
+
+    performance_stats = {
+        'avg_z_score': z_score_index,
+        'completion_rate': completion_rate,
+        'avg_time': tmt_time_index,
+        'accuracy': accuracy,
+    }
+
+    return {
+        'stats': stats,
+        'test_stats': test_stats,
+        'timeline_labels': timeline_labels,
+        'timeline_data': timeline_data,
+        'age_stats': age_stats,
+        'performance_stats': performance_stats,
+    }
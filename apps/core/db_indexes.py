@@ -0,0 +1,164 @@
+"""
+Índices do banco para os padrões de acesso da aplicação.
+
+Os índices portáveis (compostos e parcial de Assessment) estão no ``Meta`` dos
+models e são criados pelas migrações. Os índices da busca de pacientes
+dependem do PostgreSQL (trigramas do ``pg_trgm`` para o ``icontains`` do nome e
+do quarto) e são criados por ``postgres_search_indexes``; no SQLite a busca por
+"contém" não é indexável.
+
+``ACCESS_PATTERNS`` descreve as consultas críticas e os índices que cada uma
+deve usar; ``check_access_patterns`` confere isso pelo plano (EXPLAIN) do banco.
+"""
+
+from datetime import timedelta
+from typing import Callable, NamedTuple, Tuple
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.assessments.models import Assessment
+from apps.patients.models import Patient
+
+# Índices de expressão sobre UPPER(...::text): é assim que o Django monta
+# icontains no PostgreSQL
+POSTGRES_SEARCH_INDEXES = {
+    'patient_name_trgm_idx': (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_name_trgm_idx ON {table} '
+        'USING gin (UPPER(full_name::text) gin_trgm_ops)'
+    ),
+    'patient_room_trgm_idx': (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_room_trgm_idx ON {table} '
+        'USING gin (UPPER(room_number::text) gin_trgm_ops)'
+    ),
+}
+
+# Índices criados por versões anteriores e que nenhuma consulta usa mais
+OBSOLETE_POSTGRES_INDEXES = (
+    'patient_room_prefix_idx',  # prefixo do quarto (a busca voltou a ser "contém")
+)
+
+
+class AccessPattern(NamedTuple):
+    """Consulta crítica e os índices aceitos no seu plano"""
+    name: str
+    queryset: Callable
+    indexes: Tuple[str, ...]
+    postgres_only: bool = False
+
+
+def _latest_assessment_per_patient():
+    # Mesma subconsulta de start_assessment
+    latest = Assessment.objects.filter(patient=OuterRef('pk')).order_by('-created_at', '-id')
+    return Patient.objects.annotate(last_assessment_at=Subquery(latest.values('created_at')[:1]))
+
+
+ACCESS_PATTERNS = (
+    AccessPattern(
+        'histórico do paciente',
+        lambda: Assessment.objects.filter(patient_id=1).order_by('-created_at'),
+        ('assess_patient_created_idx',),
+    ),
+    AccessPattern(
+        'última avaliação por paciente',
+        _latest_assessment_per_patient,
+        ('assess_patient_created_idx',),
+    ),
+    AccessPattern(
+        'avaliações do paciente por status',
+        lambda: Assessment.objects.filter(patient_id=1, status='COMPLETED').order_by('-created_at'),
+        ('assess_patient_status_idx',),
+    ),
+    AccessPattern(
+        'avaliações do avaliador por status',
+        lambda: Assessment.objects.filter(assessor_id=1, status='COMPLETED').order_by('-created_at'),
+        ('assess_assessor_status_idx',),
+    ),
+    AccessPattern(
+        'lista por status',
+        lambda: Assessment.objects.filter(status='COMPLETED').order_by('-created_at')[:20],
+        ('assess_status_created_idx',),
+    ),
+    AccessPattern(
+        'avaliações ativas',
+        lambda: Assessment.objects.active().order_by('-created_at')[:20],
+        # O SQLite só usa o índice parcial com os status literais na consulta;
+        # com parâmetros (como o Django envia) ele usa o índice por status
+        ('assess_active_idx', 'assess_status_created_idx'),
+    ),
+    AccessPattern(
+        'período (dashboard de pacientes)',
+        lambda: Assessment.objects.filter(created_at__gte=timezone.now() - timedelta(days=30)),
+        ('assess_created_idx',),
+    ),
+    AccessPattern(
+        'busca de paciente por nome',
+        lambda: Patient.objects.filter(full_name__icontains='silva'),
+        ('patient_name_trgm_idx',),
+        postgres_only=True,
+    ),
+    AccessPattern(
+        'busca de paciente por quarto',
+        lambda: Patient.objects.filter(room_number__icontains='12'),
+        ('patient_room_trgm_idx',),
+        postgres_only=True,
+    ),
+)
+
+
+def postgres_search_indexes(using=connection):
+    """
+    Cria (se ainda não existem) a extensão pg_trgm e os índices da busca de
+    pacientes, e remove os índices obsoletos.
+
+    ``CREATE INDEX CONCURRENTLY`` não bloqueia escritas, mas não pode rodar
+    dentro de uma transação: cada comando é executado em autocommit.
+
+    Returns:
+        list: nomes dos índices garantidos (vazia fora do PostgreSQL)
+    """
+    if using.vendor != 'postgresql':
+        return []
+    table = using.ops.quote_name(Patient._meta.db_table)
+    with using.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for sql in POSTGRES_SEARCH_INDEXES.values():
+            cursor.execute(sql.format(table=table))
+        for name in OBSOLETE_POSTGRES_INDEXES:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {using.ops.quote_name(name)}')
+    return list(POSTGRES_SEARCH_INDEXES)
+
+
+def explain(queryset, using=connection):
+    """
+    Plano da consulta no banco.
+
+    No PostgreSQL as varreduras sequenciais são desligadas (só nesta transação):
+    com tabelas pequenas o planejador as preferiria mesmo havendo índice, e o
+    que se quer saber é se o índice serve à consulta.
+    """
+    queryset = queryset.using(using.alias)
+    if using.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic(using=using.alias):
+        with using.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def check_access_patterns(using=connection):
+    """
+    Confere pelo EXPLAIN se cada padrão de ACCESS_PATTERNS usa um dos seus índices.
+
+    Returns:
+        list: (padrão, plano, usa índice?) para cada padrão
+        aplicável ao banco
+    """
+    report = []
+    for pattern in ACCESS_PATTERNS:
+        if pattern.postgres_only and using.vendor != 'postgresql':
+            continue
+        plan = explain(pattern.queryset(), using)
+        report.append((pattern, plan, any(name in plan for name in pattern.indexes)))
+    return report
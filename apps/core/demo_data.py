@@ -0,0 +1,124 @@
+"""
+Geradores de valores de teste para dados de demonstração e sintéticos.
+
+Os valores seguem as mesmas regras do ``populate_demo_data`` (tempos piores com
+a idade e com menor escolaridade). Todas as funções recebem o gerador de
+números aleatórios, para que os dados possam ser reproduzidos a partir de uma
+semente (``random.Random(seed)``).
+"""
+
+import random
+from datetime import date, timedelta
+
+# Níveis de escolaridade considerados "alta escolaridade" nos tempos simulados
+HIGH_EDUCATION_LEVELS = ('GRADUACAO', 'POSGRAD')
+
+# Anos de estudo típicos de cada nível (mínimo, máximo)
+EDUCATION_YEARS_BY_LEVEL = {
+    'NONE': (0, 0),
+    'FUNDAMENTAL': (4, 8),
+    'MEDIO': (9, 11),
+    'GRADUACAO': (12, 16),
+    'POSGRAD': (17, 20),
+}
+
+FIRST_NAMES = ('João', 'Maria', 'Pedro', 'Ana', 'Carlos', 'Rosa', 'José', 'Lucia', 'Antônio', 'Francisca')
+LAST_NAMES = ('Silva', 'Santos', 'Oliveira', 'Costa', 'Ferreira', 'Lima', 'Pereira', 'Rodrigues', 'Almeida', 'Souza')
+
+# Itens do MEEM (0 = errou, 1 = acertou), na ordem do formulário
+MEEM_ITEM_FIELDS = (
+    'temporal_weekday', 'temporal_day', 'temporal_month', 'temporal_year', 'temporal_hour',
+    'spatial_location', 'spatial_place', 'spatial_neighborhood', 'spatial_city', 'spatial_state',
+    'memory_word1', 'memory_word2', 'memory_word3',
+    'attention_calc1', 'attention_calc2', 'attention_calc3', 'attention_calc4', 'attention_calc5',
+    'recall_word1', 'recall_word2', 'recall_word3',
+    'naming_object1', 'naming_object2',
+    'repetition_phrase', 'command_take', 'command_fold', 'command_put', 'written_command', 'write_sentence',
+    'copy_pentagons',
+)
+
+
+def is_low_education(education_level):
+    return education_level not in HIGH_EDUCATION_LEVELS
+
+
+def patient_values(index, rnd=random):
+    """Campos de Patient (nascidos entre 1930 e 1965); ``index`` torna o nome único"""
+    education_level = rnd.choice(tuple(EDUCATION_YEARS_BY_LEVEL))
+    return {
+        'full_name': f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {index:06d}',
+        'birth_date': date(1930, 1, 1) + timedelta(days=rnd.randint(0, 35 * 365)),
+        'education_level': education_level,
+        'education_years': rnd.randint(*EDUCATION_YEARS_BY_LEVEL[education_level]),
+        'room_number': f'{100 + index % 900}{"ABC"[index % 3]}',
+    }
+
+
+def digit_span_values(rnd=random):
+    """Campos de DigitSpanResult"""
+    forward_score = rnd.randint(4, 12)
+    backward_score = rnd.randint(3, 10)
+    return {
+        'forward_score': forward_score,
+        'forward_span': rnd.randint(4, 8),
+        'backward_score': backward_score,
+        'backward_span': rnd.randint(3, 7),
+    }
+
+
+def tmt_values(age, education_level, rnd=random):
+    """Campos de TMTResult (tempos baseados na idade e escolaridade, com variação)"""
+    base_tmt_a = 30 + (age - 60) * 0.5
+    base_tmt_b = 75 + (age - 60) * 1.2
+
+    if is_low_education(education_level):
+        base_tmt_a *= 1.2
+        base_tmt_b *= 1.3
+
+    tmt_a_time = max(20, base_tmt_a + rnd.uniform(-10, 15))
+    tmt_b_time = max(45, base_tmt_b + rnd.uniform(-20, 30))
+    return {
+        'time_a_seconds': round(tmt_a_time, 1),
+        'errors_a': rnd.randint(0, 2),
+        'time_b_seconds': round(tmt_b_time, 1),
+        'errors_b': rnd.randint(0, 3),
+    }
+
+
+def stroop_values(age, education_level, rnd=random):
+    """Campos de StroopResult"""
+    base_time_1 = 20 + rnd.uniform(-3, 5)
+    base_time_2 = 18 + rnd.uniform(-3, 5)
+    base_time_3 = 35 + (age - 60) * 0.3 + rnd.uniform(-5, 10)
+
+    if is_low_education(education_level):
+        base_time_3 *= 1.2
+
+    return {
+        'card_1_time': round(base_time_1, 1),
+        'card_1_errors': rnd.randint(0, 1),
+        'card_2_time': round(base_time_2, 1),
+        'card_2_errors': rnd.randint(0, 1),
+        'card_3_time': round(base_time_3, 1),
+        'card_3_errors': rnd.randint(0, 2),
+    }
+
+
+def meem_values(age, education_level, rnd=random):
+    """Itens do MeemResult (menos acertos com a idade e com menor escolaridade)"""
+    hit_rate = 0.97 - max(0, age - 60) * 0.005
+    if is_low_education(education_level):
+        hit_rate -= 0.06
+    hit_rate = min(0.99, max(0.4, hit_rate + rnd.uniform(-0.1, 0.05)))
+    return {field: int(rnd.random() < hit_rate) for field in MEEM_ITEM_FIELDS}
+
+
+def clock_drawing_values(age, rnd=random):
+    """Pontuações do ClockDrawingResult (círculo 0-2, números 0-4, ponteiros 0-4)"""
+    penalty = max(0, age - 70) // 8
+    return {
+        'circle_score': rnd.randint(1, 2),
+        'numbers_score': max(0, rnd.randint(2, 4) - rnd.randint(0, penalty)),
+        'hands_score': max(0, rnd.randint(1, 4) - rnd.randint(0, penalty)),
+        'duration_seconds': rnd.randint(60, 300),
+    }
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.assessments.models import NormativeDataVersion
+from apps.assessments.norm_store import activate_norm_version, deactivate_norm_versions
+from apps.assessments.norms import NormativeDataError
+
+
+class Command(BaseCommand):
+    help = 'Ativa uma versão cadastrada dos dados normativos (troca sem reinício)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'version',
+            nargs='?',
+            help='Versão a ativar'
+        )
+        parser.add_argument(
+            '--bundled',
+            action='store_true',
+            help='Desativa as versões do banco e volta a usar o arquivo normative_data.json'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Lista as versões cadastradas'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for norm_version in NormativeDataVersion.objects.all():
+                marker = '*' if norm_version.is_active else ' '
+                self.stdout.write(
+                    f'{marker} {norm_version.version}  {norm_version.created_at:%Y-%m-%d %H:%M}  {norm_version.description}'
+                )
+            return
+
+        if options['bundled']:
+            deactivate_norm_versions()
+            self.stdout.write(self.style.SUCCESS('Versões do banco desativadas; usando normative_data.json.'))
+            return
+
+        if not options['version']:
+            raise CommandError('Informe a versão a ativar, --bundled ou --list.')
+
+        try:
+            activate_norm_version(options['version'])
+        except NormativeDataError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Versão {options["version"]} ativa; os processos em execução passam a usá-la em até '
+            'NORMS_REFRESH_SECONDS segundos.'
+        ))
@@ -0,0 +1,121 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from apps.core.benchmarks import COHORT_SIZES, DEFAULT_THRESHOLD, find_regressions, run_benchmarks, seed_cohort
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'hot_paths_baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência e número de consultas dos caminhos críticos em uma coorte sintética '
+        '(banco de teste) e compara com a linha de base'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            choices=sorted(COHORT_SIZES, key=COHORT_SIZES.get),
+            default='1k',
+            help='Tamanho da coorte em pacientes (padrão: 1k)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente dos dados sintéticos (padrão: 42)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Execuções medidas por caminho (padrão: 5)'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=str(DEFAULT_BASELINE),
+            help=f'Arquivo JSON da linha de base (padrão: {DEFAULT_BASELINE})'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=f'Aumento relativo de latência tolerado (padrão: {DEFAULT_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Grava os resultados como nova linha de base em vez de comparar'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat deve ser maior que zero.')
+
+        size = options['size']
+        baseline_path = Path(options['baseline'])
+        results = self.measure(COHORT_SIZES[size], options['seed'], options['repeat'])
+
+        self.stdout.write('')
+        self.stdout.write(f'{"caminho":<28} {"mediana":>10} {"máximo":>10} {"consultas":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<28} {result["median_ms"]:>8.1f}ms {result["max_ms"]:>8.1f}ms {result["queries"]:>10}'
+            )
+
+        baselines = {}
+        if baseline_path.exists():
+            baselines = json.loads(baseline_path.read_text(encoding='utf-8'))
+
+        if options['update_baseline']:
+            baselines[size] = {
+                'meta': {
+                    'seed': options['seed'],
+                    'repeat': options['repeat'],
+                    'database': connection.vendor,
+                    'django': django.get_version(),
+                    'python': platform.python_version(),
+                    'created_at': timezone.now().isoformat(),
+                },
+                'results': results,
+            }
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Linha de base ({size}) gravada em {baseline_path}'))
+            return
+
+        if size not in baselines:
+            self.stdout.write(self.style.WARNING(
+                f'Sem linha de base para {size} em {baseline_path}; use --update-baseline para criar.'
+            ))
+            return
+
+        regressions = find_regressions(results, baselines[size]['results'], options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(f'  {regression}')
+            raise CommandError(f'{len(regressions)} regressão(ões) em relação à linha de base.')
+        self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação à linha de base.'))
+
+    @override_settings(VIEW_CACHE_TIMEOUT=0, QUERY_BUDGET_SAMPLE_RATE=0)
+    def measure(self, patients, seed, repeat):
+        """Cria o banco de teste, semeia a coorte, mede os caminhos e remove o banco"""
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f'Criando coorte sintética com {patients} pacientes (semente {seed})...')
+            user = seed_cohort(patients, seed)
+            self.stdout.write(f'Medindo caminhos ({repeat} execuções cada)...')
+            return run_benchmarks(user, repeat)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from apps.core.db_indexes import check_access_patterns, postgres_search_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria os índices de busca de pacientes específicos do PostgreSQL (pg_trgm) e, com --check, '
+        'confere pelo EXPLAIN se as consultas críticas usam os índices esperados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Confere os planos das consultas críticas (falha se alguma não usar o índice esperado)'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Banco de dados (padrão: default)'
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Mostra o plano de cada consulta conferida'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+
+        created = postgres_search_indexes(connection)
+        if created:
+            self.stdout.write(self.style.SUCCESS(f'Índices de busca garantidos: {", ".join(created)}'))
+        else:
+            self.stdout.write(
+                f'Banco {connection.vendor}: sem índices de trigramas; a busca de pacientes por nome '
+                '(contém) faz varredura da tabela.'
+            )
+
+        if not options['check']:
+            return
+
+        failures = []
+        for pattern, plan, uses_index in check_access_patterns(connection):
+            if uses_index:
+                self.stdout.write(f'  OK     {pattern.name}')
+            else:
+                failures.append(pattern.name)
+                self.stdout.write(self.style.ERROR(f'  FALHOU {pattern.name} (esperado: {", ".join(pattern.indexes)})'))
+            if options['show_plans'] or not uses_index:
+                for line in plan.splitlines():
+                    self.stdout.write(f'         {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} consultas sem o índice esperado: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Todas as consultas críticas usam os índices esperados.'))
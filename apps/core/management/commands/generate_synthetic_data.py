@@ -0,0 +1,130 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.assessments.models import Assessment
+from apps.assessments.norms import NormativeDataError
+from apps.assessments.services import score_calculator
+from apps.core.synthetic_data import (
+    ALL_TESTS, DEFAULT_BATCH_SIZE, HISTORY_DAYS, MAX_ASSESSMENTS, clear_patient_data, generate_synthetic_data,
+)
+from apps.patients.models import Patient
+
+SYNTHETIC_USERNAME = 'synthetic'
+
+
+class Command(BaseCommand):
+    help = 'Gera grandes volumes de pacientes, avaliações e resultados sintéticos (bulk_create em blocos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patients',
+            type=int,
+            default=10_000,
+            help='Número de pacientes a gerar (padrão: 10000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente dos dados gerados (mesma semente = mesmos valores)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Pacientes por bloco/transação (padrão: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-assessments',
+            type=int,
+            default=MAX_ASSESSMENTS,
+            help=f'Máximo de avaliações por paciente (padrão: {MAX_ASSESSMENTS})'
+        )
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=HISTORY_DAYS,
+            help=f'Dias de histórico das avaliações (padrão: {HISTORY_DAYS})'
+        )
+        parser.add_argument(
+            '--tests',
+            default=','.join(ALL_TESTS),
+            help=f'Testes aplicados, separados por vírgula (padrão: {",".join(ALL_TESTS)})'
+        )
+        parser.add_argument(
+            '--assessor',
+            default=SYNTHETIC_USERNAME,
+            help=f'Usuário avaliador das avaliações (criado se não existir; padrão: {SYNTHETIC_USERNAME})'
+        )
+        parser.add_argument(
+            '--norm-version',
+            help='Versão dos dados normativos a usar (padrão: versão ativa)'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove todos os pacientes e avaliações antes de gerar'
+        )
+
+    def handle(self, *args, **options):
+        if options['patients'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--patients e --batch-size devem ser maiores que zero.')
+        if options['max_assessments'] < 1 or options['history_days'] <= options['max_assessments']:
+            raise CommandError('--history-days deve ser maior que --max-assessments (e este maior que zero).')
+
+        tests = tuple(test.strip() for test in options['tests'].split(',') if test.strip())
+        unknown = set(tests) - set(ALL_TESTS)
+        if not tests or unknown:
+            raise CommandError(f'Testes inválidos: {", ".join(sorted(unknown)) or "-"}. Opções: {", ".join(ALL_TESTS)}')
+
+        try:
+            if options['norm_version']:
+                norm_table = score_calculator.norm_store.get_table(options['norm_version'])
+            else:
+                norm_table = score_calculator.norm_table
+        except NormativeDataError as e:
+            raise CommandError(str(e))
+
+        if options['clear']:
+            self.stdout.write('Removendo dados existentes...')
+            deleted = clear_patient_data(options['batch_size'])
+            self.stdout.write(
+                f'  {deleted[Patient]} pacientes e {deleted[Assessment]} avaliações removidos'
+            )
+
+        assessor, created = get_user_model().objects.get_or_create(
+            username=options['assessor'], defaults={'is_staff': True}
+        )
+        if created:
+            assessor.set_unusable_password()
+            assessor.save()
+
+        total = options['patients']
+        self.stdout.write(
+            f'Gerando {total} pacientes (semente {options["seed"]}, normas {norm_table.version}, '
+            f'blocos de {options["batch_size"]})...'
+        )
+
+        started = time.monotonic()
+        totals = generate_synthetic_data(
+            total,
+            assessor,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            tests=tests,
+            max_assessments=options['max_assessments'],
+            history_days=options['history_days'],
+            norm_table=norm_table,
+            # Continua a numeração dos nomes quando já existem pacientes
+            start_index=Patient.objects.count(),
+            progress=lambda created: self.stdout.write(f'  {created}/{total}'),
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["patients"]} pacientes, {totals["assessments"]} avaliações e '
+            f'{totals["results"]} resultados criados em {elapsed:.1f}s'
+        ))
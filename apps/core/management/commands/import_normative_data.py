@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.assessments.norm_store import BUNDLED_NORMS_PATH, create_norm_version
+from apps.assessments.norms import NormativeDataError
+
+
+class Command(BaseCommand):
+    help = 'Valida e cadastra uma nova versão dos dados normativos (NormativeDataVersion)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(BUNDLED_NORMS_PATH),
+            help='Arquivo JSON no formato de normative_data.json (padrão: arquivo distribuído)'
+        )
+        parser.add_argument(
+            '--norm-version',
+            dest='norm_version',
+            help='Versão a cadastrar (padrão: metadata.version do arquivo)'
+        )
+        parser.add_argument(
+            '--description',
+            default='',
+            help='Descrição da versão'
+        )
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Ativa a versão logo após o cadastro'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f'Não foi possível ler {options["path"]}: {e}')
+
+        try:
+            norm_version = create_norm_version(
+                data,
+                version=options['norm_version'],
+                description=options['description'],
+                activate=options['activate'],
+            )
+        except NormativeDataError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Versão {norm_version.version} cadastrada.'))
+        if norm_version.is_active:
+            self.stdout.write(self.style.SUCCESS(
+                f'Versão {norm_version.version} ativa; os processos em execução passam a usá-la em até '
+                'NORMS_REFRESH_SECONDS segundos.'
+            ))
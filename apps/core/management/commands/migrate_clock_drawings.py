@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.assessments.drawings import DrawingError, decode_drawing_data
+from apps.assessments.models import ClockDrawingResult
+
+DEFAULT_BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = 'Move os desenhos do Teste do Relógio gravados em base64 na tabela para o armazenamento de arquivos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Resultados lidos e gravados por bloco (padrão: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        # O desenho é apagado da tabela: só com um armazenamento que sobrevive a um novo deploy
+        if not settings.MEDIA_STORAGE_PERSISTENT:
+            raise CommandError(
+                f'O armazenamento de arquivos ({settings.MEDIA_STORAGE_BACKEND}) não é persistente: '
+                'os desenhos seriam perdidos no próximo deploy. Configure um object store ou um disco '
+                'persistente e defina MEDIA_STORAGE_PERSISTENT=true (ver DEPLOY_RENDER.md).'
+            )
+
+        pending = ClockDrawingResult.objects.exclude(drawing_data='')
+        total = pending.count()
+        self.stdout.write(f'Migrando {total} desenhos para o armazenamento de arquivos...')
+
+        migrated = skipped = invalid = 0
+        last_pk = 0
+        while True:
+            # Só a coluna do desenho; o save() (Z-score) não é chamado
+            batch = list(
+                pending.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'drawing_data', 'drawing_image', 'drawing_thumbnail')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            updated = []
+            for result in batch:
+                try:
+                    content = decode_drawing_data(result.drawing_data)
+                except DrawingError as e:
+                    invalid += 1
+                    self.stderr.write(f'  Resultado {result.pk}: {e}')
+                    continue
+                if content is None:
+                    # Traços em JSON sem Pillow instalado para renderizar
+                    skipped += 1
+                    continue
+                result.set_drawing(content)
+                updated.append(result)
+
+            ClockDrawingResult.objects.bulk_update(
+                updated, ['drawing_image', 'drawing_thumbnail', 'drawing_data']
+            )
+            migrated += len(updated)
+            self.stdout.write(f'  {migrated + skipped + invalid}/{total}')
+
+        self.stdout.write(self.style.SUCCESS(f'Desenhos migrados: {migrated}'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'{skipped} desenhos em traços (JSON) mantidos na tabela: instale o Pillow para convertê-los.'
+            ))
+        if invalid:
+            self.stdout.write(self.style.WARNING(f'{invalid} desenhos inválidos mantidos na tabela.'))
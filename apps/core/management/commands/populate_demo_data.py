@@ -4,6 +4,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import random
 
+from apps.core.demo_data import digit_span_values, stroop_values, tmt_values
 from apps.patients.models import Patient
 from apps.assessments.models import Assessment, DigitSpanResult, TMTResult, StroopResult
 from evaluators.models import EvaluatorProfile
@@ -207,55 +208,7 @@ class Command(BaseCommand):
 
     def create_test_results(self, assessment, patient):
         """Cria resultados dos testes"""
-        # Digit Span Test
-        forward_score = random.randint(4, 12)
-        backward_score = random.randint(3, 10)
-        
-        DigitSpanResult.objects.create(
-            assessment=assessment,
-            forward_score=forward_score,
-            forward_span=random.randint(4, 8),
-            backward_score=backward_score,
-            backward_span=random.randint(3, 7),
-        )
-        
-        # TMT Test
         age = patient.age
-        education_group = 'high_education' if patient.education_level in ['GRADUACAO', 'POSGRAD'] else 'low_education'
-        
-        # Tempos baseados na idade e escolaridade (com variação)
-        base_tmt_a = 30 + (age - 60) * 0.5
-        base_tmt_b = 75 + (age - 60) * 1.2
-        
-        if education_group == 'low_education':
-            base_tmt_a *= 1.2
-            base_tmt_b *= 1.3
-        
-        tmt_a_time = max(20, base_tmt_a + random.uniform(-10, 15))
-        tmt_b_time = max(45, base_tmt_b + random.uniform(-20, 30))
-        
-        TMTResult.objects.create(
-            assessment=assessment,
-            time_a_seconds=round(tmt_a_time, 1),
-            errors_a=random.randint(0, 2),
-            time_b_seconds=round(tmt_b_time, 1),
-            errors_b=random.randint(0, 3)
-        )
-        
-        # Stroop Test
-        base_time_1 = 20 + random.uniform(-3, 5)
-        base_time_2 = 18 + random.uniform(-3, 5)
-        base_time_3 = 35 + (age - 60) * 0.3 + random.uniform(-5, 10)
-        
-        if education_group == 'low_education':
-            base_time_3 *= 1.2
-        
-        StroopResult.objects.create(
-            assessment=assessment,
-            card_1_time=round(base_time_1, 1),
-            card_1_errors=random.randint(0, 1),
-            card_2_time=round(base_time_2, 1),
-            card_2_errors=random.randint(0, 1),
-            card_3_time=round(base_time_3, 1),
-            card_3_errors=random.randint(0, 2)
-        )
+        DigitSpanResult.objects.create(assessment=assessment, **digit_span_values())
+        TMTResult.objects.create(assessment=assessment, **tmt_values(age, patient.education_level))
+        StroopResult.objects.create(assessment=assessment, **stroop_values(age, patient.education_level))
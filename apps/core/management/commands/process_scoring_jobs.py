@@ -0,0 +1,57 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.assessments.scoring_queue import process_due_jobs
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+class Command(BaseCommand):
+    help = 'Executa a fila do cálculo do risco final das avaliações (ScoringJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os jobs prontos e termina (em vez de continuar aguardando novos)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Jobs reservados por vez (padrão: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help=f'Segundos entre consultas à fila quando ela está vazia (padrão: {DEFAULT_POLL_INTERVAL:g})'
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Worker {worker} processando a fila do risco final...')
+
+        total = failed_total = 0
+        try:
+            while True:
+                processed, failed = process_due_jobs(worker, options['batch_size'])
+                total += processed
+                failed_total += failed
+                if processed:
+                    self.stdout.write(f'  {processed} jobs executados ({failed} com falha)')
+                    continue
+                if options['once']:
+                    break
+                # Fila vazia: libera a conexão enquanto espera
+                close_old_connections()
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Jobs executados: {total} ({failed_total} com falha)'))
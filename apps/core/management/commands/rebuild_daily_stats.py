@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.assessments.daily_stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela de estatísticas diárias (DailyAssessmentStats) a partir das avaliações'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Reconstrói apenas os últimos N dias'
+        )
+        parser.add_argument(
+            '--start',
+            help='Data inicial (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--end',
+            help='Data final (AAAA-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end'])
+
+        if options['days']:
+            end_date = end_date or timezone.localdate()
+            start_date = end_date - timedelta(days=options['days'] - 1)
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('A data inicial deve ser anterior à data final.')
+
+        self.stdout.write('Reconstruindo estatísticas diárias...')
+        days = rebuild_daily_stats(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(f'Estatísticas diárias reconstruídas ({days} dias processados).')
+        )
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Data inválida: {value}. Use o formato AAAA-MM-DD.')
@@ -0,0 +1,155 @@
+import os
+import time
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.assessments.models import Assessment
+from apps.assessments.norms import NormativeDataError
+from apps.assessments.rescoring import DEFAULT_CHUNK_SIZE, backfill_normalized_z_scores, rescore_assessments
+from apps.assessments.services import score_calculator
+from apps.assessments.weights import WeightProfileError
+
+RISK_ORDER = [choice for choice, _ in Assessment.RISK_SCORE_CHOICES]
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Z-scores e risco final das avaliações concluídas (normas ou pesos alterados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Somente avaliações criadas a partir desta data (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calcula e mostra o relatório sem gravar'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=f'Número de processos de cálculo (padrão: 1; máquina atual: {os.cpu_count()})'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Avaliações por bloco (padrão: {DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--norm-version',
+            help='Versão dos dados normativos a usar (padrão: versão ativa)'
+        )
+        parser.add_argument(
+            '--weight-profile',
+            help='Perfil de pesos (slug) a aplicar e gravar nas avaliações (padrão: o perfil de cada avaliação)'
+        )
+        parser.add_argument(
+            '--weights-only',
+            action='store_true',
+            help='Só recalcula o Z-score final e o risco a partir dos Z-scores normalizados gravados '
+                 'nas avaliações (não lê as tabelas de resultados)'
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Só preenche as colunas de Z-score normalizado vazias a partir dos Z-scores gravados '
+                 'nos resultados (não recalcula Z-scores nem o risco; usado no build)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers e --chunk-size devem ser maiores que zero.')
+
+        queryset = Assessment.objects.filter(status='COMPLETED')
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f'Data inválida: {options["since"]}. Use o formato AAAA-MM-DD.')
+            queryset = queryset.filter(
+                created_at__gte=timezone.make_aware(datetime.combine(since, datetime.min.time()))
+            )
+
+        if options['missing_only']:
+            if options['weights_only'] or options['norm_version'] or options['weight_profile']:
+                raise CommandError('--missing-only não pode ser combinado com --weights-only, '
+                                   '--norm-version ou --weight-profile.')
+            mode = ' (simulação)' if options['dry_run'] else ''
+            self.stdout.write(f'Preenchendo Z-scores normalizados vazios{mode}...')
+            started = time.monotonic()
+            report = backfill_normalized_z_scores(
+                queryset,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                progress=lambda processed: self.stdout.write(f'  {processed}'),
+            )
+            self.write_report(report, time.monotonic() - started, options['dry_run'])
+            return
+
+        try:
+            if options['norm_version']:
+                norm_table = score_calculator.norm_store.get_table(options['norm_version'])
+            else:
+                norm_table = score_calculator.norm_table
+        except NormativeDataError as e:
+            raise CommandError(str(e))
+
+        weights = None
+        if options['weight_profile']:
+            try:
+                weights = score_calculator.weight_store.get_by_slug(options['weight_profile'])
+            except WeightProfileError as e:
+                raise CommandError(str(e))
+
+        total = queryset.count()
+        mode = ' (simulação)' if options['dry_run'] else ''
+        profile = f'perfil de pesos {weights.slug}' if weights else 'perfil de pesos de cada avaliação'
+        if options['weights_only']:
+            self.stdout.write(f'Recalculando o risco final de {total} avaliações com {profile}{mode}...')
+        else:
+            self.stdout.write(
+                f'Recalculando {total} avaliações com normas {norm_table.version} e {profile} '
+                f'({options["workers"]} processo(s)){mode}...'
+            )
+
+        started = time.monotonic()
+        report = rescore_assessments(
+            queryset,
+            norm_table=norm_table,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            weights=weights,
+            weights_only=options['weights_only'],
+            progress=lambda processed: self.stdout.write(f'  {processed}/{total}'),
+        )
+        elapsed = time.monotonic() - started
+
+        self.write_report(report, elapsed, options['dry_run'])
+
+    def write_report(self, report, elapsed, dry_run):
+        self.stdout.write('')
+        self.stdout.write(f'Avaliações processadas: {report["processed"]} em {elapsed:.1f}s')
+        if dry_run:
+            self.stdout.write(f'Avaliações a atualizar: {report["assessments_updated"]}')
+            self.stdout.write(f'Resultados de teste a atualizar: {report["results_updated"]}')
+        else:
+            self.stdout.write(f'Avaliações atualizadas: {report["assessments_updated"]}')
+            self.stdout.write(f'Resultados de teste atualizados: {report["results_updated"]}')
+
+        changes = report['risk_changes']
+        if not changes:
+            self.stdout.write(self.style.SUCCESS('Nenhuma mudança de categoria de risco.'))
+            return
+
+        self.stdout.write(f'Mudanças de categoria de risco ({sum(changes.values())}):')
+
+        def order(risk):
+            return RISK_ORDER.index(risk) if risk in RISK_ORDER else -1
+
+        for (old_risk, new_risk), count in sorted(changes.items(), key=lambda item: (order(item[0][0]), order(item[0][1]))):
+            self.stdout.write(f'  {old_risk or "-":>9} -> {new_risk:<9} {count}')
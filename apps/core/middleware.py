@@ -0,0 +1,204 @@
+"""
+Instrumentação do orçamento de consultas por requisição.
+
+Em uma amostra das requisições (``QUERY_BUDGET_SAMPLE_RATE``), o
+QueryBudgetMiddleware registra, com ``connection.execute_wrapper`` (funciona
+também com DEBUG=False), o número de consultas SQL, o tempo total no banco, as
+consultas repetidas (mesma impressão digital: SQL com literais e listas IN
+normalizados, típico de N+1) e o tempo em Python. Os valores alimentam um
+resumo por nome de URL (janela das últimas ``QUERY_BUDGET_WINDOW`` requisições,
+em memória, por processo), exposto em ``/query-budget/`` para a equipe
+administrativa, e saem no cabeçalho ``Server-Timing`` apenas com DEBUG ou para
+usuários da equipe.
+
+Durante a requisição cada consulta só é contada pelo texto do SQL; a
+normalização e o hash são feitos no fim, uma vez por SQL distinto.
+"""
+
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_WINDOW = 200
+
+# Quantidade de consultas repetidas listadas por requisição e por URL no resumo
+TOP_DUPLICATES = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL sem literais, listas IN e espaços extras (consultas equivalentes ficam iguais)"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def sql_fingerprint(sql):
+    """Impressão digital curta de uma consulta normalizada"""
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+class QueryRecorder:
+    """Execute wrapper que conta consultas, tempo no banco e repetições"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """[(impressão digital, vezes, SQL normalizado)] das consultas executadas mais de uma vez"""
+        fingerprints = Counter()
+        samples = {}
+        for sql, count in self.statements.items():
+            fingerprint = sql_fingerprint(sql)
+            fingerprints[fingerprint] += count
+            if fingerprint not in samples:
+                samples[fingerprint] = normalize_sql(sql)[:200]
+        return [
+            (fingerprint, count, samples[fingerprint])
+            for fingerprint, count in fingerprints.most_common()
+            if count > 1
+        ]
+
+
+class QueryBudgetSummary:
+    """Resumo em memória das últimas requisições por nome de URL (seguro entre threads)"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._requests = defaultdict(lambda: deque(maxlen=self.window))
+        self._duplicates = defaultdict(Counter)
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, url_name, queries, db_ms, python_ms, duplicates):
+        with self._lock:
+            self._requests[url_name].append((queries, db_ms, python_ms, len(duplicates)))
+            for fingerprint, count, sample in duplicates:
+                self._duplicates[url_name][fingerprint] += count
+                self._samples[fingerprint] = sample
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._duplicates.clear()
+            self._samples.clear()
+
+    def report(self):
+        """Estatísticas por nome de URL, das rotas com mais consultas por requisição primeiro"""
+        with self._lock:
+            snapshot = {name: list(requests) for name, requests in self._requests.items()}
+            duplicates = {name: counter.most_common(TOP_DUPLICATES) for name, counter in self._duplicates.items()}
+            samples = dict(self._samples)
+
+        report = []
+        for url_name, requests in snapshot.items():
+            queries = sorted(request[0] for request in requests)
+            db_ms = [request[1] for request in requests]
+            python_ms = [request[2] for request in requests]
+            report.append({
+                'url_name': url_name,
+                'requests': len(requests),
+                'avg_queries': round(sum(queries) / len(queries), 1),
+                'max_queries': queries[-1],
+                'p95_queries': queries[min(len(queries) - 1, int(len(queries) * 0.95))],
+                'avg_db_ms': round(sum(db_ms) / len(db_ms), 2),
+                'avg_python_ms': round(sum(python_ms) / len(python_ms), 2),
+                'requests_with_duplicates': sum(1 for request in requests if request[3]),
+                'top_duplicates': [
+                    {'fingerprint': fingerprint, 'count': count, 'sql': samples.get(fingerprint, '')}
+                    for fingerprint, count in duplicates.get(url_name, [])
+                ],
+            })
+        report.sort(key=lambda row: row['avg_queries'], reverse=True)
+        return report
+
+
+# Resumo do processo (lido pela view query_budget_report)
+query_budget_summary = QueryBudgetSummary(getattr(settings, 'QUERY_BUDGET_WINDOW', DEFAULT_WINDOW))
+
+
+class QueryBudgetMiddleware:
+    """
+    Mede consultas SQL e tempos de uma amostra das requisições.
+
+    Configuração (settings):
+        QUERY_BUDGET_SAMPLE_RATE: fração das requisições medidas (0 desativa; padrão 1%)
+        QUERY_BUDGET_MAX_QUERIES: acima deste número de consultas a requisição é logada como aviso
+        QUERY_BUDGET_WINDOW: requisições guardadas por nome de URL no resumo
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        self.max_queries = getattr(settings, 'QUERY_BUDGET_MAX_QUERIES', DEFAULT_MAX_QUERIES)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        db_ms = recorder.duration * 1000
+        python_ms = max(0.0, total_ms - db_ms)
+        duplicates = recorder.duplicates()
+
+        if self.show_server_timing(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+                f'dup;desc="{sum(count - 1 for _, count, _ in duplicates)} duplicate queries"',
+                f'app;dur={python_ms:.1f}',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        url_name = (resolver_match.view_name if resolver_match else None) or 'unresolved'
+        query_budget_summary.record(url_name, recorder.count, db_ms, python_ms, duplicates[:TOP_DUPLICATES])
+
+        if recorder.count > self.max_queries:
+            logger.warning(
+                "Orçamento de consultas excedido em %s (%s): %d consultas, %.1f ms no banco",
+                url_name, request.path, recorder.count, db_ms,
+            )
+        return response
+
+    @staticmethod
+    def show_server_timing(request):
+        """Os tempos internos só são expostos em desenvolvimento ou para a equipe"""
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
@@ -0,0 +1,231 @@
+"""
+Geração de grandes volumes de dados sintéticos (pacientes, avaliações e resultados).
+
+Os registros são criados com ``bulk_create`` em blocos, sem passar pelos
+``save()`` dos models: os Z-scores dos resultados, as colunas normalizadas e o
+risco final das avaliações são calculados antes da inserção com o cálculo
+vetorizado do recálculo em lote (``rescoring.score_rows``), então cada linha é
+gravada uma única vez e já fica igual ao que o recálculo produziria. Os valores
+dos testes vêm de ``apps.core.demo_data`` com ``random.Random(seed)``: a mesma
+semente gera os mesmos dados.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.assessments.daily_stats import rebuild_daily_stats
+from apps.assessments.models import (
+    Assessment, ClockDrawingResult, DigitSpanResult, MeemResult, ScoringJob, StroopResult, TMTResult,
+)
+from apps.assessments.rescoring import RESULT_MODELS, ROW_FIELDS, score_rows
+from apps.assessments.services import score_calculator
+from apps.core.view_cache import bump_all_data_versions
+from apps.patients.models import Patient
+from .demo_data import (
+    clock_drawing_values, digit_span_values, meem_values, patient_values, stroop_values, tmt_values,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Histórico por paciente: até MAX_ASSESSMENTS avaliações nos últimos HISTORY_DAYS dias
+MAX_ASSESSMENTS = 4
+HISTORY_DAYS = 365
+
+ALL_TESTS = ('digit_span', 'tmt', 'stroop', 'meem', 'clock_drawing')
+
+# Tabelas esvaziadas por clear_patient_data, as dependentes antes das referenciadas
+CLEAR_MODELS = (
+    ScoringJob, DigitSpanResult, TMTResult, StroopResult, MeemResult, ClockDrawingResult, Assessment, Patient,
+)
+
+
+def _age(birth_date, today):
+    # Mesmo cálculo de Patient.age
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def _build_results(assessment, age, tests, rnd):
+    """{relação: resultado ainda não salvo} de uma avaliação concluída"""
+    education_level = assessment.patient.education_level
+    results = {}
+    if 'digit_span' in tests:
+        results['digit_span_result'] = DigitSpanResult(assessment=assessment, **digit_span_values(rnd))
+    if 'tmt' in tests:
+        results['tmt_result'] = TMTResult(assessment=assessment, **tmt_values(age, education_level, rnd))
+    if 'stroop' in tests:
+        results['stroop_result'] = StroopResult(assessment=assessment, **stroop_values(age, education_level, rnd))
+    if 'meem' in tests:
+        meem = MeemResult(assessment=assessment, **meem_values(age, education_level, rnd))
+        meem.calculate_total_score()
+        meem.interpret_score()
+        results['meem_result'] = meem
+    if 'clock_drawing' in tests:
+        clock = ClockDrawingResult(assessment=assessment, **clock_drawing_values(age, rnd))
+        clock.calculate_total_score()
+        results['clock_drawing_result'] = clock
+    return results
+
+
+def _score_row(assessment, results):
+    """
+    Linha no formato de ROW_FIELDS para ``score_rows``.
+
+    O "id" de cada resultado é a própria instância (ainda sem pk): ela volta em
+    ``result_updates`` e recebe ali os Z-scores calculados.
+    """
+    row = dict.fromkeys(ROW_FIELDS)
+    patient = assessment.patient
+    row.update({
+        'patient__birth_date': patient.birth_date,
+        'patient__education_level': patient.education_level,
+        'patient__education_years': patient.education_years,
+    })
+    for relation, result in results.items():
+        row[f'{relation}__id'] = result
+        for field in result.Z_SCORE_INPUT_FIELDS:
+            key = f'{relation}__{field}'
+            if key in row:
+                row[key] = getattr(result, field)
+    return row
+
+
+def _create_batch(indexes, assessor, tests, norm_table, today, now, rnd,
+                  max_assessments, history_days):
+    """Cria um bloco de pacientes com avaliações e resultados já pontuados; (pacientes, avaliações, resultados)"""
+    patients = []
+    assessments = []
+    created_ats = []
+    results_by_assessment = []
+    # Um paciente por vez (com as avaliações): a sequência aleatória não depende do tamanho do bloco
+    for index in indexes:
+        patient = Patient(**patient_values(index, rnd))
+        patients.append(patient)
+        age = _age(patient.birth_date, today)
+        count = rnd.randint(1, max_assessments)
+        days_ago = sorted(rnd.sample(range(1, history_days), count), reverse=True)
+        for position, days in enumerate(days_ago):
+            last = position == count - 1
+            status = rnd.choice(['PENDING', 'IN_PROGRESS', 'COMPLETED']) if last else 'COMPLETED'
+            created_at = now - timedelta(days=days, minutes=rnd.randint(0, 600))
+            assessment = Assessment(patient=patient, assessor=assessor, status=status)
+            results = {}
+            if status == 'COMPLETED':
+                assessment.completed_at = created_at + timedelta(minutes=rnd.randint(20, 90))
+                results = _build_results(assessment, age, tests, rnd)
+            assessments.append(assessment)
+            created_ats.append(created_at)
+            results_by_assessment.append(results)
+
+    # Z-scores, colunas normalizadas e risco final antes da inserção
+    rows = [
+        _score_row(assessment, results)
+        for assessment, results in zip(assessments, results_by_assessment)
+    ]
+    for position, row in enumerate(rows):
+        row['pk'] = position
+    for item in score_rows(rows, norm_table, today):
+        assessment = assessments[item.pk]
+        for field, value in (item.assessment_fields or {}).items():
+            setattr(assessment, field, value)
+        for _, result, fields in item.result_updates:
+            for field, value in fields.items():
+                setattr(result, field, value)
+
+    with transaction.atomic():
+        Patient.objects.bulk_create(patients)
+        Assessment.objects.bulk_create(assessments)
+
+        # created_at é auto_now_add: ajustado depois da criação
+        for assessment, created_at in zip(assessments, created_ats):
+            assessment.created_at = created_at
+        Assessment.objects.bulk_update(assessments, ['created_at'])
+
+        results = 0
+        for relation, model in RESULT_MODELS.items():
+            instances = [item[relation] for item in results_by_assessment if relation in item]
+            if instances:
+                model.objects.bulk_create(instances)
+                results += len(instances)
+
+    return len(patients), len(assessments), results
+
+
+def generate_synthetic_data(patients, assessor, seed=42, batch_size=DEFAULT_BATCH_SIZE, tests=ALL_TESTS,
+                            max_assessments=MAX_ASSESSMENTS, history_days=HISTORY_DAYS, norm_table=None,
+                            start_index=0, progress=None):
+    """
+    Gera ``patients`` pacientes com histórico de avaliações.
+
+    Cada paciente recebe de 1 a ``max_assessments`` avaliações nos últimos
+    ``history_days`` dias; todas menos a mais recente são concluídas, com os
+    testes de ``tests``. Ao final o rollup diário do período é recalculado
+    (o que também invalida as páginas em cache).
+
+    Args:
+        patients: número de pacientes
+        assessor: usuário avaliador de todas as avaliações
+        seed: semente do gerador de números aleatórios
+        batch_size: pacientes por bloco (cada bloco é uma transação)
+        tests: testes aplicados nas avaliações concluídas (subconjunto de ALL_TESTS)
+        norm_table: NormTable usada nos Z-scores (padrão: versão ativa)
+        start_index: índice do primeiro paciente (sufixo numérico do nome)
+        progress: callback opcional chamado com o total de pacientes criados
+
+    Returns:
+        dict: totais de pacientes, avaliações e resultados criados
+    """
+    unknown = set(tests) - set(ALL_TESTS)
+    if unknown:
+        raise ValueError(f"Testes desconhecidos: {', '.join(sorted(unknown))}")
+
+    rnd = random.Random(seed)
+    norm_table = norm_table or score_calculator.norm_table
+    # Mesma data de referência do recálculo em lote
+    today = date.today()
+    now = timezone.now()
+    totals = {'patients': 0, 'assessments': 0, 'results': 0}
+
+    for start in range(start_index, start_index + patients, batch_size):
+        indexes = range(start, min(start + batch_size, start_index + patients))
+        created = _create_batch(indexes, assessor, tests, norm_table, today, now, rnd,
+                                max_assessments, history_days)
+        for key, count in zip(('patients', 'assessments', 'results'), created):
+            totals[key] += count
+        if progress:
+            progress(totals['patients'])
+
+    # bulk_create não dispara signals: rollup diário e cache do período gerado
+    if totals['assessments']:
+        first_day = timezone.localdate(now - timedelta(days=history_days + 1))
+        rebuild_daily_stats(first_day, timezone.localdate(now))
+    return totals
+
+
+def clear_patient_data(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Remove todos os pacientes, avaliações, resultados e jobs de pontuação.
+
+    Os registros são apagados em blocos por chave primária com ``_raw_delete``:
+    nenhum objeto é carregado e nenhum signal é disparado (sem um recálculo do
+    rollup e uma invalidação do cache por linha). O rollup diário e as páginas
+    em cache são atualizados uma única vez no final.
+
+    Returns:
+        dict: {model: registros removidos}
+    """
+    deleted = {}
+    for model in CLEAR_MODELS:
+        deleted[model] = 0
+        while True:
+            with transaction.atomic():
+                pks = list(model.objects.order_by('pk').values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                deleted[model] += model.objects.filter(pk__in=pks)._raw_delete(model.objects.db)
+
+    rebuild_daily_stats()
+    bump_all_data_versions()
+    return deleted
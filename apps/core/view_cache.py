@@ -0,0 +1,103 @@
+"""
+Cache dos dados das páginas de dashboard e histórico.
+
+O contexto calculado de cada view é guardado no cache com uma chave formada
+pelo nome da view, pelos filtros da requisição e pela versão dos dados do
+escopo (global, paciente ou avaliação). Os signals de Assessment, Patient e dos
+resultados de teste incrementam as versões depois do commit da transação, de
+forma que uma alteração nunca é servida de um contexto antigo: a chave muda e
+a entrada antiga apenas expira. Operações em lote (sem signals) incrementam a
+versão 'all', que faz parte de todas as chaves.
+
+Só o contexto é guardado (não a resposta renderizada), então token CSRF,
+mensagens e dados do usuário logado continuam vindo da requisição atual.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = 'caresense'
+
+# Tempo padrão das entradas (segundos); as versões garantem a invalidação
+DEFAULT_VIEW_CACHE_TIMEOUT = 300
+
+
+def _version_key(scope, object_id=None):
+    if object_id is None:
+        return f'{KEY_PREFIX}:data-version:{scope}'
+    return f'{KEY_PREFIX}:data-version:{scope}:{object_id}'
+
+
+def _new_version():
+    # Baseada no relógio: uma versão recriada (ex.: após ser descartada pelo
+    # cache) nunca coincide com uma versão anterior ainda presente em chaves
+    return time.time_ns()
+
+
+def get_data_versions(scope='global', object_id=None):
+    """Versões atuais ('all' e a do escopo 'global', 'patient' ou 'assessment') usadas na chave"""
+    keys = [_version_key('all'), _version_key(scope, object_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_data_versions(patient_id=None, assessment_ids=()):
+    """Invalida os contextos globais e os do paciente e das avaliações informados"""
+    keys = [_version_key('global')]
+    if patient_id is not None:
+        keys.append(_version_key('patient', patient_id))
+    keys.extend(_version_key('assessment', assessment_id) for assessment_id in assessment_ids)
+
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Versão ainda não criada (ou descartada): uma nova já invalida
+            cache.set(key, _new_version(), timeout=None)
+
+
+def bump_all_data_versions():
+    """Invalida todos os contextos (ex.: depois de um recálculo em lote)"""
+    key = _version_key('all')
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def schedule_data_version_bump(patient_id=None, assessment_ids=()):
+    """Invalida as versões depois do commit da transação atual"""
+    transaction.on_commit(lambda: bump_data_versions(patient_id, assessment_ids))
+
+
+def cached_context(view_name, builder, params=None, scope='global', object_id=None):
+    """
+    Contexto de uma view, do cache quando a versão dos dados não mudou.
+
+    Args:
+        view_name: nome da view (parte da chave)
+        builder: função sem argumentos que calcula o contexto
+        params: filtros da requisição que alteram o contexto
+        scope, object_id: escopo da versão de dados ('global', 'patient' ou 'assessment')
+    """
+    timeout = getattr(settings, 'VIEW_CACHE_TIMEOUT', DEFAULT_VIEW_CACHE_TIMEOUT)
+    if not timeout:
+        return builder()
+
+    all_version, version = get_data_versions(scope, object_id)
+    params_hash = hashlib.md5(repr(sorted((params or {}).items())).encode()).hexdigest()
+    key = f'{KEY_PREFIX}:view:{view_name}:{scope}:{object_id}:{all_version}:{version}:{params_hash}'
+
+    context = cache.get(key)
+    if context is None:
+        context = builder()
+        cache.set(key, context, timeout)
+    return context
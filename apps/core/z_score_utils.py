@@ -67,49 +67,13 @@ def normalize_assessment_z_scores(assessment):
     Normaliza todos os Z-scores de uma avaliação para déficit.
     
     Args:
-        assessment: Objeto Assessment com resultados de testes
+        assessment: Objeto Assessment com resultados de testes (de preferência
+            carregado com ``Assessment.objects.with_results()``)
         
     Returns:
         dict: Z-scores normalizados por teste
     """
-    normalized_scores = {}
-    
-    # Digit Span - Performance test
-    if hasattr(assessment, 'digit_span_result') and assessment.digit_span_result.z_score is not None:
-        normalized_scores['digit_span'] = normalize_z_score_for_deficit(
-            assessment.digit_span_result.z_score, 'performance'
-        )
-    
-    # TMT - Time tests
-    if hasattr(assessment, 'tmt_result'):
-        if assessment.tmt_result.z_score_a is not None:
-            normalized_scores['tmt_a'] = normalize_z_score_for_deficit(
-                assessment.tmt_result.z_score_a, 'time'
-            )
-        if assessment.tmt_result.z_score_b is not None:
-            normalized_scores['tmt_b'] = normalize_z_score_for_deficit(
-                assessment.tmt_result.z_score_b, 'time'
-            )
-    
-    # Stroop - Time test
-    if hasattr(assessment, 'stroop_result') and assessment.stroop_result.z_score is not None:
-        normalized_scores['stroop'] = normalize_z_score_for_deficit(
-            assessment.stroop_result.z_score, 'time'
-        )
-    
-    # MEEM - Performance test
-    if hasattr(assessment, 'meem_result') and assessment.meem_result.z_score is not None:
-        normalized_scores['meem'] = normalize_z_score_for_deficit(
-            assessment.meem_result.z_score, 'performance'
-        )
-    
-    # Clock Drawing - Performance test
-    if hasattr(assessment, 'clock_drawing_result') and assessment.clock_drawing_result.z_score is not None:
-        normalized_scores['clock_drawing'] = normalize_z_score_for_deficit(
-            assessment.clock_drawing_result.z_score, 'performance'
-        )
-    
-    return normalized_scores
+    return assessment.results.normalized_z_scores()
 
 def calculate_composite_z_score(normalized_scores):
     """
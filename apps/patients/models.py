@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count, Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import date
 
@@ -9,6 +10,30 @@ class EducationLevel(models.TextChoices):
     GRADUACAO = 'GRADUACAO', 'Graduação'
     POSGRAD = 'POSGRAD', 'Pós-graduação'
 
+class PatientQuerySet(models.QuerySet):
+    def search(self, term):
+        """
+        Busca por nome ou número do quarto (contém).
+        No PostgreSQL as duas buscas usam os índices de trigramas criados por
+        ``ensure_indexes`` (ver ``apps.core.db_indexes``).
+        """
+        if not term:
+            return self
+        return self.filter(
+            Q(full_name__icontains=term) |
+            Q(room_number__icontains=term)
+        )
+    
+    def with_assessment_counts(self):
+        """Anota os contadores de avaliações por status em uma única consulta"""
+        return self.annotate(
+            assessments_count=Count('assessments'),
+            pending_assessments_count=Count('assessments', filter=Q(assessments__status='PENDING')),
+            in_progress_assessments_count=Count('assessments', filter=Q(assessments__status='IN_PROGRESS')),
+            completed_assessments_count=Count('assessments', filter=Q(assessments__status='COMPLETED')),
+            cancelled_assessments_count=Count('assessments', filter=Q(assessments__status='CANCELLED')),
+        )
+
 class Patient(models.Model):
     full_name = models.CharField(
         max_length=200,
@@ -45,6 +70,8 @@ class Patient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PatientQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Paciente'
         verbose_name_plural = 'Pacientes'
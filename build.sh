@@ -31,6 +31,21 @@ if ! python manage.py migrate; then
     python manage.py migrate --fake-initial
 fi
 
+# Índices de busca específicos do PostgreSQL (pg_trgm), fora das migrações
+echo "🔎 Garantindo índices de busca..."
+python manage.py ensure_indexes
+
+# Backfill das colunas desnormalizadas e do rollup diário. Os dois comandos são
+# idempotentes: o backfill só preenche colunas normalizadas vazias (sem
+# recalcular Z-scores nem o risco já gravados) e o rollup é recalculado a
+# partir das avaliações. O recálculo completo (rescore_assessments sem
+# --missing-only) é manual, quando as normas ou os pesos mudam
+echo "🧮 Preenchendo Z-scores normalizados vazios das avaliações..."
+python manage.py rescore_assessments --missing-only
+
+echo "📊 Reconstruindo estatísticas diárias..."
+python manage.py rebuild_daily_stats
+
 # Criar superusuário apenas se configurado
 if [ "$DJANGO_SUPERUSER_PASSWORD" ]; then
     echo "👤 Criando superusuário..."
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.x/ref/settings/
 """
 
+import json
 import os
 import dj_database_url
 from pathlib import Path
@@ -66,13 +67,14 @@ INSTALLED_APPS = [
     'apps.core',
     'apps.users.apps.UsersConfig',
     'apps.patients',
-    'apps.assessments',
+    'apps.assessments.apps.AssessmentsConfig',
     'evaluators',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -160,8 +162,37 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise configuration for static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Arquivos enviados (desenhos do Teste do Relógio). Não são servidos em MEDIA_URL:
+# as imagens passam pela view clock_drawing_image, que confere a permissão
+MEDIA_URL = '/media/'
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
+
+# Armazenamento dos arquivos enviados (ver DEPLOY_RENDER.md). Padrão: disco local
+# em MEDIA_ROOT. Em hospedagens com disco efêmero (plano free do Render) use um
+# object store, ex.: storages.backends.s3.S3Storage (django-storages), com as
+# opções do backend em JSON em MEDIA_STORAGE_OPTIONS
+FILE_SYSTEM_STORAGE = 'django.core.files.storage.FileSystemStorage'
+MEDIA_STORAGE_BACKEND = os.environ.get('MEDIA_STORAGE_BACKEND', FILE_SYSTEM_STORAGE)
+MEDIA_STORAGE_OPTIONS = json.loads(os.environ.get('MEDIA_STORAGE_OPTIONS') or '{}')
+
+# O armazenamento sobrevive a um novo deploy? Sem isso migrate_clock_drawings não
+# apaga os desenhos da tabela. Disco local só é considerado persistente em
+# desenvolvimento (em produção, MEDIA_STORAGE_PERSISTENT=true com um disco montado em MEDIA_ROOT)
+MEDIA_STORAGE_PERSISTENT = os.environ.get(
+    'MEDIA_STORAGE_PERSISTENT',
+    'True' if DEBUG or MEDIA_STORAGE_BACKEND != FILE_SYSTEM_STORAGE else 'False',
+).lower() == 'true'
+
+STORAGES = {
+    'default': {
+        'BACKEND': MEDIA_STORAGE_BACKEND,
+        'OPTIONS': MEDIA_STORAGE_OPTIONS,
+    },
+    # WhiteNoise configuration for static files
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.x/ref/settings/#default-auto-field
@@ -184,6 +215,53 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Dados normativos: intervalo (segundos) entre verificações da versão ativa em NormativeDataVersion
+NORMS_REFRESH_SECONDS = int(os.environ.get('NORMS_REFRESH_SECONDS', 30))
+
+# Cache (contextos das páginas de dashboard e histórico; ver apps/core/view_cache.py)
+# Memória local por padrão. Com CACHE_DIR definido usa arquivos, compartilhados entre
+# processos (vários workers ou comandos como rescore_assessments invalidando as páginas)
+CACHE_DIR = os.environ.get('CACHE_DIR')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'caresense',
+        }
+    }
+
+# Tempo (segundos) dos contextos em cache; 0 desativa o cache das views
+VIEW_CACHE_TIMEOUT = int(os.environ.get('VIEW_CACHE_TIMEOUT', 300))
+
+# Orçamento de consultas (apps/core/middleware.py): fração das requisições medidas
+# (todas em desenvolvimento, 1% em produção), limite de consultas para aviso no log
+# e requisições guardadas por rota no resumo de /query-budget/
+QUERY_BUDGET_SAMPLE_RATE = float(os.environ.get('QUERY_BUDGET_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+QUERY_BUDGET_MAX_QUERIES = int(os.environ.get('QUERY_BUDGET_MAX_QUERIES', 50))
+QUERY_BUDGET_WINDOW = int(os.environ.get('QUERY_BUDGET_WINDOW', 200))
+
+# Perfil de pesos do Z-score final usado pelas avaliações sem perfil próprio (slug de
+# um WeightProfile; vazio = pesos padrão embutidos, ver apps/assessments/weights.py)
+DEFAULT_WEIGHT_PROFILE = os.environ.get('DEFAULT_WEIGHT_PROFILE', '')
+
+# Cache da pontuação composta (apps/assessments/score_cache.py): entradas no LRU de cada
+# processo (0 desativa) e, com SCORE_CACHE_SHARED, também no cache acima (segundos)
+SCORE_CACHE_SIZE = int(os.environ.get('SCORE_CACHE_SIZE', 1024))
+SCORE_CACHE_SHARED = os.environ.get('SCORE_CACHE_SHARED', 'False').lower() == 'true'
+SCORE_CACHE_TIMEOUT = int(os.environ.get('SCORE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Fila do cálculo do risco final (apps/assessments/scoring_queue.py): em produção os
+# jobs são executados pelo worker process_scoring_jobs (iniciado pelo start.sh); com
+# SCORING_QUEUE_EAGER (padrão em desenvolvimento) são executados na própria requisição
+SCORING_QUEUE_EAGER = os.environ.get('SCORING_QUEUE_EAGER', 'True' if DEBUG else 'False').lower() == 'true'
+
 # Configurações de autenticação
 LOGIN_URL = '/evaluators/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -5,6 +5,7 @@ from apps.core import views as core_views
 urlpatterns = [
     path('', core_views.home, name='home'),  # Página inicial
     path('healthz/', core_views.healthz, name='healthz'),
+    path('query-budget/', core_views.query_budget_report, name='query_budget_report'),
     path('dashboard/', core_views.dashboard, name='dashboard'),
     path('patients/', core_views.patient_list, name='patient_list'),
     path('patients/dashboard/', core_views.patients_dashboard, name='patients_dashboard'),
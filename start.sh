@@ -11,11 +11,21 @@ python manage.py check
 echo "🗄️ Checking database connection..."
 python manage.py check --database default
 
+# Worker da fila do cálculo do risco final, em segundo plano
+if [ "$(echo "${SCORING_QUEUE_EAGER:-false}" | tr '[:upper:]' '[:lower:]')" != "true" ]; then
+    echo "🧮 Starting scoring worker..."
+    # Cache em arquivos: as invalidações feitas pelo worker valem também para o Gunicorn
+    export CACHE_DIR="${CACHE_DIR:-/tmp/caresense-cache}"
+    python manage.py process_scoring_jobs &
+fi
+
 # Iniciar o servidor Gunicorn
 echo "🌐 Starting Gunicorn server..."
+# --preload carrega a aplicação (e a tabela normativa compilada) uma vez, antes do fork dos workers
 exec gunicorn caresense_project.wsgi:application \
     --bind 0.0.0.0:$PORT \
     --workers 1 \
+    --preload \
     --timeout 120 \
     --access-logfile - \
     --error-logfile -
@@ -0,0 +1,68 @@
+"""
+Dados de apoio dos testes: usuários, pacientes, avaliações e resultados.
+"""
+
+from datetime import date
+
+from apps.assessments.models import (
+    Assessment, ClockDrawingResult, DigitSpanResult, MeemResult, StroopResult, TMTResult,
+)
+from apps.patients.models import Patient
+from apps.users.models import User
+
+MEEM_ITEMS = (
+    'temporal_weekday', 'temporal_day', 'temporal_month', 'temporal_year', 'temporal_hour',
+    'spatial_location', 'spatial_place', 'spatial_neighborhood', 'spatial_city', 'spatial_state',
+    'memory_word1', 'memory_word2', 'memory_word3',
+    'attention_calc1', 'attention_calc2', 'attention_calc3', 'attention_calc4', 'attention_calc5',
+    'recall_word1', 'recall_word2', 'recall_word3', 'naming_object1', 'naming_object2',
+    'repetition_phrase', 'command_take', 'command_fold', 'command_put',
+    'written_command', 'write_sentence', 'copy_pentagons',
+)
+
+# Entradas de cada teste no formato dos endpoints de submissão
+SUBMISSIONS = {
+    'digit_span': {'forward_score': 8, 'forward_span': 6, 'backward_score': 6, 'backward_span': 4},
+    'tmt': {'time_a_seconds': 40, 'errors_a': 0, 'time_b_seconds': 90, 'errors_b': 1},
+    'stroop': {'card_1_time': 20, 'card_2_time': 22, 'card_3_time': 40},
+    'meem': {item: 1 for item in MEEM_ITEMS},
+}
+
+RESULT_MODELS = {
+    'digit_span': DigitSpanResult,
+    'tmt': TMTResult,
+    'stroop': StroopResult,
+    'meem': MeemResult,
+}
+
+
+def create_user(username='avaliador', **extra):
+    return User.objects.create_user(username, password='senha', **extra)
+
+
+def create_patient(number=0, **extra):
+    values = {
+        'full_name': f'Paciente {number:03d}',
+        'birth_date': date(1940 + number % 40, 1 + number % 12, 1 + number % 28),
+        'room_number': f'{100 + number}A',
+        'education_level': ('NONE', 'FUNDAMENTAL', 'MEDIO', 'GRADUACAO', 'POSGRAD')[number % 5],
+    }
+    values.update(extra)
+    return Patient.objects.create(**values)
+
+
+def add_results(assessment, tests=tuple(RESULT_MODELS), clock_drawing=False, **overrides):
+    """Grava os resultados dos testes informados (com ``save()``: Z-scores calculados)"""
+    for test in tests:
+        values = dict(SUBMISSIONS[test], **overrides.get(test, {}))
+        RESULT_MODELS[test].objects.create(assessment=assessment, **values)
+    if clock_drawing:
+        ClockDrawingResult.objects.create(assessment=assessment, circle_score=2, numbers_score=3, hands_score=3)
+    return Assessment.objects.with_results().select_related('patient').get(pk=assessment.pk)
+
+
+def create_assessment(patient, assessor, tests=(), status='IN_PROGRESS', **extra):
+    assessment = Assessment.objects.create(patient=patient, assessor=assessor, status=status, **extra)
+    if tests:
+        return add_results(assessment, tests)
+    return assessment
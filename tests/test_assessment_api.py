@@ -0,0 +1,50 @@
+"""
+Testes da listagem da API de avaliações (paginação por cursor e ?fields=).
+"""
+
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.assessments.models import Assessment
+from apps.patients.models import Patient
+from apps.users.models import User
+
+
+class AssessmentListFieldsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('avaliador', password='senha')
+        self.client.force_login(user)
+        patient = Patient.objects.create(full_name='Paciente', birth_date=date(1940, 1, 1), room_number='101')
+        for _ in range(7):
+            Assessment.objects.create(patient=patient, assessor=user)
+        self.url = reverse('assessments:assessment-list')
+
+    def get_list(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sparse_fields_do_not_add_queries(self):
+        # Os campos da ordenação do cursor entram no only(): sem carga adiada por linha
+        with CaptureQueriesContext(connection) as full:
+            self.get_list(page_size=5)
+        with self.assertNumQueries(len(full)):
+            data = self.get_list(page_size=5, fields='status')
+        self.assertEqual(data['results'][0], {'status': 'PENDING'})
+
+    def test_sparse_fields_paginate_through_all_rows(self):
+        expected = list(Assessment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids = []
+        data = self.get_list(page_size=3, fields='id')
+        while True:
+            ids.extend(row['id'] for row in data['results'])
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+        self.assertEqual(ids, expected)
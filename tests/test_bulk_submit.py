@@ -0,0 +1,87 @@
+"""
+Testes da submissão em lote: status de cada item na resposta 207.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.assessments import bulk_submit
+from apps.assessments.models import Assessment, StroopResult, TMTResult
+
+from .helpers import SUBMISSIONS, create_assessment, create_patient, create_user
+
+
+class BulkSubmitStatusTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        other = create_user('outro')
+        patient = create_patient()
+        self.own = [create_assessment(patient, self.user, status='PENDING') for _ in range(3)]
+        self.submitted = create_assessment(patient, self.user, tests=('tmt',))
+        self.foreign = create_assessment(patient, other, status='PENDING')
+        self.client.force_login(self.user)
+        self.url = reverse('assessments:assessment-bulk-submit')
+
+    def post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'items': items}, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        return response.json()['items']
+
+    def statuses(self, items):
+        return [item['status'] for item in items]
+
+    def test_per_item_statuses(self):
+        tmt = SUBMISSIONS['tmt']
+        items = self.post([
+            {'assessment_id': self.own[0].pk, 'tmt': tmt, 'stroop': SUBMISSIONS['stroop']},
+            {'assessment_id': self.own[1].pk, 'tmt': {'time_a_seconds': 'rápido'}},
+            {'assessment_id': self.own[1].pk},
+            {'assessment_id': self.foreign.pk, 'tmt': tmt},
+            {'assessment_id': 999999, 'tmt': tmt},
+            {'assessment_id': self.submitted.pk, 'tmt': tmt},
+            {'assessment_id': self.own[2].pk, 'stroop': SUBMISSIONS['stroop']},
+            {'assessment_id': self.own[2].pk, 'tmt': tmt},
+        ])
+        self.assertEqual(self.statuses(items), [201, 400, 400, 403, 404, 400, 201, 400])
+        self.assertEqual(items[0]['created'], ['tmt', 'stroop'])
+        self.assertIn('time_a_seconds', items[1]['errors']['tmt'])
+        self.assertIn('tmt', items[5]['errors'])
+        self.assertIn('repetida', items[7]['errors'])
+
+        self.assertEqual(
+            set(TMTResult.objects.values_list('assessment_id', flat=True)), {self.own[0].pk, self.submitted.pk}
+        )
+        self.assertEqual(
+            set(StroopResult.objects.values_list('assessment_id', flat=True)), {self.own[0].pk, self.own[2].pk}
+        )
+        statuses = dict(Assessment.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[assessment.pk] for assessment in (*self.own, self.foreign)],
+            ['IN_PROGRESS', 'PENDING', 'IN_PROGRESS', 'PENDING'],
+        )
+
+    def test_concurrent_submission_is_a_conflict(self):
+        build_results = bulk_submit._build_results
+        calls = []
+
+        def build_after_concurrent_submission(accepted):
+            if not calls:
+                # Outra requisição grava o TMT da primeira avaliação depois da verificação
+                TMTResult.objects.create(assessment=self.own[0], **SUBMISSIONS['tmt'])
+            calls.append(accepted)
+            return build_results(accepted)
+
+        with mock.patch.object(bulk_submit, '_build_results', side_effect=build_after_concurrent_submission):
+            items = self.post([
+                {'assessment_id': self.own[0].pk, 'tmt': SUBMISSIONS['tmt'], 'stroop': SUBMISSIONS['stroop']},
+                {'assessment_id': self.own[1].pk, 'tmt': SUBMISSIONS['tmt']},
+            ])
+
+        self.assertEqual(self.statuses(items), [409, 201])
+        self.assertEqual(len(calls), 2)
+        # Nada do item em conflito é gravado pelo lote
+        self.assertFalse(StroopResult.objects.filter(assessment=self.own[0]).exists())
+        self.assertEqual(TMTResult.objects.filter(assessment=self.own[1]).count(), 1)
@@ -0,0 +1,88 @@
+"""
+Testes da evolução da coorte: listas e contagens calculadas no banco.
+"""
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.assessments.models import NORMALIZED_Z_SCORE_FIELDS, Assessment
+from apps.core.cohort_evolution import TREND_THRESHOLD, get_cohort_evolution
+
+from .helpers import create_patient, create_user
+
+# Z-scores compostos das avaliações concluídas de cada paciente, em ordem cronológica
+COHORT = [
+    [-2.0, 0.5],    # melhora 2.5
+    [1.0, -1.0],    # queda 2.0
+    [0.0, 0.3],     # estável
+    [-1.0, -0.9, 0.0],  # melhora 1.0
+    [0.5, -0.5],    # queda 1.0
+    [0.2],          # uma avaliação: fora da coorte
+    [0.0, 0.0],     # estável
+    [-1.5, 1.5],    # melhora 3.0
+]
+
+
+class CohortEvolutionTest(TestCase):
+    def setUp(self):
+        user = create_user()
+        now = timezone.now()
+        self.patients = []
+        for number, composites in enumerate(COHORT):
+            patient = create_patient(number)
+            self.patients.append(patient)
+            for days_ago, composite in zip(range(len(composites), 0, -1), composites):
+                assessment = Assessment.objects.create(
+                    patient=patient, assessor=user, status='COMPLETED',
+                    **{field: composite for field in NORMALIZED_Z_SCORE_FIELDS.values()},
+                )
+                Assessment.objects.filter(pk=assessment.pk).update(created_at=now - timedelta(days=days_ago))
+            # Avaliação não concluída: ignorada
+            Assessment.objects.create(patient=patient, assessor=user, digit_span_z_score=5.0)
+
+    def expected_improvements(self):
+        return {
+            self.patients[number].pk: composites[-1] - composites[0]
+            for number, composites in enumerate(COHORT) if len(composites) > 1
+        }
+
+    def ids(self, entries):
+        return [entry['patient'].pk for entry in entries]
+
+    def test_lists_and_counts(self):
+        improvements = self.expected_improvements()
+        by_improvement = sorted(improvements, key=lambda pk: -improvements[pk])
+        cohort = get_cohort_evolution(limit=4, highlight_limit=2)
+
+        self.assertEqual(self.ids(cohort['patients_evolution']), by_improvement[:4])
+        self.assertEqual(
+            self.ids(cohort['improving_patients']),
+            [pk for pk in by_improvement if improvements[pk] > TREND_THRESHOLD][:2],
+        )
+        self.assertEqual(
+            self.ids(cohort['declining_patients']),
+            [pk for pk in reversed(by_improvement) if improvements[pk] < -TREND_THRESHOLD][:2],
+        )
+        self.assertEqual(
+            cohort['evolution_stats'],
+            {'improving_count': 3, 'declining_count': 2, 'stable_count': 2},
+        )
+        first = cohort['patients_evolution'][0]
+        self.assertEqual((first['first_avg_z'], first['last_avg_z'], first['improvement']), (-1.5, 1.5, 3.0))
+        self.assertEqual((first['trend'], first['assessment_count'], first['days_between']), ('improving', 2, 1))
+
+    def test_query_count_does_not_depend_on_cohort_size(self):
+        # Contagens, três listas limitadas e os pacientes exibidos
+        with self.assertNumQueries(5):
+            get_cohort_evolution(limit=2, highlight_limit=1)
+
+    def test_empty_cohort(self):
+        Assessment.objects.all().delete()
+        cohort = get_cohort_evolution()
+        self.assertEqual(cohort['patients_evolution'], [])
+        self.assertEqual(
+            cohort['evolution_stats'],
+            {'improving_count': 0, 'declining_count': 0, 'stable_count': 0},
+        )
@@ -0,0 +1,98 @@
+"""
+Testes do rollup diário: a atualização por signals coincide com a reconstrução completa.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.assessments import daily_stats
+from apps.assessments.daily_stats import compute_daily_rows, rebuild_daily_stats
+from apps.assessments.models import Assessment, DailyAssessmentStats, TMTResult
+
+from .helpers import add_results, create_assessment, create_patient, create_user
+
+
+class DailyStatsConsistencyTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.patients = [create_patient(number) for number in range(3)]
+
+    def snapshot(self):
+        return sorted(
+            DailyAssessmentStats.objects.values_list(
+                'date', 'status', 'test', 'count', 'z_score_sum', 'z_score_sum_squares',
+                'below_normal_count', 'normal_count', 'above_normal_count',
+            )
+        )
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        rebuild_daily_stats()
+        rebuilt = self.snapshot()
+        self.assertEqual(incremental, rebuilt)
+        return rebuilt
+
+    def create(self, patient, tests=('digit_span', 'tmt', 'stroop', 'meem'), status='IN_PROGRESS'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_assessment(patient, self.user, tests=tests, status=status)
+
+    def test_create(self):
+        self.create(self.patients[0])
+        self.create(self.patients[1], tests=('tmt',), status='PENDING')
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(sum(row[3] for row in rows if row[2] == 'tmt_b'), 2)
+        self.assertEqual(sum(row[3] for row in rows if row[2] == 'digit_span'), 1)
+
+    def test_update_status_and_result(self):
+        assessment = self.create(self.patients[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            assessment.status = 'COMPLETED'
+            assessment.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = TMTResult.objects.get(assessment=assessment)
+            result.time_b_seconds = 250
+            result.save()
+        self.assert_matches_rebuild()
+        self.assertFalse(DailyAssessmentStats.objects.filter(status='IN_PROGRESS').exists())
+
+    def test_day_change(self):
+        assessment = self.create(self.patients[0])
+        old_day = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            assessment.created_at = timezone.now() - timedelta(days=3)
+            assessment.save()
+        self.assert_matches_rebuild()
+        self.assertFalse(DailyAssessmentStats.objects.filter(date=old_day).exists())
+        self.assertTrue(DailyAssessmentStats.objects.filter(date=old_day - timedelta(days=3)).exists())
+
+    def test_delete(self):
+        keep = self.create(self.patients[0])
+        removed = self.create(self.patients[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            TMTResult.objects.filter(assessment=keep).get().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            removed.delete()
+        rows = self.assert_matches_rebuild()
+        self.assertEqual([row[3] for row in rows if row[2] == 'ALL'], [1])
+        self.assertFalse(any(row[2] == 'tmt_a' for row in rows))
+
+    def test_day_is_refreshed_once_per_transaction(self):
+        with mock.patch.object(daily_stats, 'refresh_daily_stats', wraps=daily_stats.refresh_daily_stats) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for patient in self.patients:
+                        assessment = Assessment.objects.create(patient=patient, assessor=self.user)
+                        add_results(assessment, ('digit_span', 'tmt'))
+        refresh.assert_called_once_with(timezone.localdate())
+        self.assert_matches_rebuild()
+
+    def test_compute_daily_rows_is_one_query(self):
+        for patient in self.patients:
+            self.create(patient)
+        with self.assertNumQueries(1):
+            rows = compute_daily_rows(timezone.localdate())
+        self.assertEqual(rows[('IN_PROGRESS', 'ALL')]['count'], 3)
@@ -0,0 +1,50 @@
+"""
+Testes de regressão dos planos de consulta (EXPLAIN).
+
+Cada padrão de ``ACCESS_PATTERNS`` precisa usar um dos seus índices no banco
+de teste. Os padrões portáveis são conferidos em qualquer banco; os da busca de
+pacientes (``pg_trgm``) só no PostgreSQL.
+"""
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.core.db_indexes import (
+    ACCESS_PATTERNS, POSTGRES_SEARCH_INDEXES, explain, postgres_search_indexes,
+)
+
+
+class PlanAssertionsMixin:
+    def assert_plan_uses_index(self, pattern):
+        plan = explain(pattern.queryset(), connection)
+        self.assertTrue(
+            any(name in plan for name in pattern.indexes),
+            f"'{pattern.name}' não usa {' ou '.join(pattern.indexes)}:\n{plan}",
+        )
+
+
+class AccessPatternPlanTest(PlanAssertionsMixin, TestCase):
+    def test_portable_patterns_use_indexes(self):
+        for pattern in ACCESS_PATTERNS:
+            if pattern.postgres_only:
+                continue
+            with self.subTest(pattern=pattern.name):
+                self.assert_plan_uses_index(pattern)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'índices de busca só existem no PostgreSQL')
+class PostgresSearchPlanTest(PlanAssertionsMixin, TransactionTestCase):
+    """Busca de pacientes por nome e quarto pelos índices de trigramas"""
+
+    def setUp(self):
+        # CREATE INDEX CONCURRENTLY não roda dentro de transação (daí o TransactionTestCase)
+        self.assertEqual(postgres_search_indexes(connection), list(POSTGRES_SEARCH_INDEXES))
+
+    def test_search_patterns_use_indexes(self):
+        for pattern in ACCESS_PATTERNS:
+            if not pattern.postgres_only:
+                continue
+            with self.subTest(pattern=pattern.name):
+                self.assert_plan_uses_index(pattern)
@@ -0,0 +1,150 @@
+"""
+Testes dos desenhos do Teste do Relógio: resposta com ETag/Range, arquivo
+ausente e migração para um armazenamento persistente.
+"""
+
+import base64
+import random
+import shutil
+import struct
+import tempfile
+import zlib
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.assessments.models import ClockDrawingResult
+
+from .helpers import create_assessment, create_patient, create_user
+
+
+def make_png(width=32, height=32, seed=1):
+    """PNG RGB válido, com pixels aleatórios (sem depender do Pillow)"""
+    rnd = random.Random(seed)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + bytes(rnd.randrange(256) for _ in range(width * 3)) for _ in range(height))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(rows))
+        + chunk(b'IEND', b'')
+    )
+
+
+class MediaRootMixin:
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_user()
+        self.assessment = create_assessment(create_patient(), self.user)
+
+
+class DrawingResponseTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.png = make_png()
+        self.result = ClockDrawingResult(assessment=self.assessment, circle_score=2, numbers_score=3, hands_score=3)
+        self.result.set_drawing(self.png)
+        self.result.save()
+        self.etag = f'"{self.result.drawing_etag}"'
+        self.url = reverse('assessments:clock_drawing_image', args=[self.assessment.pk])
+        self.client.force_login(self.user)
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.png)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.png)))
+
+    def test_if_none_match(self):
+        response = self.get(if_none_match=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.get(if_none_match='"outro"').status_code, 200)
+
+    def test_range(self):
+        response = self.get(range='bytes=10-29')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), self.png[10:30])
+        self.assertEqual(response['Content-Range'], f'bytes 10-29/{len(self.png)}')
+        self.assertEqual(response['Content-Length'], '20')
+
+        response = self.get(range='bytes=-16')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), self.png[-16:])
+
+        response = self.get(range='bytes=100-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), self.png[100:])
+
+    def test_unsatisfiable_range(self):
+        for header in (f'bytes={len(self.png)}-', 'bytes=-0', 'bytes=20-10'):
+            with self.subTest(range=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{len(self.png)}')
+
+    def test_unsupported_range_is_ignored(self):
+        response = self.get(range='bytes=0-1,5-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.png)
+
+    def test_if_range(self):
+        response = self.get(range='bytes=0-9', if_range=self.etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), self.png[:10])
+
+        # Versão diferente da que o cliente tem: o arquivo inteiro
+        response = self.get(range='bytes=0-9', if_range='"outro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.png)
+
+    def test_missing_file_is_404(self):
+        default_storage.delete(self.result.drawing_image.name)
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(if_none_match=self.etag).status_code, 404)
+        self.assertEqual(self.get(range='bytes=0-9').status_code, 404)
+
+
+class MigrateClockDrawingsTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.png = make_png(seed=2)
+        self.result = ClockDrawingResult.objects.create(
+            assessment=self.assessment, circle_score=2, numbers_score=3, hands_score=3,
+            drawing_data='data:image/png;base64,' + base64.b64encode(self.png).decode(),
+        )
+
+    @override_settings(MEDIA_STORAGE_PERSISTENT=False)
+    def test_refuses_without_persistent_storage(self):
+        with self.assertRaisesMessage(CommandError, 'não é persistente'):
+            call_command('migrate_clock_drawings', stdout=StringIO())
+        self.result.refresh_from_db()
+        self.assertTrue(self.result.drawing_data)
+        self.assertFalse(self.result.drawing_image)
+
+    @override_settings(MEDIA_STORAGE_PERSISTENT=True)
+    def test_moves_drawing_to_persistent_storage(self):
+        call_command('migrate_clock_drawings', stdout=StringIO())
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.drawing_data, '')
+        with default_storage.open(self.result.drawing_image.name, 'rb') as handle:
+            self.assertEqual(handle.read(), self.png)
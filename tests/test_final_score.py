@@ -0,0 +1,36 @@
+"""
+Testes do pipeline de finalização: cálculo do risco final e gravação dos Z-scores.
+"""
+
+from django.test import TestCase
+
+from apps.assessments.models import Assessment
+from apps.assessments.score_cache import score_cache
+from apps.assessments.services import score_calculator
+
+from .helpers import RESULT_MODELS, create_assessment, create_patient, create_user
+
+
+class CompletionQueryCountTest(TestCase):
+    def setUp(self):
+        self.assessment = create_assessment(create_patient(), create_user(), tests=RESULT_MODELS)
+        score_calculator.norm_table  # normas carregadas fora da contagem
+        score_cache.clear()
+
+    def test_stale_results_are_written_with_one_update_per_model(self):
+        for model in RESULT_MODELS.values():
+            model.objects.update(norm_version='antiga')
+        # Leitura, um UPDATE por modelo de resultado e o UPDATE da avaliação (savepoint incluso)
+        with self.assertNumQueries(1 + len(RESULT_MODELS) + 1 + 2):
+            result = score_calculator.calculate_final_risk_score(self.assessment.pk)
+        self.assertIsNotNone(result)
+        version = score_calculator.norm_table.version
+        for model in RESULT_MODELS.values():
+            self.assertEqual(model.objects.get().norm_version, version)
+        self.assertEqual(Assessment.objects.get().status, 'COMPLETED')
+
+    def test_unchanged_completed_assessment_is_not_rewritten(self):
+        first = score_calculator.calculate_final_risk_score(self.assessment.pk)
+        with self.assertNumQueries(1):
+            second = score_calculator.calculate_final_risk_score(self.assessment.pk)
+        self.assertEqual(first, second)
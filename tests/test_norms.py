@@ -0,0 +1,55 @@
+"""
+Testes da compilação dos dados normativos.
+"""
+
+import copy
+
+from django.test import SimpleTestCase
+
+from apps.assessments.norm_store import load_bundled_normative_data
+from apps.assessments.norms import NormativeDataError, compile_norm_table, find_missing_cells
+
+
+class CompileNormTableTest(SimpleTestCase):
+    def setUp(self):
+        self.data = load_bundled_normative_data()
+
+    def assert_rejected(self, data, cell):
+        with self.assertRaisesMessage(NormativeDataError, cell):
+            compile_norm_table(data)
+        self.assertIn(tuple(cell.split('/')), find_missing_cells(data))
+
+    def test_bundled_data_compiles(self):
+        table = compile_norm_table(self.data)
+        self.assertEqual(table.version, self.data['metadata']['version'])
+        self.assertFalse(table.mean.flags.writeable)
+        self.assertFalse(table.sd.flags.writeable)
+
+    def test_missing_education_cell(self):
+        data = copy.deepcopy(self.data)
+        del data['tmt_b']['70-79']['high_education']
+        # A faixa 70-79 dos dados cobre as faixas 70-74 e 75-79 da tabela compilada
+        self.assert_rejected(data, 'tmt_b/70-74/high_education')
+        self.assert_rejected(data, 'tmt_b/75-79/high_education')
+
+    def test_invalid_cell(self):
+        data = copy.deepcopy(self.data)
+        data['stroop']['60-69']['low_education']['sd'] = -1
+        self.assert_rejected(data, 'stroop/60-64/low_education')
+
+    def test_missing_age_band(self):
+        data = copy.deepcopy(self.data)
+        del data['digit_span']['80+']
+        with self.assertRaisesMessage(NormativeDataError, 'digit_span/80+'):
+            compile_norm_table(data)
+
+    def test_missing_required_test(self):
+        data = copy.deepcopy(self.data)
+        del data['meem']
+        self.assert_rejected(data, 'meem/*/*')
+
+    def test_allow_missing_compiles_with_gaps(self):
+        data = copy.deepcopy(self.data)
+        del data['meem']
+        table = compile_norm_table(data, allow_missing=True)
+        self.assertNotIn('meem', table)
@@ -0,0 +1,79 @@
+"""
+Testes da lista de pacientes: número de consultas constante e busca.
+"""
+
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.assessments.models import Assessment
+from apps.patients.models import Patient
+from apps.users.models import User
+
+STATUSES = ('PENDING', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED')
+
+
+class PatientListQueriesTest(TestCase):
+    """A lista de pacientes faz o mesmo número de consultas com poucos ou muitos pacientes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('avaliador', password='senha')
+        self.client.force_login(self.user)
+
+    def create_patients(self, count):
+        start = Patient.objects.count()
+        for number in range(start, start + count):
+            patient = Patient.objects.create(
+                full_name=f'Paciente {number:03d}',
+                birth_date=date(1940, 1, 1),
+                room_number=f'{100 + number}A',
+            )
+            # Avaliações em todos os status, para exercitar os contadores anotados
+            for status in STATUSES[:number % (len(STATUSES) + 1)]:
+                Assessment.objects.create(patient=patient, assessor=self.user, status=status)
+
+    def get_list(self):
+        response = self.client.get(reverse('patient_list'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_patients(self):
+        self.create_patients(10)
+        with CaptureQueriesContext(connection) as few_patients:
+            self.get_list()
+
+        self.create_patients(60)
+        with self.assertNumQueries(len(few_patients)):
+            response = self.get_list()
+        self.assertEqual(response.context['total_patients'], 70)
+
+    def test_status_counts_are_annotated(self):
+        self.create_patients(5)
+        response = self.get_list()
+        patient = next(p for p in response.context['patients'] if p.full_name == 'Paciente 004')
+        self.assertEqual(patient.assessments_count, 4)
+        self.assertEqual(patient.pending_assessments_count, 1)
+        self.assertEqual(patient.completed_assessments_count, 1)
+        self.assertTrue(patient.has_pending_assessments)
+
+
+class PatientSearchTest(TestCase):
+    def setUp(self):
+        Patient.objects.create(full_name='Maria da Silva', birth_date=date(1940, 1, 1), room_number='12B')
+        Patient.objects.create(full_name='João Souza', birth_date=date(1945, 1, 1), room_number='A312')
+
+    def search(self, term):
+        return sorted(Patient.objects.search(term).values_list('full_name', flat=True))
+
+    def test_name_contains(self):
+        self.assertEqual(self.search('silva'), ['Maria da Silva'])
+
+    def test_room_contains(self):
+        self.assertEqual(self.search('12'), ['João Souza', 'Maria da Silva'])
+        self.assertEqual(self.search('a3'), ['João Souza'])
+
+    def test_empty_term_returns_all(self):
+        self.assertEqual(len(self.search('')), 2)
@@ -0,0 +1,27 @@
+"""
+Testes do filtro de período do dashboard de pacientes.
+"""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.users.models import User
+
+
+class PatientsDashboardPeriodTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('avaliador', password='senha'))
+
+    def get_period(self, period):
+        response = self.client.get(reverse('patients_dashboard'), {'period': period})
+        self.assertEqual(response.status_code, 200)
+        return response.context['period'], response.context['timeline_days']
+
+    def test_valid_periods(self):
+        self.assertEqual(self.get_period('60'), ('60', 60))
+        self.assertEqual(self.get_period('all'), ('all', 365))
+
+    def test_invalid_period_falls_back_to_default(self):
+        for period in ('abc', '', '-5', '7'):
+            with self.subTest(period=period):
+                self.assertEqual(self.get_period(period), ('30', 30))
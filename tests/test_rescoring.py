@@ -0,0 +1,56 @@
+"""
+Testes do recálculo em lote e do preenchimento das colunas normalizadas.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.assessments.models import NORMALIZED_Z_SCORE_FIELDS, Assessment
+from apps.assessments.services import score_calculator
+
+from .helpers import RESULT_MODELS, create_assessment, create_patient, create_user
+
+
+class MissingOnlyBackfillTest(TestCase):
+    def setUp(self):
+        user = create_user()
+        self.assessments = [
+            create_assessment(create_patient(number), user, tests=RESULT_MODELS) for number in range(3)
+        ]
+        for assessment in self.assessments:
+            score_calculator.calculate_final_risk_score(assessment.pk)
+
+    def rescore_missing(self):
+        call_command('rescore_assessments', '--missing-only', stdout=StringIO())
+
+    def scores(self):
+        return list(
+            Assessment.objects.order_by('pk').values_list(
+                'final_z_score', 'final_risk_score', *NORMALIZED_Z_SCORE_FIELDS.values()
+            )
+        )
+
+    def test_fills_only_empty_columns(self):
+        expected = self.scores()
+        Assessment.objects.filter(pk=self.assessments[0].pk).update(
+            digit_span_z_score=None, tmt_b_z_score=None, stroop_z_score=None,
+        )
+        # Histórico: o risco gravado não é recalculado (idade do paciente hoje, por exemplo)
+        Assessment.objects.filter(pk=self.assessments[1].pk).update(final_risk_score='CRITICAL')
+        expected[1] = (expected[1][0], 'CRITICAL', *expected[1][2:])
+        self.rescore_missing()
+        self.assertEqual(self.scores(), expected)
+
+    def test_results_are_untouched(self):
+        Assessment.objects.update(meem_z_score=None)
+        before = {name: list(model.objects.order_by('pk').values()) for name, model in RESULT_MODELS.items()}
+        self.rescore_missing()
+        after = {name: list(model.objects.order_by('pk').values()) for name, model in RESULT_MODELS.items()}
+        self.assertEqual(before, after)
+        self.assertFalse(Assessment.objects.filter(meem_z_score__isnull=True).exists())
+
+    def test_nothing_missing_writes_nothing(self):
+        with self.assertNumQueries(1):
+            self.rescore_missing()
@@ -0,0 +1,127 @@
+"""
+Testes do cache da pontuação composta: acertos iguais ao recálculo, chaves
+por versão das normas e dos pesos, validação e LRU.
+"""
+
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from apps.assessments.models import Assessment, DigitSpanResult
+from apps.assessments.norms import compile_norm_table
+from apps.assessments.score_cache import ScoreCache, composite_key, score_cache
+from apps.assessments.services import AssessmentScoreCalculator, score_calculator
+from apps.assessments.weights import DEFAULT_WEIGHTS, compile_weight_profile
+
+from .helpers import RESULT_MODELS, create_assessment, create_patient, create_user
+
+
+class CompositeScoreCacheTest(TestCase):
+    def setUp(self):
+        user = create_user()
+        # Mesmo nascimento e escolaridade: mesmas entradas, mesma chave
+        self.assessments = [
+            create_assessment(
+                create_patient(number, birth_date=date(1940, 1, 1), education_level='MEDIO'), user, tests=RESULT_MODELS,
+            )
+            for number in range(3)
+        ]
+        score_cache.clear()
+        self.addCleanup(score_cache.clear)
+
+    def calculate(self, assessment):
+        return score_calculator.calculate_final_risk_score(assessment.pk)
+
+    def calculate_uncached(self, assessment):
+        with mock.patch.object(score_cache, 'max_size', 0):
+            self.assertFalse(score_cache.enabled)
+            return self.calculate(assessment)
+
+    def stored(self, assessment):
+        return Assessment.objects.values(
+            'final_z_score', 'final_risk_score', 'confidence_level', 'digit_span_z_score', 'tmt_b_z_score',
+        ).get(pk=assessment.pk)
+
+    def key(self, assessment, norm_table=None, weights_version=DEFAULT_WEIGHTS.version):
+        assessment = Assessment.objects.with_results().select_related('patient').get(pk=assessment.pk)
+        return composite_key(
+            assessment.results, assessment.patient, norm_table or score_calculator.norm_table,
+            weights_version, score_calculator,
+        )
+
+    def test_hit_matches_recomputed_score(self):
+        first, second, third = self.assessments
+        self.assertEqual(self.key(first), self.key(second))
+
+        self.calculate(first)
+        cached = self.calculate(second)
+        stats = score_cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['sets']), (1, 1, 1))
+
+        self.assertEqual(cached, self.calculate_uncached(third))
+        self.assertEqual(self.stored(second), self.stored(third))
+
+    def test_norm_version_change_misses(self):
+        first, second, _ = self.assessments
+        self.calculate(first)
+        table = compile_norm_table(score_calculator.normative_data, version='outra')
+        self.assertNotEqual(self.key(second, norm_table=table), self.key(second))
+
+        with mock.patch.object(AssessmentScoreCalculator, 'norm_table', new=table):
+            self.calculate(second)
+        stats = score_cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits']), (2, 0))
+        self.assertEqual(DigitSpanResult.objects.get(assessment=second).norm_version, 'outra')
+
+    def test_weight_version_change_misses(self):
+        first, second, _ = self.assessments
+        weights = compile_weight_profile({**DEFAULT_WEIGHTS.as_dict(), 'meem': 3.0}, 'meem-forte')
+        self.assertNotEqual(self.key(second, weights_version=weights.version), self.key(second))
+
+        self.calculate(first)
+        with mock.patch.object(score_calculator.weight_store, 'for_assessment', return_value=weights):
+            result = self.calculate(second)
+        self.assertEqual(score_cache.stats()['local_hits'], 0)
+        self.assertEqual(result['test_scores']['meem']['weight'], 3.0)
+
+    def test_validate_mismatch_recomputes(self):
+        first, second, third = self.assessments
+        self.calculate(first)
+        # Z-score gravado diferente do da entrada do cache (mesma versão das normas e entradas)
+        DigitSpanResult.objects.filter(assessment=second).update(z_score=-3.0)
+        DigitSpanResult.objects.filter(assessment=third).update(z_score=-3.0)
+
+        result = self.calculate(second)
+        stats = score_cache.stats()
+        self.assertEqual((stats['mismatches'], stats['local_hits']), (1, 0))
+        self.assertEqual(result, self.calculate_uncached(third))
+        self.assertEqual(self.stored(second)['digit_span_z_score'], -3.0)
+
+
+class ScoreCacheLRUTest(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = ScoreCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'a' passa a ser o mais recente
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats['evictions'], stats['size'], stats['misses']), (1, 2, 1))
+
+    def test_validate_rejects_entry(self):
+        cache = ScoreCache(max_size=2)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a', validate=lambda value: value == 2))
+        self.assertEqual(cache.get('a', validate=lambda value: value == 1), 1)
+        self.assertEqual(cache.stats()['mismatches'], 1)
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ScoreCache(max_size=0)
+        self.assertFalse(cache.enabled)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
@@ -0,0 +1,166 @@
+"""
+Testes da fila do risco final: idempotência, novas tentativas com espera
+exponencial, reserva de jobs abandonados e reenfileiramento de jobs com falha.
+"""
+
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.assessments import scoring_queue
+from apps.assessments.models import Assessment, ScoringJob, TMTResult
+from apps.assessments.scoring_queue import (
+    LOCK_TIMEOUT, MAX_RETRY_DELAY, RETRY_DELAY, claim_due_jobs, enqueue_final_risk, enqueue_final_risk_many,
+    process_due_jobs,
+)
+
+from .helpers import RESULT_MODELS, add_results, create_assessment, create_patient, create_user
+
+
+@override_settings(SCORING_QUEUE_EAGER=False)
+class ScoringQueueTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.assessment = create_assessment(create_patient(), self.user, tests=RESULT_MODELS)
+
+    def reload(self):
+        return Assessment.objects.with_results().get(pk=self.assessment.pk)
+
+    @contextmanager
+    def fail_calculation(self):
+        with mock.patch.object(scoring_queue, 'calculate_final_risk', side_effect=RuntimeError('falhou')), \
+                mock.patch.object(scoring_queue.logger, 'exception'):
+            yield
+
+    def run_due(self, job):
+        # Antecipa a próxima tentativa e executa os jobs prontos
+        ScoringJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        process_due_jobs('worker-1')
+        job.refresh_from_db()
+
+    def test_same_inputs_enqueue_once(self):
+        job, created = enqueue_final_risk(self.assessment)
+        self.assertTrue(created)
+        self.assertEqual(enqueue_final_risk(self.reload()), (job, False))
+        self.assertEqual(enqueue_final_risk_many([self.reload()]), {self.assessment.pk: job})
+        self.assertEqual(ScoringJob.objects.count(), 1)
+        self.assertEqual(self.reload().scoring_status, 'QUEUED')
+
+    def test_changed_input_enqueues_new_job(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        result = TMTResult.objects.get(assessment=self.assessment)
+        result.time_a_seconds += 1
+        result.save()
+        new_job, created = enqueue_final_risk(self.reload())
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.idempotency_key, job.idempotency_key)
+
+    def test_done_job_is_not_run_again(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        self.assertEqual(process_due_jobs('worker-1'), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(enqueue_final_risk(self.reload()), (job, False))
+        self.assertEqual(process_due_jobs('worker-1'), (0, 0))
+
+    def test_retry_with_exponential_backoff_until_failed(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        with self.fail_calculation():
+            for attempt in range(1, job.max_attempts):
+                before = timezone.now()
+                self.run_due(job)
+                self.assertEqual((job.status, job.attempts), ('PENDING', attempt))
+                delay = RETRY_DELAY * 2 ** (attempt - 1)
+                self.assertGreaterEqual(job.run_after, before + delay)
+                self.assertLessEqual(job.run_after, timezone.now() + delay)
+                self.assertIn('falhou', job.last_error)
+                self.assertEqual(self.reload().scoring_status, 'QUEUED')
+            self.run_due(job)
+        self.assertEqual((job.status, job.attempts), ('FAILED', job.max_attempts))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(self.reload().scoring_status, 'FAILED')
+
+    def test_backoff_is_capped(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        ScoringJob.objects.filter(pk=job.pk).update(attempts=15, max_attempts=100)
+        before = timezone.now()
+        with self.fail_calculation():
+            self.run_due(job)
+        self.assertEqual(job.status, 'PENDING')
+        self.assertGreaterEqual(job.run_after, before + MAX_RETRY_DELAY)
+        self.assertLessEqual(job.run_after, timezone.now() + MAX_RETRY_DELAY)
+
+    def test_failed_job_is_requeued(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        ScoringJob.objects.filter(pk=job.pk).update(
+            status='FAILED', attempts=job.max_attempts, finished_at=timezone.now(),
+            run_after=timezone.now() + timedelta(hours=1), locked_at=timezone.now(), locked_by='worker-1',
+        )
+        Assessment.objects.filter(pk=self.assessment.pk).update(scoring_status='FAILED')
+
+        same_job, queued = enqueue_final_risk(self.reload())
+        self.assertTrue(queued)
+        self.assertEqual(same_job.pk, job.pk)
+        self.assertEqual((same_job.status, same_job.attempts), ('PENDING', 0))
+        self.assertLessEqual(same_job.run_after, timezone.now())
+        self.assertEqual((same_job.locked_at, same_job.locked_by, same_job.finished_at), (None, '', None))
+        self.assertEqual(self.reload().scoring_status, 'QUEUED')
+
+        self.assertEqual(process_due_jobs('worker-2'), (1, 0))
+        self.assertEqual(self.reload().scoring_status, 'DONE')
+
+    def test_failed_job_is_requeued_in_bulk(self):
+        other = create_assessment(create_patient(1), self.user, tests=RESULT_MODELS)
+        jobs = enqueue_final_risk_many([self.assessment, other])
+        ScoringJob.objects.filter(pk=jobs[self.assessment.pk].pk).update(status='FAILED', attempts=5)
+        ScoringJob.objects.filter(pk=jobs[other.pk].pk).update(status='DONE', attempts=1)
+
+        jobs = enqueue_final_risk_many([self.reload(), Assessment.objects.with_results().get(pk=other.pk)])
+        self.assertEqual((jobs[self.assessment.pk].status, jobs[self.assessment.pk].attempts), ('PENDING', 0))
+        self.assertEqual(jobs[other.pk].status, 'DONE')
+        self.assertEqual(ScoringJob.objects.count(), 2)
+
+    def test_stale_lock_is_reclaimed(self):
+        job, _ = enqueue_final_risk(self.assessment)
+        self.assertEqual(claim_due_jobs('worker-1', 10), [job])
+        # Reserva recente: nenhum outro worker pega o job
+        self.assertEqual(claim_due_jobs('worker-2', 10), [])
+
+        ScoringJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(claim_due_jobs('worker-2', 10), [job])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('RUNNING', 'worker-2', 2))
+
+
+class RecalculateScoreTest(TransactionTestCase):
+    """TransactionTestCase: no modo eager o job roda no commit, dentro da própria requisição"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.assessment = create_assessment(create_patient(), self.user, tests=RESULT_MODELS)
+        self.client.force_login(self.user)
+        self.url = reverse('assessments:assessment-recalculate-score', args=[self.assessment.pk])
+
+    @override_settings(SCORING_QUEUE_EAGER=False)
+    def test_recalculation_is_enqueued(self):
+        with mock.patch.object(scoring_queue, 'calculate_final_risk') as calculate:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 202)
+        calculate.assert_not_called()
+        job = ScoringJob.objects.get()
+        self.assertEqual(response.json()['scoring_job'], job.pk)
+        self.assertEqual(job.status, 'PENDING')
+
+    @override_settings(SCORING_QUEUE_EAGER=True)
+    def test_eager_recalculation_runs_the_job_again(self):
+        for _ in range(2):
+            response = self.client.post(self.url)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+        job = ScoringJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('DONE', 1))
+        self.assertIsNotNone(Assessment.objects.get(pk=self.assessment.pk).final_risk_score)
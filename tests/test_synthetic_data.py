@@ -0,0 +1,54 @@
+"""
+Testes da remoção em lote dos dados (generate_synthetic_data --clear).
+"""
+
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+from django.test import TestCase
+
+from apps.assessments.models import Assessment, DailyAssessmentStats, ScoringJob, TMTResult
+from apps.core import synthetic_data
+from apps.core.synthetic_data import clear_patient_data
+from apps.patients.models import Patient
+
+from .helpers import create_assessment, create_patient, create_user
+
+
+class ClearPatientDataTest(TestCase):
+    def setUp(self):
+        user = create_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(5):
+                assessment = create_assessment(create_patient(number), user, tests=('tmt', 'meem'))
+                ScoringJob.objects.create(assessment=assessment, idempotency_key=f'job-{number}')
+        self.assertTrue(DailyAssessmentStats.objects.exists())
+
+    def test_deletes_in_batches_without_signals(self):
+        deleted_signals = []
+
+        def receiver(sender, **kwargs):
+            if sender in synthetic_data.CLEAR_MODELS:
+                deleted_signals.append(sender)
+
+        post_delete.connect(receiver)
+        try:
+            with mock.patch.object(synthetic_data, 'bump_all_data_versions') as bump:
+                with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                    deleted = clear_patient_data(batch_size=2)
+        finally:
+            post_delete.disconnect(receiver)
+
+        self.assertEqual(deleted_signals, [])
+        self.assertEqual(callbacks, [])
+        bump.assert_called_once_with()
+        self.assertEqual((deleted[Patient], deleted[Assessment], deleted[TMTResult]), (5, 5, 5))
+        for model in (Patient, Assessment, TMTResult, ScoringJob, DailyAssessmentStats):
+            self.assertFalse(model.objects.exists(), model.__name__)
+
+    def test_clear_option(self):
+        call_command('generate_synthetic_data', '--clear', '--patients', '2', '--seed', '1', stdout=StringIO())
+        self.assertEqual(Patient.objects.count(), 2)
+        self.assertFalse(Patient.objects.filter(full_name__startswith='Paciente ').exists())
@@ -0,0 +1,116 @@
+"""
+Testes do cache das páginas: versões incrementadas só depois do commit e
+nenhuma página servida com dados antigos.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.assessments.models import TMTResult
+from apps.core.view_cache import cached_context, get_data_versions
+
+from .helpers import create_assessment, create_patient, create_user
+
+
+class ViewCacheTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient = create_patient()
+            self.assessment = create_assessment(self.patient, self.user, tests=('tmt',))
+
+    def versions(self):
+        return (
+            get_data_versions(),
+            get_data_versions('patient', self.patient.pk),
+            get_data_versions('assessment', self.assessment.pk),
+        )
+
+
+class VersionBumpOnCommitTest(ViewCacheTestMixin, TestCase):
+    def assert_bumped_after_commit(self, change):
+        before = self.versions()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                change()
+                self.assertEqual(self.versions(), before)
+            # Bloco atômico concluído, commit ainda pendente
+            self.assertEqual(self.versions(), before)
+        self.assertTrue(callbacks)
+        after = self.versions()
+        for scope_before, scope_after in zip(before, after):
+            self.assertNotEqual(scope_before[1], scope_after[1])
+
+    def test_assessment_save(self):
+        def change():
+            self.assessment.status = 'COMPLETED'
+            self.assessment.save()
+        self.assert_bumped_after_commit(change)
+
+    def test_result_save(self):
+        def change():
+            result = TMTResult.objects.get(assessment=self.assessment)
+            result.time_a_seconds = 55
+            result.save()
+        self.assert_bumped_after_commit(change)
+
+    def test_patient_save(self):
+        def change():
+            self.patient.room_number = '999'
+            self.patient.save()
+        self.assert_bumped_after_commit(change)
+
+    def test_rolled_back_change_does_not_bump(self):
+        before = self.versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.patient.room_number = '999'
+                    self.patient.save()
+                    raise RuntimeError
+        self.assertEqual(self.versions(), before)
+
+
+class CachedPageFreshnessTest(ViewCacheTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_context_is_rebuilt_after_change(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'room': type(self.patient).objects.get(pk=self.patient.pk).room_number}
+
+        def context():
+            return cached_context('test', build, scope='patient', object_id=self.patient.pk)
+
+        self.assertEqual(context(), {'room': self.patient.room_number})
+        self.assertEqual(context(), {'room': self.patient.room_number})
+        self.assertEqual(len(builds), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.room_number = '999'
+            self.patient.save()
+        self.assertEqual(context(), {'room': '999'})
+        self.assertEqual(len(builds), 2)
+
+    def test_patient_history_page_is_never_stale(self):
+        url = reverse('patient_history', args=[self.patient.pk])
+        self.assertContains(self.client.get(url), self.patient.full_name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.full_name = 'Paciente Renomeado'
+            self.patient.save()
+        self.assertContains(self.client.get(url), 'Paciente Renomeado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = TMTResult.objects.get(assessment=self.assessment)
+            result.time_a_seconds = 123.5
+            result.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context['assessments'][0].results.tmt.time_a_seconds, 123.5)
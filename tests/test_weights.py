@@ -0,0 +1,112 @@
+"""
+Testes dos perfis de pesos: o perfil padrão reproduz a fórmula antiga, a
+validação dos perfis e o recálculo só dos pesos.
+"""
+
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.assessments.models import Assessment, ClockDrawingResult, WeightProfile
+from apps.assessments.services import score_calculator
+from apps.assessments.weights import DEFAULT_WEIGHTS, WeightProfileError, compile_weight_profile
+
+from .helpers import RESULT_MODELS, create_assessment, create_patient, create_user
+
+
+def old_formula(normalized):
+    """Z-score final com os pesos fixos anteriores aos perfis (mesma ordem de soma)"""
+    test_scores = {}
+    if 'digit_span' in normalized:
+        test_scores['digit_span'] = {'score': normalized['digit_span'], 'weight': 1.5}
+    if 'tmt_a' in normalized and 'tmt_b' in normalized:
+        test_scores['tmt'] = {'score': normalized['tmt_a'] * 0.4 + normalized['tmt_b'] * 0.6, 'weight': 2.0}
+    if 'stroop' in normalized:
+        test_scores['stroop'] = {'score': normalized['stroop'], 'weight': 1.8}
+    if 'meem' in normalized:
+        test_scores['meem'] = {'score': normalized['meem'], 'weight': 2.5}
+    if 'clock_drawing' in normalized:
+        test_scores['clock_drawing'] = {'score': normalized['clock_drawing'], 'weight': 1.2}
+    total_weight = sum(test['weight'] for test in test_scores.values())
+    if not test_scores:
+        return test_scores, None, total_weight
+    weighted_sum = sum(test['score'] * test['weight'] for test in test_scores.values())
+    return test_scores, weighted_sum / total_weight, total_weight
+
+
+class DefaultProfileTest(SimpleTestCase):
+    def test_matches_old_hardcoded_weights(self):
+        rnd = random.Random(5)
+        tests = ('digit_span', 'tmt_a', 'tmt_b', 'stroop', 'meem', 'clock_drawing')
+        for _ in range(300):
+            normalized = {test: rnd.uniform(-4, 4) for test in tests if rnd.random() < 0.7}
+            with self.subTest(normalized=normalized):
+                self.assertEqual(DEFAULT_WEIGHTS.score(normalized), old_formula(normalized))
+
+    def test_default_weights(self):
+        self.assertEqual(DEFAULT_WEIGHTS.as_dict(), {
+            'digit_span': 1.5, 'tmt': 2.0, 'stroop': 1.8, 'meem': 2.5, 'clock_drawing': 1.2,
+            'tmt_a': 0.4, 'tmt_b': 0.6,
+        })
+
+
+class CompileWeightProfileTest(SimpleTestCase):
+    def test_rejects_invalid_profiles(self):
+        valid = DEFAULT_WEIGHTS.as_dict()
+        without_meem = {key: value for key, value in valid.items() if key != 'meem'}
+        invalid = {
+            'lista': list(valid.values()),
+            'peso faltando': without_meem,
+            'chave desconhecida': {**valid, 'memoria': 1.0},
+            'negativo': {**valid, 'stroop': -0.5},
+            'NaN': {**valid, 'meem': float('nan')},
+            'infinito': {**valid, 'tmt_b': float('inf')},
+            'booleano': {**valid, 'digit_span': True},
+            'texto': {**valid, 'tmt': '2.0'},
+            'todos zero': {**valid, 'digit_span': 0, 'tmt': 0, 'stroop': 0, 'meem': 0, 'clock_drawing': 0},
+        }
+        for case, weights in invalid.items():
+            with self.subTest(case=case), self.assertRaises(WeightProfileError):
+                compile_weight_profile(weights, 'invalido')
+
+    def test_version_follows_weights(self):
+        same = compile_weight_profile(DEFAULT_WEIGHTS.as_dict(), 'copia', profile_id=7)
+        other = compile_weight_profile({**DEFAULT_WEIGHTS.as_dict(), 'tmt_a': 0.5, 'tmt_b': 0.5}, 'tmt-igual')
+        self.assertEqual(same.version, DEFAULT_WEIGHTS.version)
+        self.assertNotEqual(other.version, DEFAULT_WEIGHTS.version)
+
+
+class WeightsOnlyRescoreTest(TestCase):
+    def setUp(self):
+        user = create_user()
+        self.assessments = [
+            create_assessment(create_patient(number), user, tests=RESULT_MODELS) for number in range(3)
+        ]
+        ClockDrawingResult.objects.create(
+            assessment=self.assessments[0], circle_score=2, numbers_score=3, hands_score=3,
+        )
+        for assessment in self.assessments:
+            score_calculator.calculate_final_risk_score(assessment.pk)
+
+    def result_rows(self):
+        return {
+            model.__name__: list(model.objects.order_by('pk').values())
+            for model in (*RESULT_MODELS.values(), ClockDrawingResult)
+        }
+
+    def test_result_tables_untouched(self):
+        profile = WeightProfile.objects.create(
+            slug='so-meem', name='Só MEEM',
+            weights={**dict.fromkeys(('digit_span', 'tmt', 'stroop', 'clock_drawing'), 0), 'meem': 1,
+                     'tmt_a': 0.5, 'tmt_b': 0.5},
+        )
+        Assessment.objects.filter(pk=self.assessments[0].pk).update(weight_profile=profile)
+        before = self.result_rows()
+
+        call_command('rescore_assessments', '--weights-only', stdout=StringIO())
+
+        self.assertEqual(self.result_rows(), before)
+        rescored = Assessment.objects.get(pk=self.assessments[0].pk)
+        self.assertEqual(rescored.final_z_score, round(rescored.meem_z_score, 3))
@@ -0,0 +1,90 @@
+"""
+Testes do cálculo de Z-scores: o cálculo em lote (NumPy) é idêntico ao individual.
+"""
+
+import copy
+import random
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.assessments.norms import compile_norm_table
+from apps.assessments.services import AssessmentScoreCalculator, score_calculator
+
+
+def make_patients(count, seed=7):
+    rnd = random.Random(seed)
+    return [
+        SimpleNamespace(
+            age=rnd.randint(30, 100),
+            education_level=rnd.choice(['NONE', 'FUNDAMENTAL', 'MEDIO', 'GRADUACAO', 'POSGRAD', None]),
+            education_years=rnd.choice([None, 0, 3, 8, 9, 15]),
+        )
+        for _ in range(count)
+    ]
+
+
+class BatchMatchesScalarTest(TestCase):
+    """Cada teste: o resultado do lote é igual, valor a valor, ao do cálculo individual"""
+
+    def setUp(self):
+        self.calculator = score_calculator
+        self.patients = make_patients(500)
+        rnd = random.Random(11)
+        self.raw = [rnd.uniform(0, 250) for _ in self.patients]
+        self.ages, self.education_groups = self.calculator.get_patient_arrays(self.patients)
+        self.education_years = [patient.education_years for patient in self.patients]
+
+    def assert_all_tests_match(self):
+        calculator, patients, raw = self.calculator, self.patients, self.raw
+        ages, groups = self.ages, self.education_groups
+
+        z_a, z_b = calculator.calculate_tmt_z_scores_batch(ages, groups, raw, [r * 2 for r in raw])
+        scalar = [calculator.calculate_tmt_z_scores(p, r, r * 2) for p, r in zip(patients, raw)]
+        self.assertEqual(z_a.tolist(), [z[0] for z in scalar])
+        self.assertEqual(z_b.tolist(), [z[1] for z in scalar])
+        for test_type in ('time', 'performance'):
+            self.assertEqual(
+                calculator.normalize_z_scores_for_deficit_batch(z_b, test_type).tolist(),
+                [calculator.normalize_z_score_for_deficit(z[1], test_type) for z in scalar],
+            )
+
+        cases = {
+            'digit_span': (calculator.calculate_digit_span_z_scores_batch,
+                           calculator.calculate_digit_span_z_score, [int(r) % 25 for r in raw]),
+            'stroop': (calculator.calculate_stroop_z_scores_batch, calculator.calculate_stroop_z_score, raw),
+            'meem': (calculator.calculate_meem_z_scores_batch,
+                     calculator.calculate_meem_z_score, [int(r) % 31 for r in raw]),
+        }
+        for test, (batch, single, scores) in cases.items():
+            with self.subTest(test=test):
+                self.assertEqual(
+                    batch(ages, groups, scores).tolist(),
+                    [single(p, score) for p, score in zip(patients, scores)],
+                )
+
+        scores = [int(r) % 11 for r in raw]
+        with self.subTest(test='clock_drawing'):
+            self.assertEqual(
+                calculator.calculate_clock_drawing_z_scores_batch(ages, self.education_years, scores).tolist(),
+                [calculator.calculate_clock_drawing_z_score(p, score) for p, score in zip(patients, scores)],
+            )
+
+    def test_bundled_norms(self):
+        self.assert_all_tests_match()
+
+    def test_zero_standard_deviation(self):
+        # Metade das células com desvio padrão zero: Z = 0 nos dois caminhos
+        data = copy.deepcopy(score_calculator.normative_data)
+        for test in ('tmt_a', 'tmt_b', 'digit_span', 'stroop', 'meem', 'clock_drawing'):
+            for band, cells in data[test].items():
+                if band.startswith('_'):
+                    continue
+                cells['low_education']['sd'] = 0
+        table = compile_norm_table(data, version='sd-zero')
+        with mock.patch.object(AssessmentScoreCalculator, 'norm_table', new=table):
+            self.assert_all_tests_match()
+            z_scores = score_calculator.calculate_clock_drawing_z_scores_batch(self.ages, self.education_years, self.raw)
+        self.assertIn(0.0, z_scores.tolist())
+        self.assertTrue(all(abs(z) != float('inf') and z == z for z in z_scores.tolist()))